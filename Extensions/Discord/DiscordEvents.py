@@ -1,5 +1,8 @@
 from typing import Any
+import copy
+import discord
 import src.DialogEvents.BaseEvent as BaseEvent
+import src.utils.CallbackUtils as cbUtils
 import yaml
 
 
@@ -18,4 +21,40 @@ class MenuClickEvent(BaseEvent.BaseEvent):
     
     def __getattribute__(self, __name: str) -> Any:
         #TODO: maybe this can work for Event class? Investigate
-        return self.interaction.__name
\ No newline at end of file
+        return self.interaction.__name
+
+def _user_view(user):
+    if user is None:
+        return None
+    return cbUtils.CallbackEventView(id=user.id, name=user.name, bot=user.bot)
+
+def _channel_view(channel):
+    if channel is None:
+        return None
+    return cbUtils.CallbackEventView(id=channel.id, type=channel.type.value if channel.type is not None else None)
+
+def interaction_callback_view(interaction:discord.Interaction):
+    '''picklable view of an interaction for callbacks running in a process. has ids, the raw interaction data, and user, channel, and
+    message as small views. enums are their int values. can't be used to respond to interaction'''
+    message = None
+    if interaction.message is not None:
+        message = cbUtils.CallbackEventView(id=interaction.message.id, content=interaction.message.content)
+    data = copy.deepcopy(interaction.data) if interaction.data is not None else {}
+    return cbUtils.CallbackEventView(id=interaction.id, type=interaction.type.value, data=data, custom_id=data.get("custom_id"),
+                                     values=data.get("values"), user=_user_view(interaction.user), channel_id=interaction.channel_id,
+                                     channel=_channel_view(interaction.channel), guild_id=interaction.guild_id, message=message)
+
+def message_callback_view(message:discord.Message):
+    '''picklable view of a message for callbacks running in a process. has ids, content, and author, channel, and reference as small views.
+    enums are their int values'''
+    reference = None
+    if message.reference is not None:
+        reference = cbUtils.CallbackEventView(message_id=message.reference.message_id, channel_id=message.reference.channel_id)
+    return cbUtils.CallbackEventView(id=message.id, type=message.type.value, content=message.content, author=_user_view(message.author),
+                                     channel_id=message.channel.id, channel=_channel_view(message.channel),
+                                     guild_id=message.guild.id if message.guild is not None else None, reference=reference)
+
+def register_callback_views():
+    '''register views for discord interactions and messages so they can be events for callbacks with executor "process"'''
+    cbUtils.register_callback_view(discord.Interaction, interaction_callback_view)
+    cbUtils.register_callback_view(discord.Message, message_callback_view)
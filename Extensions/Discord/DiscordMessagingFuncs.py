@@ -485,7 +485,7 @@ def button_is(data:cbUtils.CallbackDatapack):
         return event.data["custom_id"] in custom_ids
     else:
         return False
-cbUtils.set_callback_settings(button_is, runtime_input_key="button_is_override", allowed_purposes=[POSSIBLE_PURPOSES.TRANSITION_FILTER, POSSIBLE_PURPOSES.FILTER], schema={
+cbUtils.set_callback_settings(button_is, runtime_input_key="button_is_override", pure=True, allowed_purposes=[POSSIBLE_PURPOSES.TRANSITION_FILTER, POSSIBLE_PURPOSES.FILTER], schema={
     "oneOf":[
         {"type":"null"},
         {"type":["string", "integer"]},
@@ -700,7 +700,7 @@ def rename_menu(data:cbUtils.CallbackDatapack):
     node.menu_messages_info[settings["to"]] = node.menu_messages_info[settings["from"]]
     del node.menu_messages_info[settings["from"]]
 
-@cbUtils.callback_settings(runtime_input_key="selection_is_override", allowed_purposes=[POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER], schema={"type":"object",
+@cbUtils.callback_settings(runtime_input_key="selection_is_override", pure=True, allowed_purposes=[POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER], schema={"type":"object",
     "properties":{
         "custom_id":{"type":"string"},
         "selection":{"oneOf":[
@@ -751,7 +751,15 @@ def selection_is(data:cbUtils.CallbackDatapack):
             return True
     return False
 
-@cbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER], schema={
+def _server_member_cache_key(data:cbUtils.CallbackDatapack):
+    '''is_server_member's result depends on which server and which user'''
+    server_id = data.base_parameter
+    if server_id is None and data.active_node.session is not None:
+        server_id = data.active_node.session.data.get("server_id")
+    user = data.event.user if isinstance(data.event, Interaction) else data.event.author
+    return (server_id, user.id)
+
+@cbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER], cache_ttl=30, cache_key=_server_member_cache_key, schema={
     "oneOf": [
         {
             "type":["string","integer"]
@@ -787,7 +795,7 @@ def is_in_DM(data:cbUtils.CallbackDatapack):
     event = data.event
     # this works for Discord Message, Context, or Interaction
     return event.channel.type == discord.ChannelType.private
-cbUtils.set_callback_settings(is_in_DM, allowed_purposes=[POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER], description_blurb="checks if event happened in dm")
+cbUtils.set_callback_settings(is_in_DM, pure=True, allowed_purposes=[POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER], description_blurb="checks if event happened in dm")
 
 dialog_func_info = {send_message:{}, clear_buttons:{}, setup_next_message:{},
                     clicked_this_menu:{}, button_is:{}, remove_message:{},
@@ -21,6 +21,47 @@ class DiscordNode(BaseNode):
         self.menu_messages_info:dict[str,NodetionDCMenuInfo] = {}
         # a discord node can have multiple menus so there's less worrying about how many send messages there are in callback section
         self.managed_replies_info:typing.Set[NodetionDCMenuInfo] = set()
+        self.restored_messages:"dict[str, typing.Any]" = {"menus": {}, "replies": []}
+        '''channel and message ids from a handler snapshot that haven't been fetched again yet, see `reattach_messages`'''
+
+    def snapshot_state(self) -> dict:
+        '''discord messages and views can't be saved, only ids of messages that aren't deleted are kept'''
+        state = super().snapshot_state()
+        del state["menu_messages_info"]
+        del state["managed_replies_info"]
+        state["restored_messages"] = {
+            "menus": {**self.restored_messages["menus"], **{menu_name: {"channel_id": info.message.channel.id, "message_id": info.message.id, "page": info.page}
+                                                            for menu_name, info in self.menu_messages_info.items() if not info.deleted}},
+            "replies": self.restored_messages["replies"] + [{"channel_id": info.message.channel.id, "message_id": info.message.id, "page": info.page}
+                                                           for info in self.managed_replies_info if not info.deleted]
+        }
+        return state
+
+    async def reattach_messages(self, bot):
+        '''fetch messages of a node restored from snapshot and track them again. views aren't brought back so old buttons on them
+        won't work until menu is sent again. messages that can't be found anymore are dropped'''
+        restored = self.restored_messages
+        self.restored_messages = {"menus": {}, "replies": []}
+        for menu_name, ids in restored["menus"].items():
+            message_info = await self._fetch_restored_message(bot, ids)
+            if message_info is not None:
+                self.record_menu_message(menu_name, message_info)
+        for ids in restored["replies"]:
+            message_info = await self._fetch_restored_message(bot, ids)
+            if message_info is not None:
+                self.record_reply_message(message_info)
+
+    async def _fetch_restored_message(self, bot, ids:dict):
+        try:
+            channel = bot.get_channel(ids["channel_id"])
+            if channel is None:
+                channel = await bot.fetch_channel(ids["channel_id"])
+            message = await channel.fetch_message(ids["message_id"])
+        except Exception:
+            return None
+        message_info = NodetionDCMenuInfo(message)
+        message_info.page = ids["page"]
+        return message_info
 
     def record_menu_message(self, menu_name, message_info:NodetionDCMenuInfo):
         self.menu_messages_info[menu_name] = message_info
@@ -13,6 +13,7 @@ import logging
 
 logger = logging.getLogger('discord')
 DialogParsing.register_node_type(DiscordNodeType, "Discord")
+DiscordEvents.register_callback_views()
 
 class SimpleBot(Bot):
     def __init__(self, **kargs):
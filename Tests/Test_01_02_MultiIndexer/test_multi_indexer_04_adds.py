@@ -107,3 +107,31 @@ def test_add_items_overwrites():
     results = test_mi.add_items({1: {"A":"a"}, 3:{"B":[1,2]}}, or_overwrite=True)
     assert results == [1,3]
 
+
+def test_add_items_batches_index_updates():
+    '''test indices get new items as one batch, and custom indices without batch support still get each item'''
+    class CountingIndex(Cache.FieldValueIndex):
+        def __init__(self, name, keys_value_finder=None) -> None:
+            super().__init__(name, keys_value_finder)
+            self.calls = []
+        def add_item(self, primary_key, item):
+            self.calls.append(("add_item", primary_key))
+            super().add_item(primary_key, item)
+        def add_items(self, entries):
+            self.calls.append(("add_items", list(entries.keys())))
+            super().add_items(entries)
+    class PlainIndex(Cache.AbstractIndex):
+        def __init__(self, name) -> None:
+            super().__init__(name)
+            self.seen = []
+        def add_item(self, primary_key, item):
+            self.seen.append(primary_key)
+    test_i = CountingIndex("first_test", keys_value_finder=lambda x: [x.get("A")] if x.get("A") else None)
+    test_i2 = PlainIndex("second_test")
+    test_mi = Cache.MultiIndexer(input_secondary_indices=[test_i, test_i2])
+
+    results = test_mi.add_items({key: {"A": "a" if key % 2 else "b"} for key in range(6)})
+    assert results == list(range(6))
+    assert test_i.calls == [("add_items", list(range(6)))]
+    assert test_i.pointers == {"a": set([1, 3, 5]), "b": set([0, 2, 4])}
+    assert test_i2.seen == list(range(6))
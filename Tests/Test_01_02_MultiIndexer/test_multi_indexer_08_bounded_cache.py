@@ -0,0 +1,139 @@
+import pytest
+from datetime import timedelta
+import src.utils.Cache as Cache
+import src.utils.Clock as Clock
+
+def test_bounded_size_evicts_least_recent():
+    '''test going over max size drops least recently used item and keeps secondary indices in sync'''
+    test_i = Cache.FieldValueIndex("first_test", keys_value_finder=lambda x: [x.get("A")] if x.get("A") else None)
+    test_c = Cache.BoundedCache(max_size=2)
+    test_mi = Cache.MultiIndexer(cache=test_c, input_secondary_indices=[test_i])
+
+    test_mi.add_item(1, {"A": "a"})
+    test_mi.add_item(2, {"A": "b"})
+    # touching 1 makes 2 the least recently used
+    assert test_mi.get(1) == [{"A": "a"}]
+    test_mi.add_item(3, {"A": "a"})
+
+    assert 2 not in test_mi
+    assert 1 in test_mi
+    assert 3 in test_mi
+    assert "b" not in test_i.pointers
+    assert test_i.pointers["a"] == set([1, 3])
+    assert test_c.evictions == 1
+
+def test_bounded_size_batch_add():
+    '''test batch add that evicts items from same batch doesn't leave them in secondary indices'''
+    test_i = Cache.FieldValueIndex("first_test", keys_value_finder=lambda x: [x.get("A")] if x.get("A") else None)
+    test_c = Cache.BoundedCache(max_size=2)
+    test_mi = Cache.MultiIndexer(cache=test_c, input_secondary_indices=[test_i])
+
+    results = test_mi.add_items({1: {"A": "a"}, 2: {"A": "b"}, 3: {"A": "a"}})
+    assert results == [1, 2, 3]
+    assert 1 not in test_mi
+    assert test_i.pointers == {"a": set([3]), "b": set([2])}
+
+def test_bounded_age_expires_on_write():
+    '''test old items are dropped next time cache is written to and indices are cleaned'''
+    test_i = Cache.FieldValueIndex("first_test", keys_value_finder=lambda x: [x.get("A")] if x.get("A") else None)
+    test_c = Cache.BoundedCache(max_age=timedelta(seconds=30))
+    test_mi = Cache.MultiIndexer(cache=test_c, input_secondary_indices=[test_i])
+
+    test_mi.add_item(1, {"A": "a"})
+    test_mi.add_item(2, {"A": "b"})
+    # pretend 1 was written long ago
+    test_c.write_times[1] = Clock.now() - 60
+    # reads don't evict
+    assert 1 in test_mi
+    test_mi.add_item(3, {"A": "c"})
+
+    assert 1 not in test_mi
+    assert "a" not in test_i.pointers
+    assert 2 in test_mi
+    assert 3 in test_mi
+
+def test_bounded_expire_stops_at_first_fresh():
+    '''test expire only drops items older than age limit'''
+    test_c = Cache.BoundedCache(max_age=timedelta(seconds=30))
+    test_mi = Cache.MultiIndexer(cache=test_c)
+    test_mi.add_items({1: "a", 2: "b", 3: "c"})
+
+    dropped = test_c.expire(now=Clock.now() + 10)
+    assert dropped == 0
+    dropped = test_c.expire(now=Clock.now() + 31)
+    assert dropped == 3
+    assert len(test_mi) == 0
+
+def test_bounded_set_refreshes_age():
+    '''test setting an existing item counts as a write and resets its age'''
+    test_c = Cache.BoundedCache(max_age=timedelta(seconds=30))
+    test_mi = Cache.MultiIndexer(cache=test_c)
+    test_mi.add_items({1: "a", 2: "b"})
+    test_c.write_times[1] = Clock.now() - 60
+    test_c.write_times.move_to_end(2)
+
+    test_mi.set_item(1, "z")
+    assert test_mi.get(1) == ["z"]
+    assert 2 in test_mi
+
+def test_bounded_stats():
+    '''test hit and miss counters count lookups made through MultiIndexer, not internal accesses'''
+    test_c = Cache.BoundedCache(max_size=1)
+    test_mi = Cache.MultiIndexer(cache=test_c)
+    test_mi.add_item(1, "a")
+    test_mi.get(1)
+    assert 1 in test_mi
+    test_mi.get(5)
+    assert 6 not in test_mi
+    test_mi.get_ref(1)
+    test_mi.set_item(1, "b")
+    test_c.get(7)
+    test_mi.add_item(2, "b")
+
+    stats = test_c.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+    assert stats["size"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+def test_bounded_internal_access_keeps_order():
+    '''test index maintenance reading items doesn't count as use for which item is least recently used'''
+    test_i = Cache.FieldValueIndex("first_test", keys_value_finder=lambda x: [x.get("A")] if x.get("A") else None)
+    test_c = Cache.BoundedCache(max_size=2)
+    test_mi = Cache.MultiIndexer(cache=test_c, input_secondary_indices=[test_i])
+    test_mi.add_item(1, {"A": "a"})
+    test_mi.add_item(2, {"A": "b"})
+    test_mi.get_all_secondary_keys(1)
+    test_mi.add_item(3, {"A": "c"})
+
+    assert 1 not in test_mi
+    assert 2 in test_mi
+    assert test_c.hits == 1
+
+def test_bounded_remove_not_counted_as_eviction():
+    '''test removing through MultiIndexer doesn't report eviction'''
+    test_i = Cache.FieldValueIndex("first_test", keys_value_finder=lambda x: [x.get("A")] if x.get("A") else None)
+    test_c = Cache.BoundedCache(max_size=3)
+    test_mi = Cache.MultiIndexer(cache=test_c, input_secondary_indices=[test_i])
+    test_mi.add_item(1, {"A": "a"})
+
+    assert test_mi.remove_item(1) == {"A": "a"}
+    assert test_c.evictions == 0
+    assert "a" not in test_i.pointers
+
+def test_bounded_bad_size():
+    with pytest.raises(ValueError):
+        Cache.BoundedCache(max_size=0)
+
+def test_set_cache_registers_listener():
+    '''test a bounded cache swapped in later still reports evictions'''
+    test_i = Cache.FieldValueIndex("first_test", keys_value_finder=lambda x: [x.get("A")] if x.get("A") else None)
+    test_mi = Cache.MultiIndexer(input_secondary_indices=[test_i])
+    test_c = Cache.BoundedCache(max_size=1)
+    test_mi.set_cache(test_c)
+
+    test_mi.add_item(1, {"A": "a"})
+    test_mi.add_item(2, {"A": "b"})
+    assert "a" not in test_i.pointers
+    assert test_i.pointers["b"] == set([2])
@@ -1,3 +1,22 @@
 import pytest
 import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
 
+
+def test_validation_cache_stats():
+    '''test validation results cache counts lookups handler makes and drops oldest results when over limit'''
+    handler = DialogHandler.DialogHandler(settings=DialogHandler.HandlerSettings(validation_cache_size=1))
+    handler.add_graph_nodes({"node1": DialogParser.parse_node({"id": "node1"}), "node2": DialogParser.parse_node({"id": "node2"})})
+    validation_cache = handler.graph_node_validation_status.cache
+    validation_cache.hits = 0
+    validation_cache.misses = 0
+
+    handler.validate_graph_node("node1")
+    handler.validate_graph_node("node1")
+    handler.validate_graph_node("node2")
+
+    stats = validation_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["size"] == 1
+    assert "node2" in handler.graph_node_validation_status.cache
@@ -137,14 +137,17 @@ nodes:
     assert task2.start_time is None
     await asyncio.sleep(2)
     assert node_event_task1.done()
-    await asyncio.sleep(4)
+    # second event starts right when first finishes, no polling delay
+    await asyncio.sleep(0.5)
     assert task2.start_time is not None
+    assert task2.start_time - task.stop_time < 0.1
     assert not task2.done()
+    # first event's node task finished and retired out of queue
     node_event_tasks = handler.advanced_event_queue.get("NodeEventTask", index_name="task_type", default=[])
-    assert len(node_event_tasks) == 2
-    for node_event_task in node_event_tasks:
-        if node_event_task.event["name"] == "ping2":
-            node_event_task2 = node_event_task
+    assert len(node_event_tasks) == 1
+    assert len(handler.completed_tasks.get("NodeEventTask", index_name="task_type", default=[])) == 1
+    node_event_task2 = node_event_tasks[0]
+    assert node_event_task2.event["name"] == "ping2"
     assert node_event_task2.start_time is not None
     await asyncio.sleep(2)
 
@@ -195,16 +198,19 @@ async def test_timeouts_created():
     assert active_node1.status == ITEM_STATUS.CLOSED
     for task in handler.advanced_event_queue.cache.values():
         test_logger.debug(f"task in handler, <{id(task)}> type <{task.type}>, done? <{task.done()}> exception: <{task.exception() if task.done() else 'N/A'}>")
-    assert len(handler.advanced_event_queue) == 6
-    assert len(handler.advanced_event_queue.get("NodeTimeoutTask", index_name="task_type", default=[])) == 2
+    # node1's waiter, timeout handler, and event task are done and retired from queue
+    assert len(handler.advanced_event_queue) == 3
+    assert len(handler.completed_tasks) == 3
+    assert len(handler.advanced_event_queue.get("NodeTimeoutTask", index_name="task_type", default=[])) == 1
     assert "node2" in [task.timeoutable.graph_node.id for task in handler.advanced_event_queue.get("NodeTimeoutTask", index_name="task_type", default=[])]
-    assert len(handler.advanced_event_queue.get("NodeEventTask", index_name="task_type", default=[])) == 2
+    assert len(handler.advanced_event_queue.get("NodeEventTask", index_name="task_type", default=[])) == 1
     assert "node2" in [task.active_node.graph_node.id for task in handler.advanced_event_queue.get("NodeEventTask", index_name="task_type", default=[])]
     await asyncio.sleep(1)
-    for task in handler.advanced_event_queue.cache.values():
-        test_logger.debug(f"task <{id(task)}><{task.type}> done? <{task.done()}> exception? <{task.exception() if task.done() else 'N/A'}>")
-        assert task.done()
-        assert task.exception() is None
+    assert len(handler.advanced_event_queue) == 0
+    assert len(handler.completed_tasks) == 6
+    metrics = handler.get_queue_metrics()
+    assert metrics["queued_tasks"] == 0
+    assert metrics["retired_tasks"] == 6
 
 @pytest.mark.asyncio
 async def test_timeouts_wait():
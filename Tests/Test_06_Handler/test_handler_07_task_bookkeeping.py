@@ -0,0 +1,237 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+'''
+
+def setup_handler(settings=None, graph_string=None):
+    if settings is None:
+        settings = DialogHandler.HandlerSettings()
+    if graph_string is None:
+        graph_string = GRAPH
+    loadded_yaml = yaml.safe_load(graph_string)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    return DialogHandler.DialogHandler(graph_nodes=nodes, settings=settings)
+
+@pytest.mark.asyncio
+async def test_finished_tasks_retire():
+    '''test tasks leave the queue on their own once they finish'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+
+    await handler.handle_event("ping", {})
+    # let done callbacks run
+    await asyncio.sleep(0)
+    assert len(handler.advanced_event_queue) == 0
+    # one event task and one node task
+    assert len(handler.completed_tasks) == 2
+    assert len(handler.completed_tasks.get("EventTask", index_name="task_type", default=[])) == 1
+    assert len(handler.completed_tasks.get("NodeEventTask", index_name="task_type", default=[])) == 1
+
+@pytest.mark.asyncio
+async def test_completed_ring_is_bounded():
+    '''test finished tasks remembered are capped by settings'''
+    handler = setup_handler(DialogHandler.HandlerSettings(completed_task_limit=3))
+    await handler.start_at("node1", "ping", {})
+
+    for i in range(5):
+        await handler.handle_event("ping", {})
+    await asyncio.sleep(0)
+    metrics = handler.get_queue_metrics()
+    assert metrics["queued_tasks"] == 0
+    assert metrics["queued_by_type"] == {}
+    assert metrics["completed_records"] == 3
+    assert metrics["retired_tasks"] == 10
+    assert metrics["completed_evictions"] == 7
+
+@pytest.mark.asyncio
+async def test_completed_records_release_payloads():
+    '''test finished tasks are remembered as small records and let go of event and node they worked on'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    node_key = handler.active_node_cache.get_keys("node1", index_name="graph_node")[0]
+    event = {"payload": "large"}
+
+    event_task = handler.notify_event("ping", event)
+    await event_task
+    await asyncio.sleep(0)
+    assert event_task.event is None
+
+    records = handler.completed_tasks.get("NodeEventTask", index_name="task_type", default=[])
+    assert len(records) == 1
+    record = records[0]
+    assert not hasattr(record, "__dict__")
+    assert not hasattr(record, "event")
+    assert record.event_type == "ping"
+    assert record.node_id == node_key
+    assert record.session_id is None
+    assert record.stop_time is not None
+    assert record.exception is None
+
+@pytest.mark.asyncio
+async def test_queue_only_holds_pending_tasks():
+    '''test task is out of queue as soon as its run ends, without waiting for done callbacks, and new strict ordered events don't lock on it'''
+    handler = setup_handler(DialogHandler.HandlerSettings(strict_event_order=True))
+    await handler.start_at("node1", "ping", {})
+
+    first_task = handler.notify_event("ping", {})
+    # queue lookups see pending task
+    assert handler.advanced_event_queue.get("EventTask", index_name="task_type") == [first_task]
+    await first_task
+    assert len(handler.advanced_event_queue) == 0
+    assert handler.advanced_event_queue.get("EventTask", index_name="task_type", default=[]) == []
+
+    second_task = handler.notify_event("ping", {})
+    assert second_task.locking_tasks == []
+    await second_task
+    assert handler.retired_task_count == 4
+
+@pytest.mark.asyncio
+async def test_cancelled_task_retires():
+    '''test task cancelled before it ever runs is still taken out of queue'''
+    handler = setup_handler()
+    task = handler.notify_event("ping", {})
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert len(handler.advanced_event_queue) == 0
+    record = handler.completed_tasks.get("EventTask", index_name="task_type")[0]
+    assert record.cancelled
+
+@pytest.mark.asyncio
+async def test_strict_order_locks_on_previous_only():
+    '''test under strict ordering each event waits only on the event right before it, and they finish in order given'''
+    handler = setup_handler(DialogHandler.HandlerSettings(strict_event_order=True))
+    await handler.start_at("node1", "ping", {})
+
+    tasks = [handler.notify_event("ping", {"name": i}) for i in range(3)]
+    assert tasks[0].locking_tasks == []
+    for prev_task, task in zip(tasks, tasks[1:]):
+        assert task.locking_tasks == [prev_task]
+        assert task.sequence > prev_task.sequence
+
+    await asyncio.gather(*tasks)
+    records = handler.completed_tasks.get("EventTask", index_name="task_type")
+    assert [record.sequence for record in sorted(records, key=lambda r: r.stop_time)] == [task.sequence for task in tasks]
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+async def slow_action(datapack:NodetionCbUtils.CallbackDatapack):
+    await asyncio.sleep(0.05)
+
+@pytest.mark.asyncio
+async def test_strict_order_no_polling():
+    '''test strict ordered events start as soon as one before finishes instead of polling, so N events take about N times handling time'''
+    graph = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        actions:
+        - slow_action
+'''
+    handler = setup_handler(DialogHandler.HandlerSettings(strict_event_order=True), graph_string=graph)
+    handler.register_functions({slow_action: {}})
+    await handler.start_at("node1", "ping", {})
+
+    start = asyncio.get_running_loop().time()
+    tasks = [handler.notify_event("ping", {}) for i in range(4)]
+    await asyncio.gather(*tasks)
+    elapsed = asyncio.get_running_loop().time() - start
+    assert 0.2 <= elapsed < 0.5
+    assert [task.stop_time for task in tasks] == sorted(task.stop_time for task in tasks)
+
+@pytest.mark.asyncio
+async def test_session_event_without_waiters():
+    '''test event on node with a session is handled when no timeout waiters are queued, which is normal now that tasks retire right away'''
+    graph = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+        session_chaining:
+          start: -1
+    events:
+      ping:
+'''
+    handler = setup_handler(graph_string=graph)
+    await handler.start_at("node1", "ping", {})
+    assert handler.advanced_event_queue.get("TimeoutWaiter", index_name="task_type") is None
+
+    await asyncio.wait_for(handler.handle_event("ping", {}), timeout=2)
+    assert handler.completed_tasks.get("NodeEventTask", index_name="task_type")[0].event_type == "ping"
+    assert handler.completed_tasks.get("NodeEventTask", index_name="task_type", default=[])[0].exception is None
+    assert len(handler.completed_tasks.get("NodeEventTask", index_name="task_type")) == 1
+
+@pytest.mark.asyncio
+async def test_failed_task_exception_handled():
+    '''test task that fails and is never awaited doesn't leave an unretrieved exception for asyncio to complain about'''
+    import gc
+    import src.utils.HandlerTasks as HandlerTasks
+    handler = setup_handler()
+    loop_errors = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: loop_errors.append(context))
+
+    async def broken():
+        raise ValueError("broken")
+    task = HandlerTasks.HandlerTask(broken)
+    handler._track_task(task)
+    await asyncio.sleep(0.01)
+    assert len(handler.advanced_event_queue) == 0
+    record = handler.completed_tasks.get("Base", index_name="task_type")[0]
+    assert "broken" in record.exception
+
+    del task
+    gc.collect()
+    assert loop_errors == []
+
+@pytest.mark.asyncio
+async def test_strict_order_timeouts_chain_across_events():
+    '''test under strict ordering a timeout queued after an event still waits on earlier timeout, and events don't wait on timeouts'''
+    import src.utils.HandlerTasks as HandlerTasks
+    import src.utils.SessionData as SessionData
+    handler = setup_handler(DialogHandler.HandlerSettings(strict_event_order=True))
+    await handler.start_at("node1", "ping", {})
+    # timeouts for a session node isn't in so node's own event work doesn't also wait on them
+    session = SessionData.SessionData()
+
+    async def fake_timeout(timeoutable, waiting_period_sec):
+        return None
+    def queue_timeout():
+        timeout_task = HandlerTasks.HandleTimeoutTask(fake_timeout, session, "Session", locking_tasks=handler._get_ordering_locks(is_timeout=True), waiting_period_sec=0.1)
+        handler._add_ordered_task(timeout_task)
+        handler._track_task(timeout_task)
+        return timeout_task
+
+    event_1 = handler.notify_event("ping", {})
+    timeout_1 = queue_timeout()
+    event_2 = handler.notify_event("ping", {})
+    timeout_2 = queue_timeout()
+
+    assert timeout_1.locking_tasks == [event_1]
+    assert event_2.locking_tasks == [event_1]
+    assert timeout_2.locking_tasks == [event_2, timeout_1]
+    assert [task.sequence for task in [event_1, timeout_1, event_2, timeout_2]] == sorted([task.sequence for task in [event_1, timeout_1, event_2, timeout_2]])
+
+    await asyncio.wait_for(asyncio.gather(event_1, timeout_1, event_2, timeout_2), timeout=15)
+    assert timeout_2.start_time >= timeout_1.stop_time
+    assert handler._last_event_task is None
+    assert handler._last_timeout_task is None
@@ -0,0 +1,148 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.WorkerPool as WorkerPool
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+  - id: node2
+    TTL: -1
+    graph_start:
+      ping:
+        session_chaining:
+          start: -1
+    events:
+      ping:
+        schedule_close: session
+'''
+
+def setup_handler(settings=None, graph_string=None):
+    if settings is None:
+        settings = DialogHandler.HandlerSettings(dispatch_mode="workers", worker_count=2)
+    if graph_string is None:
+        graph_string = GRAPH
+    loadded_yaml = yaml.safe_load(graph_string)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    return DialogHandler.DialogHandler(graph_nodes=nodes, settings=settings)
+
+@pytest.mark.asyncio
+async def test_pool_lane_order():
+    '''test items in one lane run in order one at a time while other lanes keep going'''
+    pool = WorkerPool.LanedWorkerPool(worker_count=2)
+    finished = []
+    async def work(name, delay):
+        await asyncio.sleep(delay)
+        finished.append(name)
+        return name
+
+    futures = [pool.submit("a", work, "a1", 0.2), pool.submit("a", work, "a2", 0), pool.submit("b", work, "b1", 0.05)]
+    assert await asyncio.gather(*futures) == ["a1", "a2", "b1"]
+    assert finished == ["b1", "a1", "a2"]
+    stats = pool.get_stats()
+    assert stats["workers"] == 2
+    assert stats["busy_lanes"] == 0
+    assert stats["completed"] == 3
+    pool.stop()
+
+@pytest.mark.asyncio
+async def test_pool_exception_reaches_future():
+    '''test exception in work is given to caller and worker keeps going'''
+    pool = WorkerPool.LanedWorkerPool(worker_count=1)
+    async def bad():
+        raise KeyError("bad")
+    async def good():
+        return 1
+
+    bad_future = pool.submit("a", bad)
+    good_future = pool.submit("a", good)
+    with pytest.raises(KeyError):
+        await bad_future
+    assert await good_future == 1
+    pool.stop()
+
+def test_bad_dispatch_mode():
+    with pytest.raises(ValueError):
+        DialogHandler.HandlerSettings(dispatch_mode="threads")
+
+@pytest.mark.asyncio
+async def test_worker_mode_only_event_tasks():
+    '''test in worker mode events don't create tasks per node'''
+    handler = setup_handler()
+    for i in range(5):
+        await handler.start_at("node1", "ping", {})
+    assert len(handler.active_node_cache) == 5
+
+    await handler.handle_event("ping", {})
+    assert len(handler.completed_tasks) == 1
+    assert len(handler.completed_tasks.get("EventTask", index_name="task_type", default=[])) == 1
+    metrics = handler.get_queue_metrics()
+    assert metrics["workers"]["completed"] == 5
+    assert metrics["workers"]["queued_items"] == 0
+    handler.stop_workers()
+
+@pytest.mark.asyncio
+async def test_worker_mode_closes_session():
+    '''test session close requested by node event is still done in worker mode'''
+    handler = setup_handler()
+    await handler.start_at("node2", "ping", {})
+    node = handler.active_node_cache.get_ref(handler.active_node_cache.get_keys("node2", index_name="graph_node")[0])
+    session = node.session
+    assert session is not None
+
+    await handler.handle_event("ping", {})
+    assert not session.is_active()
+    assert not node.is_active()
+    assert len(handler.active_node_cache) == 0
+    handler.stop_workers()
+
+@pytest.mark.asyncio
+async def test_pool_survives_cancelled_work():
+    '''test cancellation coming from inside work item only ends that item, lane and worker keep going'''
+    pool = WorkerPool.LanedWorkerPool(worker_count=1)
+    async def cancelled_inside():
+        inner = asyncio.get_running_loop().create_task(asyncio.sleep(10))
+        inner.cancel()
+        await inner
+    async def good():
+        return 1
+
+    cancelled_future = pool.submit("a", cancelled_inside)
+    good_future = pool.submit("a", good)
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled_future
+    assert await asyncio.wait_for(good_future, timeout=1) == 1
+    assert pool.get_stats()["workers"] == 1
+    assert not pool.workers[0].done()
+    pool.stop()
+    await asyncio.sleep(0)
+    assert pool.stopping_workers == set()
+
+@pytest.mark.asyncio
+async def test_pool_priority_lanes():
+    '''test waiting lanes are picked by most urgent item waiting in them, items in a lane stay in order'''
+    pool = WorkerPool.LanedWorkerPool(worker_count=1)
+    started = []
+    async def work(name):
+        started.append(name)
+
+    futures = [
+        pool.submit("a", work, "a1", priority=10),
+        pool.submit("b", work, "b1", priority=10),
+        pool.submit("c", work, "c1", priority=5),
+        # makes lane b more urgent than c, but b1 still goes before b2
+        pool.submit("b", work, "b2", priority=1),
+    ]
+    await asyncio.gather(*futures)
+    assert started == ["b1", "b2", "c1", "a1"]
+    pool.stop()
@@ -0,0 +1,162 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+      message:
+'''
+
+def setup_handler(settings=None, graph_string=None):
+    if settings is None:
+        settings = DialogHandler.HandlerSettings()
+    if graph_string is None:
+        graph_string = GRAPH
+    loadded_yaml = yaml.safe_load(graph_string)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    return DialogHandler.DialogHandler(graph_nodes=nodes, settings=settings)
+
+def test_bad_ingress_policy():
+    with pytest.raises(ValueError):
+        DialogHandler.HandlerSettings(ingress_policy="sometimes")
+
+@pytest.mark.asyncio
+async def test_no_limit_starts_right_away():
+    '''test without a limit events start as tasks right away like before'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    awaitables = [handler.notify_event("ping", {}) for i in range(3)]
+    assert len(handler.advanced_event_queue.get("EventTask", index_name="task_type")) == 3
+    assert handler.get_ingress_metrics()["ingress_depth"] == 0
+    await asyncio.gather(*awaitables)
+
+@pytest.mark.asyncio
+async def test_events_wait_for_room():
+    '''test events past limit wait in queue and are started in order as earlier ones finish'''
+    handler = setup_handler(DialogHandler.HandlerSettings(max_events_in_flight=1))
+    await handler.start_at("node1", "ping", {})
+    awaitables = [handler.notify_event("ping", {"name": i}) for i in range(3)]
+    assert len(handler.advanced_event_queue.get("EventTask", index_name="task_type")) == 1
+    metrics = handler.get_ingress_metrics()
+    assert metrics["ingress_depth"] == 2
+    assert metrics["events_in_flight"] == 1
+
+    await asyncio.gather(*awaitables)
+    metrics = handler.get_ingress_metrics()
+    assert metrics["ingress_depth"] == 0
+    assert metrics["events_in_flight"] == 0
+    records = handler.completed_tasks.get("EventTask", index_name="task_type")
+    assert len(records) == 3
+    assert [record.sequence for record in sorted(records, key=lambda r: r.stop_time)] == sorted(record.sequence for record in records)
+
+@pytest.mark.asyncio
+async def test_block_policy():
+    '''test full queue under block policy rejects notify and makes submit wait'''
+    handler = setup_handler(DialogHandler.HandlerSettings(max_events_in_flight=1, ingress_limit=1, ingress_policy="block"))
+    await handler.start_at("node1", "ping", {})
+    first = handler.notify_event("ping", {})
+    second = handler.notify_event("ping", {})
+    rejected = handler.notify_event("ping", {})
+    assert rejected.done()
+    assert rejected.result() is None
+    assert handler.get_ingress_metrics()["rejected"] == 1
+
+    submitter = asyncio.get_running_loop().create_task(handler.submit_event("ping", {}))
+    await asyncio.sleep(0)
+    assert not submitter.done()
+    assert handler.get_ingress_metrics()["blocked_submitters"] == 1
+
+    await first
+    third = await asyncio.wait_for(submitter, timeout=1)
+    await asyncio.gather(second, third)
+    assert len(handler.completed_tasks.get("EventTask", index_name="task_type")) == 3
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy():
+    '''test full queue under drop oldest policy drops oldest waiting event to make room'''
+    handler = setup_handler(DialogHandler.HandlerSettings(max_events_in_flight=1, ingress_limit=1, ingress_policy="drop_oldest"))
+    await handler.start_at("node1", "ping", {})
+    first = handler.notify_event("ping", {})
+    dropped = handler.notify_event("ping", {})
+    newest = handler.notify_event("ping", {})
+    assert dropped.done()
+    assert dropped.result() is None
+    assert handler.get_ingress_metrics()["dropped"] == 1
+
+    await asyncio.gather(first, newest)
+    assert len(handler.completed_tasks.get("EventTask", index_name="task_type")) == 2
+
+@pytest.mark.asyncio
+async def test_drop_type_policy():
+    '''test full queue under drop type policy only ever drops events of listed types'''
+    handler = setup_handler(DialogHandler.HandlerSettings(max_events_in_flight=1, ingress_limit=1, ingress_policy="drop_type", droppable_events=["message"]))
+    await handler.start_at("node1", "ping", {})
+    first = handler.notify_event("ping", {})
+    queued_message = handler.notify_event("message", {})
+    # makes room by dropping waiting message
+    queued_ping = handler.notify_event("ping", {})
+    assert queued_message.done() and queued_message.result() is None
+    # nothing droppable waiting, new message is dropped itself
+    new_message = handler.notify_event("message", {})
+    assert new_message.done() and new_message.result() is None
+    # pings are never dropped, goes over limit
+    extra_ping = handler.notify_event("ping", {})
+    assert not extra_ping.done()
+    metrics = handler.get_ingress_metrics()
+    assert metrics["dropped"] == 2
+    assert metrics["ingress_depth"] == 2
+
+    await asyncio.gather(first, queued_ping, extra_ping)
+    assert len(handler.completed_tasks.get("EventTask", index_name="task_type")) == 3
+
+@pytest.mark.asyncio
+async def test_priority_order_in_ingress():
+    '''test waiting events start most urgent first, settings priority and caller priority both count'''
+    handler = setup_handler(DialogHandler.HandlerSettings(max_events_in_flight=1, event_priorities={"message": 20, "ping": 5}))
+    await handler.start_at("node1", "ping", {})
+    first = handler.notify_event("message", {})
+    chatter = handler.notify_event("message", {})
+    ping = handler.notify_event("ping", {})
+    urgent_chatter = handler.notify_event("message", {}, priority=1)
+    assert [pending.priority for pending in handler.ingress_queue] == [20, 5, 1]
+
+    await asyncio.gather(first, chatter, ping, urgent_chatter)
+    records = sorted(handler.completed_tasks.get("EventTask", index_name="task_type"), key=lambda r: r.stop_time)
+    # one in flight at a time, so order finished is order started
+    assert [record.priority for record in records] == [20, 1, 5, 20]
+    assert records[0].sequence < records[1].sequence < records[2].sequence < records[3].sequence
+
+@pytest.mark.asyncio
+async def test_drop_oldest_takes_least_urgent():
+    '''test making room drops from least urgent events first'''
+    handler = setup_handler(DialogHandler.HandlerSettings(max_events_in_flight=1, ingress_limit=2, ingress_policy="drop_oldest", event_priorities={"message": 20}))
+    await handler.start_at("node1", "ping", {})
+    first = handler.notify_event("ping", {})
+    ping = handler.notify_event("ping", {})
+    chatter = handler.notify_event("message", {})
+    newest = handler.notify_event("ping", {})
+    assert chatter.done() and chatter.result() is None
+    assert not ping.done()
+    await asyncio.gather(first, ping, newest)
+
+@pytest.mark.asyncio
+async def test_strict_order_ignores_priority_in_ingress():
+    '''test strict ordering keeps arrival order even for urgent events'''
+    handler = setup_handler(DialogHandler.HandlerSettings(max_events_in_flight=1, strict_event_order=True))
+    await handler.start_at("node1", "ping", {})
+    first = handler.notify_event("ping", {})
+    second = handler.notify_event("message", {})
+    third = handler.notify_event("ping", {}, priority=0)
+    assert [pending.event_type for pending in handler.ingress_queue] == ["message", "ping"]
+    await asyncio.gather(first, second, third)
@@ -0,0 +1,302 @@
+import pytest
+import yaml
+import time
+import asyncio
+import threading
+import os
+import typing
+import functools
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+from src.utils.Enums import POSSIBLE_PURPOSES, CALL_STYLE
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        filters:
+        - threaded_filter
+        actions:
+        - blocking_action: first
+        - record_action: second
+        transitions:
+        - node_names: node2
+          transition_filters:
+          - threaded_filter
+  - id: node2
+    TTL: -1
+    events:
+      ping:
+'''
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION], executor="thread")
+def blocking_action(datapack:NodetionCbUtils.CallbackDatapack):
+    time.sleep(0.2)
+    datapack.active_node.order.append((datapack.base_parameter, threading.current_thread().name))
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_action(datapack:NodetionCbUtils.CallbackDatapack):
+    datapack.active_node.order.append((datapack.base_parameter, threading.current_thread().name))
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER], executor="thread")
+def threaded_filter(datapack:NodetionCbUtils.CallbackDatapack):
+    if not hasattr(datapack.active_node, "order"):
+        datapack.active_node.order = []
+    return threading.current_thread() is not threading.main_thread()
+
+def setup_handler(settings=None, graph_string=None):
+    if settings is None:
+        settings = DialogHandler.HandlerSettings(callback_threads=2)
+    if graph_string is None:
+        graph_string = GRAPH
+    loadded_yaml = yaml.safe_load(graph_string)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=settings)
+    handler.register_functions({blocking_action: {}, record_action: {}, threaded_filter: {}})
+    return handler
+
+def test_bad_executor():
+    def func(datapack):
+        pass
+    with pytest.raises(ValueError):
+        NodetionCbUtils.set_callback_settings(func, allowed_purposes=[POSSIBLE_PURPOSES.ACTION], executor="gpu")
+
+@pytest.mark.asyncio
+async def test_thread_callbacks_keep_order_and_loop_free():
+    '''test threaded callbacks run off the event loop, loop keeps going while they block, and order in node stays the same'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+
+    ticks = 0
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+    beat = asyncio.get_running_loop().create_task(heartbeat())
+    await handler.handle_event("ping", {})
+    beat.cancel()
+
+    assert [name for name, thread in active_node.order] == ["first", "second"]
+    assert active_node.order[0][1].startswith("dialog_handler_")
+    assert active_node.order[1][1] == threading.main_thread().name
+    # loop was not held up by blocking callback
+    assert ticks > 5
+    # threaded transition filter passed
+    assert "node2" in [node.graph_node.id for node in handler.active_node_cache.cache.values()]
+    handler.shutdown_callback_executors()
+    assert handler.callback_thread_pool is None
+
+@pytest.mark.asyncio
+async def test_executor_override_on_register():
+    '''test handler can override executor when registering and coroutines are kept on event loop'''
+    handler = setup_handler()
+    @NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION], cb_key="inline_blocking")
+    def inline_blocking(datapack):
+        pass
+    @NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION], executor="thread")
+    async def coro_action(datapack):
+        pass
+    assert handler.register_function(inline_blocking, {"executor": "thread"})
+    assert handler.functions_cache.get_ref("inline_blocking")["executor"] == "thread"
+    assert handler.register_function(coro_action)
+    assert handler.functions_cache.get_ref("coro_action")["executor"] is None
+    assert not handler.register_function(inline_blocking, {"executor": "gpu", "cb_key": "other"})
+
+PROCESS_GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        filters:
+        - long_message_filter: 3
+        actions:
+        - score_action
+        - record_score
+        transitions:
+        - node_names: node2
+          transition_counters:
+          - double_count
+  - id: node2
+    TTL: -1
+    events:
+      ping:
+'''
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER], executor="process")
+def long_message_filter(view:NodetionCbUtils.CallbackDataView):
+    return len(view.event["text"]) > view.base_parameter
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION], executor="process")
+def score_action(view:NodetionCbUtils.CallbackDataView):
+    view.section_data["score"] = sum(ord(c) for c in view.event["text"])
+    view.section_data["pid"] = os.getpid()
+    view.section_data["node"] = view.node_id
+    view.control_data["close_node"] = True
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_score(datapack:NodetionCbUtils.CallbackDatapack):
+    datapack.active_node.section = dict(datapack.section_data)
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.TRANSITION_COUNTER], executor="process")
+def double_count(view:NodetionCbUtils.CallbackDataView):
+    for name in view.control_data:
+        view.control_data[name] *= 2
+
+@pytest.mark.asyncio
+async def test_process_callbacks_merge_back():
+    '''test process callbacks get a view of data, and changes to section and control data make it back to the handler'''
+    handler = setup_handler(DialogHandler.HandlerSettings(callback_processes=1), graph_string=PROCESS_GRAPH)
+    handler.register_functions({long_message_filter: {}, score_action: {}, record_score: {}, double_count: {}})
+    await handler.start_at("node1", "ping", {"text": ""})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+
+    # filter fails in other process
+    await handler.handle_event("ping", {"text": "hi"})
+    assert not hasattr(active_node, "section")
+
+    await handler.handle_event("ping", {"text": "hello"})
+    assert active_node.section["score"] == sum(ord(c) for c in "hello")
+    assert active_node.section["node"] == "node1"
+    assert active_node.section["pid"] != os.getpid()
+    # control data from process closed node, counter doubled transition
+    assert not active_node.is_active()
+    assert [node.graph_node.id for node in handler.active_node_cache.cache.values()] == ["node2", "node2"]
+    handler.shutdown_callback_executors()
+    assert handler.callback_process_pool is None
+
+class ChatUser:
+    def __init__(self, user_id) -> None:
+        self.id = user_id
+        self.name = "someone"
+
+class ChatEvent:
+    '''stands in for library event objects that hold connections and locks and so can't be pickled'''
+    __slots__ = ("id", "content", "user", "data", "_lock", "reply")
+    def __init__(self, content) -> None:
+        self.id = 7
+        self.content = content
+        self.user = ChatUser(3)
+        self.data = {"custom_id": "button1", "values": ["a"]}
+        self._lock = threading.Lock()
+        self.reply = lambda text: None
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION], executor="process")
+def read_event_action(view:NodetionCbUtils.CallbackDataView):
+    view.section_data["seen"] = (view.event.id, view.event.content, view.event.user.id, view.event.data["custom_id"],
+                                 hasattr(view.event, "_lock"), hasattr(view.event, "reply"))
+
+EVENT_VIEW_GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        actions:
+        - read_event_action
+        - record_score
+'''
+
+@pytest.mark.asyncio
+async def test_process_callback_unpicklable_event():
+    '''test event objects that can't be pickled are reduced to a view of their plain fields for process callbacks'''
+    with pytest.raises(TypeError):
+        import pickle
+        pickle.dumps(ChatEvent("hi"))
+    handler = setup_handler(DialogHandler.HandlerSettings(callback_processes=1), graph_string=EVENT_VIEW_GRAPH)
+    handler.register_functions({read_event_action: {}, record_score: {}})
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+
+    await handler.handle_event("ping", ChatEvent("hello"))
+    assert active_node.section["seen"] == (7, "hello", 3, "button1", False, False)
+
+    # registered builder wins over default reduction
+    NodetionCbUtils.register_callback_view(ChatEvent, lambda event: NodetionCbUtils.CallbackEventView(id=0, content=event.content.upper(),
+                                                                                                     user=ChatUser(1), data={"custom_id": None}))
+    try:
+        await handler.handle_event("ping", ChatEvent("hello"))
+        assert active_node.section["seen"][:2] == (0, "HELLO")
+    finally:
+        NodetionCbUtils._callback_view_builders.pop(ChatEvent)
+    handler.shutdown_callback_executors()
+
+def test_classify_call_style():
+    async def coro(datapack):
+        pass
+    def plain(datapack):
+        pass
+    def gives_awaitable(datapack) -> typing.Awaitable[None]:
+        return coro(datapack)
+    class AsyncCallable:
+        async def __call__(self, datapack):
+            pass
+    assert NodetionCbUtils.classify_call_style(coro) is CALL_STYLE.COROUTINE
+    assert NodetionCbUtils.classify_call_style(functools.partial(coro)) is CALL_STYLE.COROUTINE
+    assert NodetionCbUtils.classify_call_style(AsyncCallable()) is CALL_STYLE.COROUTINE
+    assert NodetionCbUtils.classify_call_style(plain) is CALL_STYLE.SYNC
+    assert NodetionCbUtils.classify_call_style(gives_awaitable) is CALL_STYLE.SYNC_AWAITABLE
+
+CALL_STYLE_GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        actions:
+        - sneaky_async
+'''
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def sneaky_async(datapack:NodetionCbUtils.CallbackDatapack):
+    async def later():
+        datapack.active_node.ran = True
+    return later()
+
+@pytest.mark.asyncio
+async def test_call_style_recorded_and_corrected():
+    '''test call style is recorded at registration and a sync function found giving back an awaitable is still awaited and reclassified'''
+    handler = setup_handler(graph_string=CALL_STYLE_GRAPH)
+    handler.register_function(sneaky_async)
+    assert handler.get_function_info("blocking_action")["call_style"] is CALL_STYLE.SYNC
+    assert handler.get_function_info("blocking_action")["executor"] == "thread"
+    assert handler.get_function_info("not_registered") is None
+    assert "sneaky_async" in [info["registered_key"] for info in handler.functions_cache.get(CALL_STYLE.SYNC, index_name="call_style", default=[])]
+
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    await handler.handle_event("ping", {})
+    assert active_node.ran
+    assert handler.get_function_info("sneaky_async")["call_style"] is CALL_STYLE.SYNC_AWAITABLE
+    assert "sneaky_async" in [info["registered_key"] for info in handler.functions_cache.get(CALL_STYLE.SYNC_AWAITABLE, index_name="call_style", default=[])]
+    assert "sneaky_async" not in [info["registered_key"] for info in handler.functions_cache.get(CALL_STYLE.SYNC, index_name="call_style", default=[])]
+
+@pytest.mark.asyncio
+async def test_call_style_classified_on_lookup():
+    '''test function put in cache without going through registration gets classified when looked up instead of assumed'''
+    handler = setup_handler(graph_string=CALL_STYLE_GRAPH)
+    handler.functions_cache.add_item("sneaky_async", {"ref": sneaky_async, "permitted_purposes": [POSSIBLE_PURPOSES.ACTION], "registered_key": "sneaky_async"})
+    assert handler.get_function_info("sneaky_async")["call_style"] is CALL_STYLE.SYNC
+    assert "sneaky_async" in [info["registered_key"] for info in handler.functions_cache.get(CALL_STYLE.SYNC, index_name="call_style", default=[])]
+
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    await handler.handle_event("ping", {})
+    assert active_node.ran
+    assert handler.get_function_info("sneaky_async")["call_style"] is CALL_STYLE.SYNC_AWAITABLE
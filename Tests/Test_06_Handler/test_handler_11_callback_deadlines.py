@@ -0,0 +1,111 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.DialogEvents.ExceptionEvent as ExceptionEvent
+import src.utils.CallbackUtils as NodetionCbUtils
+import src.utils.SectionUtils as SectionUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        actions:
+        - hang: 5
+        - record: after hang
+      message:
+        actions:
+        - deadline:
+            seconds: 0.1
+            actions:
+            - record: in deadline
+            - slow: 5
+        - record: after deadline
+      node_error:
+        actions:
+        - record_error
+'''
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION], timeout=0.1)
+async def hang(datapack:NodetionCbUtils.CallbackDatapack):
+    await asyncio.sleep(datapack.base_parameter)
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+async def slow(datapack:NodetionCbUtils.CallbackDatapack):
+    await asyncio.sleep(datapack.base_parameter)
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record(datapack:NodetionCbUtils.CallbackDatapack):
+    if not hasattr(datapack.active_node, "records"):
+        datapack.active_node.records = []
+    datapack.active_node.records.append(datapack.base_parameter)
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_error(datapack:NodetionCbUtils.CallbackDatapack):
+    if not hasattr(datapack.active_node, "records"):
+        datapack.active_node.records = []
+    datapack.active_node.records.append(datapack.event)
+
+def setup_handler(settings=None, graph_string=None):
+    if settings is None:
+        settings = DialogHandler.HandlerSettings()
+    if graph_string is None:
+        graph_string = GRAPH
+    loadded_yaml = yaml.safe_load(graph_string)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=settings)
+    handler.register_functions({hang: {}, slow: {}, record: {}, record_error: {}})
+    return handler
+
+def test_deadline_parsed():
+    handler = setup_handler()
+    actions = handler.graph_node_indexer.get_ref("node1").get_event_actions("message")
+    assert isinstance(actions[0], SectionUtils.DeadlineSubSection)
+    assert actions[0].seconds == 0.1
+    assert [list(action.keys())[0] for action in actions[0].actions] == ["record", "slow"]
+    assert "slow" in handler.graph_node_indexer.get_ref("node1").indexer(["functions"])[1]
+    handler.validate_graph_node("node1")
+
+@pytest.mark.asyncio
+async def test_callback_timeout_goes_to_node_error():
+    '''test callback past its timeout is cancelled and node gets node_error event for it'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    await asyncio.wait_for(handler.handle_event("ping", {}), timeout=2)
+
+    assert len(active_node.records) == 1
+    error_event = active_node.records[0]
+    assert isinstance(error_event, ExceptionEvent.CallbackTimeoutEvent)
+    assert error_event.callback_name == "hang"
+    assert error_event.seconds == 0.1
+    assert error_event.section == "event_actions"
+
+def test_timeout_override_on_register():
+    '''test handler can give a callback a different timeout when registering'''
+    handler = setup_handler()
+    assert handler.register_function(hang, {"timeout": 0.05, "cb_key": "quick_hang"})
+    assert handler.functions_cache.get_ref("quick_hang")["timeout"] == 0.05
+    assert handler.functions_cache.get_ref("hang")["timeout"] == 0.1
+
+@pytest.mark.asyncio
+async def test_deadline_section_timeout():
+    '''test actions in deadline subsection get cancelled together once time is up'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    await asyncio.wait_for(handler.handle_event("message", {}), timeout=2)
+
+    assert active_node.records[0] == "in deadline"
+    assert isinstance(active_node.records[1], ExceptionEvent.CallbackTimeoutEvent)
+    assert active_node.records[1].callback_name == "deadline"
+    assert len(active_node.records) == 2
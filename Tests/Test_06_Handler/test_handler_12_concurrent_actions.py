@@ -0,0 +1,131 @@
+import pytest
+import yaml
+import time
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+import src.utils.SectionUtils as SectionUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        actions:
+        - save_section:
+            key: before
+            value: 0
+        - concurrent:
+          - send:
+              key: winner
+              value: first
+              delay: 0.15
+          - send:
+              key: winner
+              value: second
+              delay: 0.05
+          - send:
+              key: other
+              value: third
+              delay: 0.1
+        - record_section
+      message:
+        actions:
+        - concurrent:
+          - close_me
+          - send:
+              key: other
+              value: sent
+              delay: 0
+        - record_section
+      error:
+        actions:
+        - concurrent:
+          - broken
+          - send:
+              key: other
+              value: sent
+              delay: 0
+      node_error:
+        actions:
+        - record_section
+'''
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+async def send(datapack:NodetionCbUtils.CallbackDatapack):
+    await asyncio.sleep(datapack.base_parameter["delay"])
+    datapack.section_data[datapack.base_parameter["key"]] = datapack.base_parameter["value"]
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def save_section(datapack:NodetionCbUtils.CallbackDatapack):
+    datapack.section_data[datapack.base_parameter["key"]] = datapack.base_parameter["value"]
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_section(datapack:NodetionCbUtils.CallbackDatapack):
+    datapack.active_node.section = dict(datapack.section_data)
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def close_me(datapack:NodetionCbUtils.CallbackDatapack):
+    datapack.control_data["close_node"] = True
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+async def broken(datapack:NodetionCbUtils.CallbackDatapack):
+    raise Exception("broken action")
+
+def setup_handler(settings=None, graph_string=None):
+    if settings is None:
+        settings = DialogHandler.HandlerSettings()
+    if graph_string is None:
+        graph_string = GRAPH
+    loadded_yaml = yaml.safe_load(graph_string)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=settings)
+    handler.register_functions({send: {}, save_section: {}, record_section: {}, close_me: {}, broken: {}})
+    return handler
+
+def test_concurrent_parsed():
+    handler = setup_handler()
+    actions = handler.graph_node_indexer.get_ref("node1").get_event_actions("ping")
+    assert isinstance(actions[1], SectionUtils.ConcurrentSubSection)
+    assert len(actions[1].actions) == 3
+    assert "send" in handler.graph_node_indexer.get_ref("node1").indexer(["functions"])[1]
+    handler.validate_graph_node("node1")
+
+@pytest.mark.asyncio
+async def test_concurrent_actions_overlap_and_merge_in_order():
+    '''test concurrent actions run at the same time and section data changes are merged in listed order, not finishing order'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    start = time.perf_counter()
+    await handler.handle_event("ping", {})
+    assert time.perf_counter() - start < 0.25
+    assert active_node.section == {"before": 0, "winner": "second", "other": "third"}
+
+@pytest.mark.asyncio
+async def test_concurrent_control_data():
+    '''test control data set by one concurrent action is kept'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    await handler.handle_event("message", {})
+    assert active_node.section == {"other": "sent"}
+    assert not active_node.is_active()
+
+@pytest.mark.asyncio
+async def test_concurrent_exception():
+    '''test exception in one concurrent action goes to node_error after others finish, without their changes'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    await handler.handle_event("error", {})
+    assert active_node.section == {}
+    assert active_node.is_active()
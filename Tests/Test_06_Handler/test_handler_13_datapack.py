@@ -0,0 +1,114 @@
+import pytest
+import yaml
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        filters:
+        - pure_check: {value: 1}
+        actions:
+        - grab
+        - grab
+  - id: node2
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        filters:
+        - pure_check: {value: 1}
+  - id: node3
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        filters:
+        - set_override
+        - pure_check: {value: 1}
+'''
+
+pure_calls = []
+grabbed = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER], runtime_input_key="pure_check_override", pure=True)
+def pure_check(datapack:NodetionCbUtils.CallbackDatapack):
+    pure_calls.append(datapack.active_node.graph_node.id)
+    if "pure_check_override" in datapack.section_data:
+        return datapack.section_data.pop("pure_check_override")
+    return datapack.base_parameter["value"] == 1
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER])
+def set_override(datapack:NodetionCbUtils.CallbackDatapack):
+    datapack.section_data["pure_check_override"] = False
+    return True
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def grab(datapack:NodetionCbUtils.CallbackDatapack):
+    grabbed.append((datapack, datapack.section_name, datapack.shared_thing))
+
+def setup_handler():
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=DialogHandler.HandlerSettings())
+    handler.register_functions({pure_check: {}, set_override: {}, grab: {}})
+    handler.pass_to_callbacks["shared_thing"] = "shared"
+    return handler
+
+def test_datapack_extras():
+    extras = {"bot": "bot object"}
+    first = NodetionCbUtils.CallbackDatapack(None, None, None, extras=extras)
+    second = NodetionCbUtils.CallbackDatapack(None, None, None, extras=extras)
+    assert first.bot == "bot object"
+    assert first.extras is second.extras
+    with pytest.raises(AttributeError):
+        first.missing
+    with pytest.raises(AttributeError):
+        first.not_a_slot = 1
+
+def test_freeze_parameter():
+    assert NodetionCbUtils.freeze_parameter({"a": [1, 2]}) == NodetionCbUtils.freeze_parameter({"a": [1, 2]})
+    assert NodetionCbUtils.freeze_parameter([1, 2]) != NodetionCbUtils.freeze_parameter({1: None, 2: None})
+    with pytest.raises(TypeError):
+        NodetionCbUtils.freeze_parameter({"a": {1, 2}})
+
+@pytest.mark.asyncio
+async def test_datapack_reused_in_section():
+    '''test all callbacks in one section get same datapack with handler's extra data'''
+    grabbed.clear()
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    assert len(grabbed) == 2
+    assert grabbed[0][0] is grabbed[1][0]
+    assert grabbed[0][1:] == ("actions", "shared")
+
+@pytest.mark.asyncio
+async def test_pure_filter_memoized_per_dispatch():
+    '''test pure filter only runs once per event for nodes with same parameter, except node that gave it runtime input'''
+    handler = setup_handler()
+    for node_id in ["node1", "node2", "node3"]:
+        await handler.start_at(node_id, "ping", {})
+    pure_calls.clear()
+    await handler.handle_event("ping", {})
+    # one call shared by node1 and node2, one for node3 because of its override
+    assert len(pure_calls) == 2
+    assert "node3" in pure_calls
+    assert handler.get_function_info("pure_check")["pure"]
+    assert len(handler._dispatch_memos) == 0
+
+    pure_calls.clear()
+    await handler.handle_event("ping", {})
+    assert len(pure_calls) == 2
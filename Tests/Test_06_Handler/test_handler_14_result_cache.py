@@ -0,0 +1,81 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        filters:
+        - slow_lookup: 1
+        - user_lookup
+'''
+
+lookups = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER], cache_ttl=0.2)
+def slow_lookup(datapack:NodetionCbUtils.CallbackDatapack):
+    lookups.append("slow_lookup")
+    return True
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER], cache_ttl=60, cache_key=lambda datapack: datapack.event["user"])
+def user_lookup(datapack:NodetionCbUtils.CallbackDatapack):
+    lookups.append(("user_lookup", datapack.event["user"]))
+    return True
+
+def setup_handler():
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=DialogHandler.HandlerSettings())
+    handler.register_functions({slow_lookup: {}, user_lookup: {}})
+    return handler
+
+@pytest.mark.asyncio
+async def test_results_cached_across_events():
+    '''test filter results are reused by later events until they expire, and keyed by what cache key gives'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {"user": 1})
+    lookups.clear()
+    await handler.handle_event("ping", {"user": 1})
+    await handler.handle_event("ping", {"user": 1})
+    assert lookups == ["slow_lookup", ("user_lookup", 1)]
+    await handler.handle_event("ping", {"user": 2})
+    assert lookups[-1] == ("user_lookup", 2)
+
+    stats = handler.get_result_cache_stats()
+    assert stats["hits"] == 3
+    assert stats["by_function"] == {"slow_lookup": 1, "user_lookup": 2}
+
+    lookups.clear()
+    await asyncio.sleep(0.25)
+    await handler.handle_event("ping", {"user": 1})
+    assert lookups == ["slow_lookup"]
+    assert handler.get_result_cache_stats()["expired"] == 1
+
+@pytest.mark.asyncio
+async def test_invalidate_cached_results():
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {"user": 1})
+    await handler.handle_event("ping", {"user": 1})
+    await handler.handle_event("ping", {"user": 2})
+    assert handler.invalidate_cached_results("user_lookup", 2) == 1
+    assert handler.invalidate_cached_results("user_lookup", 2) == 0
+    lookups.clear()
+    await handler.handle_event("ping", {"user": 2})
+    assert lookups == [("user_lookup", 2)]
+
+    assert handler.invalidate_cached_results("user_lookup") == 2
+    assert handler.get_result_cache_stats()["by_function"] == {"slow_lookup": 1}
+    assert handler.invalidate_cached_results() == 1
+    assert len(handler.result_cache) == 0
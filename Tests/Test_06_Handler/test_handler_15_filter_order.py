@@ -0,0 +1,106 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        filters:
+        - expensive
+        - cheap_fail
+      message:
+        filters:
+        - expensive
+        - override_check
+'''
+
+calls = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER])
+async def expensive(datapack:NodetionCbUtils.CallbackDatapack):
+    calls.append("expensive")
+    await asyncio.sleep(0.01)
+    return True
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER])
+def cheap_fail(datapack:NodetionCbUtils.CallbackDatapack):
+    calls.append("cheap_fail")
+    return False
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER], runtime_input_key="override_check_override")
+def override_check(datapack:NodetionCbUtils.CallbackDatapack):
+    calls.append("override_check")
+    return False
+
+def parse_nodes():
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    return nodes
+
+def setup_handler(adaptive=True):
+    settings = DialogHandler.HandlerSettings(adaptive_filter_order=adaptive, filter_order_samples=4)
+    handler = DialogHandler.DialogHandler(graph_nodes=parse_nodes(), settings=settings)
+    handler.register_functions({expensive: {}, cheap_fail: {}, override_check: {}})
+    return handler
+
+@pytest.mark.asyncio
+async def test_order_fixed_after_samples():
+    '''test cheap filter that usually fails is moved to front of "and" list after measuring'''
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    for i in range(4):
+        await handler.handle_event("ping", {})
+    plans = handler.get_filter_plans("node1")
+    assert len(plans) == 1
+    assert plans[0]["fixed"]
+    assert plans[0]["order"] == ["cheap_fail", "expensive"]
+    assert plans[0]["stats"][1]["pass_rate"] == 0
+
+    calls.clear()
+    for i in range(3):
+        await handler.handle_event("ping", {})
+    assert calls == ["cheap_fail"] * 3
+
+@pytest.mark.asyncio
+async def test_runtime_input_keeps_yaml_order():
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    calls.clear()
+    for i in range(5):
+        await handler.handle_event("message", {})
+    assert calls == ["expensive", "override_check"] * 5
+    plans = handler.get_filter_plans("node1")
+    assert not plans[0]["reorderable"]
+    assert not plans[0]["fixed"]
+
+@pytest.mark.asyncio
+async def test_plans_reset_when_graph_node_changes():
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    for i in range(4):
+        await handler.handle_event("ping", {})
+    assert len(handler.get_filter_plans("node1")) == 1
+    handler.add_graph_nodes(parse_nodes(), overwrites_ok=True)
+    assert handler.get_filter_plans("node1") == []
+
+@pytest.mark.asyncio
+async def test_off_by_default():
+    handler = setup_handler(adaptive=False)
+    await handler.start_at("node1", "ping", {})
+    calls.clear()
+    for i in range(5):
+        await handler.handle_event("ping", {})
+    assert calls == ["expensive", "cheap_fail"] * 5
+    assert handler.get_filter_plans() == []
@@ -0,0 +1,102 @@
+import pytest
+import yaml
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+import src.utils.FilterCompiler as FilterCompiler
+import src.utils.SectionUtils as SectionUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        filters:
+        - check: true
+        - or:
+          - check: false
+          - not:
+            - check: false
+        actions:
+        - mark
+      message:
+        filters:
+        - check: true
+        - broken
+'''
+
+calls = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER])
+async def check(datapack:NodetionCbUtils.CallbackDatapack):
+    calls.append(datapack.base_parameter)
+    return datapack.base_parameter
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.FILTER])
+def broken(datapack:NodetionCbUtils.CallbackDatapack):
+    raise Exception("broken filter")
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def mark(datapack:NodetionCbUtils.CallbackDatapack):
+    datapack.active_node.marked = True
+
+def setup_handler(debug=False):
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    settings = DialogHandler.HandlerSettings(compile_filters=True, filter_debug=debug)
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=settings)
+    handler.register_functions({check: {}, broken: {}, mark: {}})
+    return handler
+
+@pytest.mark.asyncio
+async def test_compile_short_circuits_in_order():
+    async def run(func_name, base_parameter):
+        calls.append((func_name, base_parameter))
+        return base_parameter
+    filters = SectionUtils.formatSection([{"check": False}, {"or": [{"check": True}, "other"]}], POSSIBLE_PURPOSES.FILTER)
+    compiled = FilterCompiler.compile_filters(filters, operator="or")
+    calls.clear()
+    assert await compiled.predicate(run)
+    assert calls == [("check", False), ("check", True)]
+    assert compiled.yaml_paths == ["filters[0].check", "filters[1].or[0].check", "filters[1].or[1].other"]
+
+    empty = FilterCompiler.compile_filters([], operator="and")
+    assert await empty.predicate(run)
+
+@pytest.mark.asyncio
+async def test_handler_uses_compiled_filters():
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    calls.clear()
+    await handler.handle_event("ping", {})
+    assert calls == [True, False, False]
+    assert active_node.marked
+    compiled = handler.get_compiled_filter("node1", None, "ping")
+    assert compiled is not None
+    assert compiled.yaml_paths[0] == "node1.events.ping.filters[0].check"
+
+@pytest.mark.asyncio
+async def test_debug_mode_reports_yaml_path():
+    async def run(func_name, base_parameter):
+        raise Exception("broken filter")
+    filters = SectionUtils.formatSection([{"and": ["broken"]}], POSSIBLE_PURPOSES.FILTER)
+    compiled = FilterCompiler.compile_filters(filters, root="node1.events.message.filters", debug=True)
+    with pytest.raises(FilterCompiler.FilterEvaluationError) as error:
+        await compiled.predicate(run)
+    assert error.value.yaml_path == "node1.events.message.filters[0].and[0].broken"
+
+    handler = setup_handler(debug=True)
+    await handler.start_at("node1", "ping", {})
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    # exception from filter fails filters, node stays as it was
+    await handler.handle_event("message", {})
+    assert not hasattr(active_node, "marked")
+    assert handler.get_compiled_filter("node1", None, "message") is not None
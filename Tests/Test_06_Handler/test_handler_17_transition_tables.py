@@ -0,0 +1,74 @@
+import pytest
+import yaml
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.DialogNodes.BaseType as BaseType
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        transitions:
+        - node_names: node3
+        - node_names:
+            node2: 2
+          session_chaining:
+            start: 30
+          schedule_close: node
+  - id: node2
+    TTL: -1
+'''
+
+NODE3 = '''
+nodes:
+  - id: node3
+    TTL: -1
+'''
+
+def parse_nodes(graph_string):
+    loadded_yaml = yaml.safe_load(graph_string)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    return nodes
+
+def test_records_built_on_validation():
+    handler = DialogHandler.DialogHandler(graph_nodes=parse_nodes(GRAPH))
+    handler.validate_graph_node("node1")
+    assert ("node1", "ping") in handler.transition_tables.cache
+    records = handler.get_transition_table(handler.graph_node_indexer.get_ref("node1"), "ping")
+    assert records[0].node_counts == {}
+    assert records[0].missing_nodes == ["node3"]
+    assert records[1].node_counts == {"node2": 2}
+    assert records[1].session_action == "start"
+    assert records[1].session_timeout == 30
+    assert records[1].close_flags == ["node"]
+    with pytest.raises(AttributeError):
+        records[1].other = 1
+
+@pytest.mark.asyncio
+async def test_records_reused_and_rebuilt_for_new_targets(monkeypatch):
+    handler = DialogHandler.DialogHandler(graph_nodes=parse_nodes(GRAPH))
+    handler.validate_graph_node("node1")
+    parse_calls = []
+    original_parse = BaseType.BaseGraphNode.parse_node_names.__func__
+    monkeypatch.setattr(BaseType.BaseGraphNode, "parse_node_names", classmethod(lambda cls, names: parse_calls.append(names) or original_parse(cls, names)))
+
+    await handler.start_at("node1", "ping", {})
+    # first transition goes to node that doesn't exist yet, stops transitions
+    await handler.handle_event("ping", {})
+    await handler.handle_event("ping", {})
+    assert handler.active_node_cache.get_keys("node3", index_name="graph_node", default=[]) == []
+    assert parse_calls == []
+
+    # adding node a transition goes to rebuilds that table so first transition works now
+    handler.add_graph_nodes(parse_nodes(NODE3))
+    assert ("node1", "ping") not in handler.transition_tables.cache
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    assert len(handler.active_node_cache.get_keys("node3", index_name="graph_node", default=[])) > 0
@@ -0,0 +1,86 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        transitions:
+        - node_names:
+            node2: 40
+          session_chaining: chain
+          transition_actions:
+          - record_copy
+  - id: node2
+    TTL: 0.3
+    actions:
+    - record_entered
+'''
+
+copies = []
+entered = []
+order = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.TRANSITION_ACTION])
+def record_copy(datapack:NodetionCbUtils.CallbackDatapack):
+    copies.append((datapack.control_data["copy"], datapack.goal_node.is_active()))
+    order.append("transition")
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_entered(datapack:NodetionCbUtils.CallbackDatapack):
+    entered.append(datapack.active_node)
+    order.append("entered")
+
+def setup_handler(batch_size=16):
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=DialogHandler.HandlerSettings(batch_activation_size=batch_size))
+    handler.register_functions({record_copy: {}, record_entered: {}})
+    return handler
+
+@pytest.mark.asyncio
+async def test_batch_activation():
+    '''test big transition sets up copies together with per copy transition actions and one timeout waiter'''
+    copies.clear()
+    entered.clear()
+    order.clear()
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+
+    # each copy got its own transition actions before any were activated
+    assert copies == [(i, False) for i in range(40)]
+    assert order == ["transition"] * 40 + ["entered"] * 40
+    assert len(entered) == 40
+    node2_keys = handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])
+    assert len(node2_keys) == 40
+    waiter_keys = handler.advanced_event_queue.get_keys("TimeoutWaiter", index_name="task_type", default=[])
+    node2_waiters = [key for key in waiter_keys if len(handler.advanced_event_queue.get_ref(key).timeoutables) == 40]
+    assert len(node2_waiters) == 1
+    for node_key in node2_keys:
+        assert len(handler.get_active_timeout_tracker(handler.active_node_cache.get_ref(node_key))) == 1
+
+    await asyncio.sleep(0.6)
+    assert handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[]) == []
+
+@pytest.mark.asyncio
+async def test_small_transition_one_at_a_time():
+    order.clear()
+    handler = setup_handler(batch_size=100)
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    # without batching, each copy is entered before next copy's transition actions
+    assert order == ["transition", "entered"] * 40
+    assert len(handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])) == 40
@@ -0,0 +1,108 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+import src.utils.AsyncUtils as AsyncUtils
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+    events:
+      ping:
+        transitions:
+        - node_names:
+            node2: 6
+          parallel: 3
+          transition_actions:
+          - slow_prompt
+        schedule_close: node
+      message:
+        transitions:
+        - node_names:
+            node2: 4
+          parallel: true
+          transition_actions:
+          - slow_prompt
+  - id: node2
+    TTL: -1
+    actions:
+    - record_entered
+'''
+
+running = {"now": 0, "max": 0}
+entered = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.TRANSITION_ACTION])
+async def slow_prompt(datapack:NodetionCbUtils.CallbackDatapack):
+    running["now"] += 1
+    running["max"] = max(running["max"], running["now"])
+    await asyncio.sleep(0.05)
+    running["now"] -= 1
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_entered(datapack:NodetionCbUtils.CallbackDatapack):
+    entered.append(datapack.active_node)
+
+def setup_handler(**settings):
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=DialogHandler.HandlerSettings(**settings))
+    handler.register_functions({slow_prompt: {}, record_entered: {}})
+    return handler
+
+@pytest.mark.asyncio
+async def test_gather_with_limit():
+    order = []
+    async def work(num):
+        order.append(("start", num))
+        await asyncio.sleep(0.01)
+        if num == 1:
+            raise ValueError("bad")
+        order.append(("end", num))
+        return num
+
+    results = await AsyncUtils.gather_with_limit([work(0), work(2), work(3)], limit=2)
+    assert results == [0, 2, 3]
+    # third waits for a free spot
+    assert order[:2] == [("start", 0), ("start", 2)]
+
+    order.clear()
+    with pytest.raises(ValueError):
+        await AsyncUtils.gather_with_limit([work(1), work(4)], limit=1)
+    # exception doesn't stop rest from finishing
+    assert ("end", 4) in order
+    results = await AsyncUtils.gather_with_limit([work(1), work(5)], return_exceptions=True)
+    assert isinstance(results[0], ValueError) and results[1] == 5
+
+@pytest.mark.asyncio
+async def test_parallel_transition_respects_limit():
+    running["max"] = 0
+    entered.clear()
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    source = next(iter(handler.active_node_cache.cache.values()))
+    await handler.handle_event("ping", {})
+    assert running["max"] == 3
+    assert running["now"] == 0
+    # everything finished before source node closed
+    assert len(entered) == 6
+    assert len(handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])) == 6
+    assert not source.is_active()
+
+@pytest.mark.asyncio
+async def test_parallel_true_uses_setting_limit():
+    running["max"] = 0
+    handler = setup_handler(parallel_transition_limit=2)
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("message", {})
+    assert running["max"] == 2
+    assert len(handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])) == 4
@@ -0,0 +1,94 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+import src.utils.SessionData as SessionData
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+        session_chaining: start
+    events:
+      ping:
+        transitions:
+        - node_names:
+            node2: 6
+          session_chaining: chain
+        schedule_close: node
+  - id: node2
+    TTL: -1
+    close_actions:
+    - slow_cleanup
+'''
+
+running = {"now": 0, "max": 0, "closed": 0}
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+async def slow_cleanup(datapack:NodetionCbUtils.CallbackDatapack):
+    running["now"] += 1
+    running["max"] = max(running["max"], running["now"])
+    await asyncio.sleep(0.05)
+    running["now"] -= 1
+    running["closed"] += 1
+
+def setup_handler(**settings):
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=DialogHandler.HandlerSettings(**settings))
+    handler.register_functions({slow_cleanup: {}})
+    return handler
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limit,expected_max", [(3, 3), (1, 1)])
+async def test_session_nodes_close_with_limit(monkeypatch, limit, expected_max):
+    running.update({"now": 0, "max": 0, "closed": 0})
+    session_closes = []
+    original_close = SessionData.SessionData.close
+    monkeypatch.setattr(SessionData.SessionData, "close", lambda session: session_closes.append(session) or original_close(session))
+
+    handler = setup_handler(session_close_limit=limit)
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    node_keys = handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])
+    assert len(node_keys) == 6
+    session = handler.active_node_cache.get_ref(node_keys[0]).session
+
+    await handler.close_session(session)
+    assert running["max"] == expected_max
+    assert running["closed"] == 6
+    assert handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[]) == []
+    assert session_closes == [session]
+
+@pytest.mark.asyncio
+async def test_last_node_closing_closes_session_once(monkeypatch):
+    '''closing nodes separately at same time, only the last one to finish ends session'''
+    running.update({"now": 0, "max": 0, "closed": 0})
+    session_closes = []
+    original_close = SessionData.SessionData.close
+    monkeypatch.setattr(SessionData.SessionData, "close", lambda session: session_closes.append(session) or original_close(session))
+
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    nodes = [handler.active_node_cache.get_ref(key) for key in handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])]
+    session = nodes[0].session
+
+    first = asyncio.create_task(handler.close_node(nodes[0]))
+    await asyncio.sleep(0.01)
+    closing = [asyncio.create_task(handler.close_node(node)) for node in nodes[1:]]
+    await first
+    # others were still running close actions when first one finished, so session waits for them
+    assert session.is_active()
+    assert session_closes == []
+    await asyncio.gather(*closing)
+    assert running["closed"] == 6
+    assert session_closes == [session]
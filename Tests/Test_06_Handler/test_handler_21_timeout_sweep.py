@@ -0,0 +1,83 @@
+import pytest
+import yaml
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+import src.utils.SessionData as SessionData
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+        session_chaining: start
+    events:
+      ping:
+        transitions:
+        - node_names:
+            node2: 5
+          session_chaining: chain
+        schedule_close: node
+  - id: node2
+    TTL: 0.2
+    events:
+      timeout:
+        actions:
+        - record_timeout
+'''
+
+timeouts = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_timeout(datapack:NodetionCbUtils.CallbackDatapack):
+    timeouts.append((datapack.active_node, datapack.event["original_timeout"]))
+
+def setup_handler(**settings):
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=DialogHandler.HandlerSettings(**settings))
+    handler.register_functions({record_timeout: {}})
+    return handler
+
+@pytest.mark.asyncio
+async def test_nodes_timing_out_together_share_sweep(monkeypatch):
+    timeouts.clear()
+    session_closes = []
+    original_close = SessionData.SessionData.close
+    monkeypatch.setattr(SessionData.SessionData, "close", lambda session: session_closes.append(session) or original_close(session))
+    handler = setup_handler(timeout_sweep_window=0.05)
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    nodes = [handler.active_node_cache.get_ref(key) for key in handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])]
+    assert len(nodes) == 5
+    # each node still has its own waiter
+    assert len(handler.advanced_event_queue.get_keys("TimeoutWaiter", index_name="task_type", default=[])) >= 5
+
+    await asyncio.sleep(0.5)
+    # every node got its own timeout event with its own timeout
+    assert sorted(id(node) for node, _ in timeouts) == sorted(id(node) for node in nodes)
+    assert all(original_timeout == node.timeout for node, original_timeout in timeouts)
+    assert handler.timeout_sweep_count == 1
+    assert handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[]) == []
+    assert len(session_closes) == 1
+
+@pytest.mark.asyncio
+async def test_lone_timeout_not_swept():
+    timeouts.clear()
+    handler = setup_handler(timeout_sweep_window=0)
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    nodes = [handler.active_node_cache.get_ref(key) for key in handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])]
+    # spread timeouts out so each comes due on its own
+    for num, node in enumerate(nodes):
+        node.timeout = node.timeout + 0.05 * num
+    await asyncio.sleep(0.6)
+    assert len(timeouts) == 5
+    assert handler.timeout_sweep_count == 0
+    assert handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[]) == []
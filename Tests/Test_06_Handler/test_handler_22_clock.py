@@ -0,0 +1,68 @@
+import pytest
+import yaml
+from datetime import datetime, timedelta
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.Clock as Clock
+import src.utils.SessionData as SessionData
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: 30
+    graph_start:
+      ping:
+        session_chaining:
+          start: 60
+'''
+
+class FixedClock(Clock.Clock):
+    def __init__(self, start:float) -> None:
+        self.time = start
+
+    def now(self) -> float:
+        return self.time
+
+@pytest.fixture
+def restore_clock():
+    old_clock = Clock.get_clock()
+    yield
+    Clock.set_clock(old_clock)
+
+def test_default_clock_is_monotonic():
+    assert isinstance(Clock.get_clock(), Clock.MonotonicClock)
+    session = SessionData.SessionData(timeout_duration=timedelta(seconds=5))
+    assert isinstance(session.timeout, float)
+    assert 4 < session.time_left().total_seconds() <= 5
+
+@pytest.mark.asyncio
+async def test_handler_setting_switches_clock(restore_clock):
+    '''test clock in settings is used by that handler only, other handlers and global clock are left alone'''
+    clock = FixedClock(1000.0)
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=DialogHandler.HandlerSettings(clock=clock))
+    other_handler = DialogHandler.DialogHandler(graph_nodes=nodes)
+    assert isinstance(Clock.get_clock(), Clock.MonotonicClock)
+    await handler.start_at("node1", "ping", {})
+    await other_handler.start_at("node1", "ping", {})
+    assert isinstance(Clock.get_clock(), Clock.MonotonicClock)
+    active_node = next(iter(handler.active_node_cache.cache.values()))
+    assert active_node.timeout == 1030.0
+    assert active_node.session.timeout == 1060.0
+    other_node = next(iter(other_handler.active_node_cache.cache.values()))
+    assert abs(other_node.timeout - (Clock.now() + 30)) < 1
+    clock.time = 1010.0
+    with Clock.use_clock(clock):
+        assert Clock.get_clock() is clock
+        assert active_node.time_left() == timedelta(seconds=20)
+    assert Clock.get_clock() is not clock
+    await other_handler.close_node(other_node)
+
+    # wall clock is only worked out for display
+    wall = clock.to_wall(active_node.timeout)
+    assert abs((wall - datetime.utcnow() - timedelta(seconds=20)).total_seconds()) < 1
+    await handler.close_node(active_node)
@@ -0,0 +1,109 @@
+import pytest
+import yaml
+import time
+import asyncio
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+import src.utils.Clock as Clock
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+        session_chaining: start
+    events:
+      ping:
+        transitions:
+        - node_names:
+            node2: 50
+          session_chaining: chain
+  - id: node2
+    TTL: 180
+    events:
+      timeout:
+        actions:
+        - record_timeout
+'''
+
+timeouts = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_timeout(datapack:NodetionCbUtils.CallbackDatapack):
+    timeouts.append(Clock.now())
+
+@pytest.fixture
+def virtual_clock():
+    clock = Clock.VirtualClock(start=100.0)
+    old_clock = Clock.get_clock()
+    yield clock
+    Clock.set_clock(old_clock)
+
+def setup_handler(clock):
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes, settings=DialogHandler.HandlerSettings(clock=clock))
+    handler.register_functions({record_timeout: {}})
+    return handler
+
+@pytest.mark.asyncio
+async def test_virtual_sleep_wakes_in_order(virtual_clock):
+    woken = []
+    async def sleeper(name, seconds):
+        await virtual_clock.sleep(seconds)
+        woken.append((name, virtual_clock.now()))
+    tasks = [asyncio.create_task(sleeper("late", 10)), asyncio.create_task(sleeper("early", 5))]
+    await virtual_clock.advance(4)
+    assert woken == []
+    await virtual_clock.advance(10)
+    assert woken == [("early", 105.0), ("late", 110.0)]
+    assert virtual_clock.now() == 114.0
+    await asyncio.gather(*tasks)
+
+@pytest.mark.asyncio
+async def test_advance_waits_for_work_started_by_wake_up(virtual_clock):
+    '''test tasks a woken sleeper starts get to run and set their own timers before time moves past them, even after a few loop turns'''
+    woken = []
+    async def child():
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await virtual_clock.sleep(1)
+        woken.append(("child", virtual_clock.now()))
+    children = []
+    async def parent():
+        await virtual_clock.sleep(5)
+        woken.append(("parent", virtual_clock.now()))
+        children.append(asyncio.create_task(child()))
+    task = asyncio.create_task(parent())
+    await virtual_clock.advance(10)
+    assert woken == [("parent", 105.0), ("child", 106.0)]
+    await asyncio.gather(task, *children)
+
+@pytest.mark.asyncio
+async def test_timeouts_play_out_in_virtual_time(virtual_clock):
+    timeouts.clear()
+    handler = setup_handler(virtual_clock)
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    assert len(handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])) == 50
+    session = handler.active_node_cache.get_ref(handler.active_node_cache.get_keys("node2", index_name="graph_node")[0]).session
+
+    real_start = time.monotonic()
+    await virtual_clock.run_for(179, tick=30)
+    assert timeouts == []
+    await virtual_clock.run_for(2)
+    assert len(timeouts) == 50
+    assert all(280.0 <= fired <= 281.0 for fired in timeouts)
+    assert handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[]) == []
+
+    # session default TTL of 600 seconds
+    assert session.is_active()
+    await virtual_clock.run_for(600, tick=60)
+    assert not session.is_active()
+    assert time.monotonic() - real_start < 10
@@ -0,0 +1,123 @@
+import pytest
+import yaml
+import time
+import src.DialogHandler as DialogHandler
+import src.DialogNodeParsing as DialogParser
+import src.utils.CallbackUtils as NodetionCbUtils
+import src.utils.Clock as Clock
+from src.utils.Enums import POSSIBLE_PURPOSES
+
+GRAPH = '''
+nodes:
+  - id: node1
+    TTL: -1
+    graph_start:
+      ping:
+        session_chaining:
+          start: 300
+    events:
+      ping:
+        transitions:
+        - node_names:
+            node2: 3
+          session_chaining: chain
+          transition_actions:
+          - mark_copy
+  - id: node2
+    TTL: 120
+    events:
+      message:
+        actions:
+        - record_message
+'''
+
+messages = []
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.TRANSITION_ACTION])
+def mark_copy(datapack:NodetionCbUtils.CallbackDatapack):
+    datapack.goal_node.copy_num = datapack.control_data["copy"]
+
+@NodetionCbUtils.callback_settings(allowed_purposes=[POSSIBLE_PURPOSES.ACTION])
+def record_message(datapack:NodetionCbUtils.CallbackDatapack):
+    messages.append(datapack.active_node.copy_num)
+
+class FixedClock(Clock.Clock):
+    def __init__(self, start:float) -> None:
+        self.time = start
+
+    def now(self) -> float:
+        return self.time
+
+@pytest.fixture
+def fixed_clock():
+    clock = FixedClock(50.0)
+    old_clock = Clock.set_clock(clock)
+    yield clock
+    Clock.set_clock(old_clock)
+
+def setup_handler():
+    loadded_yaml = yaml.safe_load(GRAPH)
+    nodes = {}
+    for node in loadded_yaml["nodes"]:
+        parsed_node = DialogParser.parse_node(node)
+        nodes[parsed_node.id] = parsed_node
+    handler = DialogHandler.DialogHandler(graph_nodes=nodes)
+    handler.register_functions({mark_copy: {}, record_message: {}})
+    return handler
+
+async def close_all(handler):
+    await handler.close_nodes(list(handler.active_node_cache.cache.values()))
+
+@pytest.mark.asyncio
+async def test_snapshot_and_restore(fixed_clock):
+    messages.clear()
+    handler = setup_handler()
+    await handler.start_at("node1", "ping", {})
+    await handler.handle_event("ping", {})
+    node1 = handler.active_node_cache.get_ref(handler.active_node_cache.get_keys("node1", index_name="graph_node")[0])
+    node1.session.data["players"] = ["a", "b"]
+    fixed_clock.time = 80.0
+    snapshot = handler.snapshot()
+    await close_all(handler)
+
+    # restart later on a fresh handler
+    fixed_clock.time = 1000.0
+    restored_handler = setup_handler()
+    restored = restored_handler.restore(snapshot)
+    assert [node.graph_node.id for node in restored] == ["node1", "node2", "node2", "node2"]
+    assert all(node.is_active() for node in restored)
+    # time left is kept, one shared session
+    assert restored[1].timeout == 1000.0 + 90.0
+    session = restored[0].session
+    assert session.timeout == 1000.0 + 270.0
+    assert session.data == {"players": ["a", "b"]}
+    assert all(node.session is session for node in restored)
+    assert session.get_linked_nodes() == restored
+    assert [node.copy_num for node in restored[1:]] == [0, 1, 2]
+    # indices and timeout tracking set up
+    assert len(restored_handler.active_node_cache.get_keys("node2", index_name="graph_node", default=[])) == 3
+    assert all(len(restored_handler.get_active_timeout_tracker(node)) == 1 for node in restored[1:])
+    assert len(restored_handler.get_active_timeout_tracker(session)) == 1
+
+    await restored_handler.handle_event("message", {})
+    assert sorted(messages) == [0, 1, 2]
+    await close_all(restored_handler)
+
+@pytest.mark.asyncio
+async def test_restore_many_nodes_quickly(fixed_clock):
+    handler = setup_handler()
+    snapshot = DialogHandler.pickle.dumps({"version": DialogHandler.DialogHandler.SNAPSHOT_VERSION, "saved_at": None,
+                                           "sessions": [{"time_left": 600, "data": {}}],
+                                           "nodes": [{"graph_node": "node2", "session": 0 if i % 2 else None, "time_left": 120, "state": {"copy_num": i}}
+                                                     for i in range(10000)] + [{"graph_node": "gone", "session": None, "time_left": None, "state": {}}]})
+    start = time.perf_counter()
+    restored = handler.restore(snapshot)
+    assert time.perf_counter() - start < 3
+    assert len(restored) == 10000
+    assert len(handler.active_node_cache) == 10000
+    await close_all(handler)
+
+def test_restore_rejects_other_versions():
+    handler = setup_handler()
+    with pytest.raises(ValueError):
+        handler.restore(DialogHandler.pickle.dumps({"version": 0}))
@@ -3,4 +3,19 @@ class SimpleExceptionEvent(BaseEvent.BaseEvent):
     def __init__(self, event, exception, section):
         self.event = event
         self.exception = exception
-        self.section = section
\ No newline at end of file
+        self.section = section
+
+class CallbackTimeoutError(TimeoutError):
+    '''raised when a callback or a deadline subsection runs past the time it is given. name is the callback's key or "deadline"'''
+    def __init__(self, name, seconds, section_name="") -> None:
+        super().__init__(f"<{name}> in section <{section_name}> did not finish within <{seconds}> seconds")
+        self.name = name
+        self.seconds = seconds
+        self.section_name = section_name
+
+class CallbackTimeoutEvent(SimpleExceptionEvent):
+    '''node_error event for when handling an event was stopped because a callback took too long'''
+    def __init__(self, event, exception:CallbackTimeoutError, section):
+        super().__init__(event, exception, section)
+        self.callback_name = exception.name
+        self.seconds = exception.seconds
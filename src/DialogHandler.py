@@ -5,17 +5,28 @@ import src.utils.LoggingHelper as logHelper
 # asyncs
 import asyncio
 # timed things like TTL
-from datetime import datetime, timedelta
+from datetime import timedelta
 # for identifying if functions are coroutines for callbacks
 import inspect
 # typing annotations to help writing
 import typing
 # copying GraphNode settings to protect objects
 import copy
+import time
 # validating function data
 from jsonschema import validate, ValidationError
 # exception catch with stack trace
 import traceback
+# keys for completed task records
+import itertools
+# ingress queue of events waiting to start
+from collections import deque
+# running blocking callbacks off of event loop
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+# saving and loading active nodes
+import pickle
+import functools
+import contextvars
 
 import src.DialogNodeParsing as nodeParser
 import src.DialogNodes.BaseType as BaseType
@@ -24,13 +35,17 @@ import src.DialogEvents.ExceptionEvent as ExceptionEvent
 
 import src.utils.CallbackUtils as CbUtils
 # annotating function purposes
-from src.utils.Enums import POSSIBLE_PURPOSES, CLEANING_STATE, ITEM_STATUS, TASK_STATE
+from src.utils.Enums import POSSIBLE_PURPOSES, CLEANING_STATE, ITEM_STATUS, TASK_STATE, CALL_STYLE
 import src.utils.SessionData as SessionData
 import src.utils.ValidationUtils as ValidationUtils
 import src.utils.Cache as Cache
 import src.utils.HandlerTasks as HandlerTasks
+import src.utils.WorkerPool as WorkerPool
 import src.utils.TimeString as TimeString
 import src.utils.SectionUtils as SectionUtils
+import src.utils.FilterCompiler as FilterCompiler
+import src.utils.AsyncUtils as AsyncUtils
+import src.utils.Clock as Clock
 
 
 dev_log = logging.getLogger('Dev-Handler-Reporting')
@@ -53,7 +68,6 @@ exec_log.setLevel(logging.DEBUG)
 #TODO: maybe fix cleaning so it doesn't stop if one node excepts? but what to do with that node that excepts when trying to stop and clear?
 #TODO: sessions making sure they work as intended
 #TODO: create modal support
-#TODO: saving and loading active nodes
 #TODO: Templating yaml?
 #TODO: go through code fine sweep for anything that could be changing data meant to be read
 #TODO: during transition order is to section session which closes node which has only one set way to close every time then does transition callbacks.
@@ -67,8 +81,34 @@ exec_log.setLevel(logging.DEBUG)
 #   local broad casting event to subset
 # tracking node execution progress
 
+DISPATCH_MODES = ["tasks", "workers"]
+INGRESS_POLICIES = ["block", "drop_oldest", "drop_type"]
+
+def uses_handler_clock(method):
+    '''run handler method with clock from handler's settings, if it has one. tasks started inside keep using it, everything else in the
+    program keeps its own clock'''
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def clocked_method(self, *args, **kwargs):
+            with Clock.use_clock(self.settings.clock):
+                return await method(self, *args, **kwargs)
+    else:
+        @functools.wraps(method)
+        def clocked_method(self, *args, **kwargs):
+            with Clock.use_clock(self.settings.clock):
+                return method(self, *args, **kwargs)
+    return clocked_method
+
 class HandlerSettings:
-    def __init__(self, log_level="warning", strict_event_order=False, task_age:str="5m") -> None:
+    def __init__(self, log_level="warning", strict_event_order=False, task_age:str="5m", validation_cache_size:typing.Optional[int]=None,
+                 completed_task_limit:typing.Optional[int]=1000, dispatch_mode:str="tasks", worker_count:int=8,
+                 max_events_in_flight:typing.Optional[int]=None, ingress_limit:typing.Optional[int]=None, ingress_policy:str="block",
+                 droppable_events:"typing.Optional[list[str]]"=None, event_priorities:"typing.Optional[dict[str, int]]"=None,
+                 default_priority:int=10, callback_threads:int=4, callback_processes:typing.Optional[int]=None,
+                 result_cache_size:typing.Optional[int]=1024, adaptive_filter_order:bool=False, filter_order_samples:int=20,
+                 compile_filters:bool=False, filter_debug:bool=False, batch_activation_size:int=16,
+                 parallel_transition_limit:int=8, session_close_limit:int=8, timeout_sweep_window:float=0.02,
+                 clock:"typing.Optional[Clock.Clock]"=None) -> None:
         self.log_level = logging.WARNING
         if log_level == "debug":
             self.log_level = logging.DEBUG
@@ -78,7 +118,69 @@ class HandlerSettings:
             self.log_level = logging.ERROR
 
         self.strict_event_order = strict_event_order
+        '''whether events and timeouts are handled one after another in order they came in. each only waits on one before it'''
         self.task_age = TimeString.string_to_timedelta(task_age)
+        self.validation_cache_size = validation_cache_size
+        '''most graph node validation results to hold on to, None for no limit. dropped results are redone next time node is validated'''
+        self.completed_task_limit = completed_task_limit
+        '''most finished tasks to remember, None for no limit. finished tasks are also forgotten after task_age'''
+        if dispatch_mode not in DISPATCH_MODES:
+            raise ValueError(f"dispatch mode <{dispatch_mode}> not one of <{DISPATCH_MODES}>")
+        self.dispatch_mode = dispatch_mode
+        '''how work for each node is run. "tasks" creates a task for every node and session an event reaches. "workers" hands node work
+        to a fixed number of workers instead, work for same session or node still runs in order'''
+        self.worker_count = worker_count
+        '''how many workers run node work at once when dispatch_mode is "workers"'''
+        self.max_events_in_flight = max_events_in_flight
+        '''most events being handled at once, None for no limit. events past this wait in ingress queue'''
+        self.ingress_limit = ingress_limit
+        '''most events that can wait in ingress queue, None for no limit. only used if max_events_in_flight is set'''
+        if ingress_policy not in INGRESS_POLICIES:
+            raise ValueError(f"ingress policy <{ingress_policy}> not one of <{INGRESS_POLICIES}>")
+        self.ingress_policy = ingress_policy
+        '''what to do with a new event when ingress queue is full. "block" makes `submit_event` wait for room and `notify_event` reject
+        the event. "drop_oldest" drops oldest waiting event. "drop_type" drops oldest waiting event that is in droppable_events, events not
+        in that list are never dropped and may go over the limit'''
+        self.droppable_events = set(droppable_events) if droppable_events is not None else set()
+        '''event keys that "drop_type" policy may drop'''
+        self.event_priorities = event_priorities if event_priorities is not None else {}
+        '''event key to priority, lower numbers are handled sooner. "timeout" sets priority of timeout handling. priority matters where
+        work has to wait its turn: events waiting in ingress queue and node work waiting for a worker. work for same node or session still
+        runs in order it was started, and strict_event_order keeps arrival order in ingress queue'''
+        self.default_priority = default_priority
+        '''priority of events not listed in event_priorities'''
+        self.callback_threads = callback_threads
+        '''size of thread pool that runs callbacks registered with executor "thread"'''
+        self.callback_processes = callback_processes
+        '''size of process pool that runs callbacks registered with executor "process", None for number of CPUs'''
+        self.result_cache_size = result_cache_size
+        '''most filter results kept for callbacks registered with a cache_ttl, None for no limit. least recently used are dropped first'''
+        self.adaptive_filter_order = adaptive_filter_order
+        '''if and/or lists of filters are reordered so filters that are cheap and likely to decide result run first. handler measures
+        each list for filter_order_samples runs, rotating which filter goes first, then fixes order until graph node is changed. lists
+        with filters that take runtime input are always run in yaml order since filters before them may be giving that input'''
+        self.filter_order_samples = filter_order_samples
+        '''how many times a filter list is run to measure its filters before its order is fixed'''
+        self.compile_filters = compile_filters
+        '''if filter lists are turned into generated functions the first time they run instead of walking nested lists every time. not
+        used for lists adaptive_filter_order is measuring or reordering, or filters in `if` actions'''
+        self.filter_debug = filter_debug
+        '''if exceptions from compiled filters say where in yaml filter is, costs a little extra per filter call'''
+        self.batch_activation_size = batch_activation_size
+        '''transitions making at least this many copies of one node set them up together: transition actions run for every copy first,
+        then copies are activated and registered all at once and share one timeout waiter. smaller transitions finish each copy before
+        starting next'''
+        self.parallel_transition_limit = parallel_transition_limit
+        '''how many next nodes a transition marked `parallel: true` sets up at the same time'''
+        self.session_close_limit = session_close_limit
+        '''how many nodes are closed at the same time when closing many at once, clearing session history or closing nodes that timed out
+        together. 1 closes them one after another'''
+        self.timeout_sweep_window = timeout_sweep_window
+        '''seconds handler waits after a node times out to collect other nodes timing out around same time, all of them are handled as one
+        sweep. 0 only collects nodes that time out in the same loop tick'''
+        self.clock = clock
+        '''clock for this handler's deadlines and timestamps, None uses global one (monotonic by default). handler's public methods and
+        tasks they start use it, other handlers and code outside aren't affected. see `Clock.use_clock` for using it outside handler'''
         # settings below still experimental
         self.timeout_cut = False
         '''EXPERIMENTAL
@@ -90,11 +192,36 @@ class RunNodeEventOutput:
         '''None means not specified or at a point that it doesn't matter. False is did not say to close, True is need to close'''
         self.close_session=close_session
 
+class TransitionRecord:
+    '''one transition from yaml with everything that doesn't change between events worked out ahead of time'''
+    __slots__ = ("index", "named_counts", "node_counts", "missing_nodes", "counters", "filters", "actions", "session_action", "session_timeout", "close_flags",
+                 "parallel")
+
+    def __init__(self, index:int, transition:dict, existing_nodes) -> None:
+        self.index = index
+        '''position of transition in event's list'''
+        self.named_counts:"dict[str, int]" = BaseType.BaseGraphNode.parse_node_names(transition["node_names"])
+        '''node name to copies to create, as written in yaml. given to counters to change'''
+        self.node_counts:"dict[str, int]" = {name: count for name, count in self.named_counts.items() if name in existing_nodes}
+        '''named_counts without nodes handler doesn't have'''
+        self.missing_nodes:"list[str]" = [name for name in self.named_counts if name not in existing_nodes]
+        self.counters:typing.Optional[list] = transition.get("transition_counters")
+        self.filters:typing.Optional[list] = transition.get("transition_filters")
+        self.actions:list = transition["transition_actions"]
+        session_chaining = transition.get("session_chaining")
+        self.session_action:str = "end" if session_chaining is None else session_chaining if isinstance(session_chaining, str) else list(session_chaining.keys())[0]
+        self.session_timeout = None if session_chaining is None or isinstance(session_chaining, str) else list(session_chaining.values())[0]
+        self.close_flags:list = transition.get("schedule_close", [])
+        self.parallel:typing.Union[bool, int] = transition.get("parallel", False)
+        '''False to set up next nodes one after another, True or a limit on how many at once to set them up side by side'''
+
 class DialogHandler():
     NON_BROADCAST_EVENTS = ["timeout", "node_error", "node_warning"]
     '''event names that will never be used as a broadcast. only ever sent to subset of node(s)'''
     def __init__(self, graph_nodes:"typing.Optional[dict[str, BaseType.BaseGraphNode]]"=None, functions=None, settings:HandlerSettings=None, pass_to_callbacks=None, **kwargs) -> None:
         dev_log.info(f"dialog handler being initialized, id is <{id(self)}>")
+        self.settings = settings if settings is not None else HandlerSettings()
+
         self.graph_node_indexer = Cache.MultiIndexer(
                 cache=graph_nodes,
                 input_secondary_indices=[
@@ -107,7 +234,8 @@ class DialogHandler():
         dev_log.debug(f"loaded nodes' names are {self.graph_node_indexer.cache.keys()}")
 
         self.functions_cache = Cache.MultiIndexer(cache=functions, input_secondary_indices=[
-                Cache.FieldValueIndex("permitted_purposes", keys_value_finder=lambda function: function["permitted_purposes"])
+                Cache.FieldValueIndex("permitted_purposes", keys_value_finder=lambda function: function["permitted_purposes"]),
+                Cache.FieldValueIndex("call_style", keys_value_finder=lambda function: [function["call_style"]] if "call_style" in function else [])
             ]
         )
         '''store of functions this handler is allowed to call. other handlers linking to same list is ok and on dev to handle.
@@ -129,21 +257,85 @@ class DialogHandler():
                 Cache.FieldValueIndex("task_type", keys_value_finder=lambda x: [x.type]),
                 Cache.FieldValueIndex("session_id", keys_value_finder=lambda x: [self.get_session_key(x.session)] if x.type == "SessionEventTask" else []),
                 Cache.FieldValueIndex("node_id", keys_value_finder=lambda x: [self.get_active_node_key(x.active_node)] if x.type == "NodeEventTask" else []),
-                Cache.FieldValueIndex("session_waiters", keys_value_finder=lambda x: [self.get_session_key(x.timeoutable)] if x.type == "TimeoutWaiter" and isinstance(x.timeoutable, SessionData.SessionData) else []),
-                Cache.FieldValueIndex("node_waiters", keys_value_finder=lambda x: [self.get_active_node_key(x.timeoutable)] if x.type == "TimeoutWaiter" and issubclass(x.timeoutable.__class__, BaseType.BaseNode) else []),
-                Cache.FieldValueIndex("session_timeouts", keys_value_finder=lambda x: [self.get_session_key(x.timeoutable)] if x.type == "SessionTimeoutTask" else []),
-                Cache.FieldValueIndex("node_timeouts", keys_value_finder=lambda x: [self.get_active_node_key(x.timeoutable)] if x.type == "NodeTimeoutTask" else [])
+                Cache.FieldValueIndex("session_waiters", keys_value_finder=lambda x: [self.get_session_key(item) for item in x.timeoutables if isinstance(item, SessionData.SessionData)] if x.type == "TimeoutWaiter" else []),
+                Cache.FieldValueIndex("node_waiters", keys_value_finder=lambda x: [self.get_active_node_key(item) for item in x.timeoutables if issubclass(item.__class__, BaseType.BaseNode)] if x.type == "TimeoutWaiter" else []),
+                Cache.FieldValueIndex("session_timeouts", keys_value_finder=lambda x: [self.get_session_key(item) for item in x.timeoutables] if x.type == "SessionTimeoutTask" else []),
+                Cache.FieldValueIndex("node_timeouts", keys_value_finder=lambda x: [self.get_active_node_key(item) for item in x.timeoutables] if x.type == "NodeTimeoutTask" else [])
             ]
         )
-        '''consolidated list of tasks to do by handler'''
+        '''consolidated list of tasks to do by handler. tasks remove themselves when they finish, see `_retire_task`'''
 
-        self.graph_node_validation_status = Cache.MultiIndexer()
+        self.completed_tasks = Cache.MultiIndexer(
+            cache=Cache.BoundedCache(max_size=self.settings.completed_task_limit, max_age=self.settings.task_age),
+            input_secondary_indices=[
+                Cache.FieldValueIndex("task_type", keys_value_finder=lambda x: [x.type])
+            ]
+        )
+        '''ring of records of recently finished tasks, oldest dropped first when full or past settings.task_age. for debugging and metrics'''
+        self._completed_task_keys = itertools.count()
+        self.retired_task_count = 0
+        '''total number of tasks that have finished and left advanced_event_queue'''
+        self._event_sequence = itertools.count()
+        '''source of order numbers for event and timeout tasks. numbers show order tasks were queued in, kept in completed task records'''
+        self._last_event_task:typing.Optional[HandlerTasks.HandlerTask] = None
+        '''most recent event task that is still pending. under strict ordering next event waits only on this'''
+        self.ingress_queue = HandlerTasks.IngressQueue()
+        '''events waiting for room under settings.max_events_in_flight, by priority then oldest first'''
+        self._ingress_space_waiters:"deque[asyncio.Future]" = deque()
+        '''`submit_event` calls blocked on a full ingress queue'''
+        self.events_in_flight = 0
+        self.ingress_rejected_count = 0
+        self.ingress_dropped_count = 0
+        self._last_timeout_task:typing.Optional[HandlerTasks.HandlerTask] = None
+        '''most recent timeout task that is still pending. under strict ordering next timeout waits on this and latest event'''
+        self.timeout_sweep:typing.Optional[dict] = None
+        '''sweep collecting nodes that timed out, has `nodes` to handle together and `future` done when they are handled. None when
+        nothing is collecting'''
+        self.timeout_sweep_count = 0
+        '''number of sweeps that handled more than one node'''
+
+        self.graph_node_validation_status = Cache.MultiIndexer(cache=Cache.BoundedCache(max_size=self.settings.validation_cache_size))
         '''stores information about status of validation of the definitions of graph nodes read from yaml. make sure this is always up to date of any changes to graph node settings'''
 
-        self.settings = settings if settings is not None else HandlerSettings()
-
         self.cleaning_task = None
 
+        self.worker_pool:typing.Optional[WorkerPool.LanedWorkerPool] = None
+        '''runs node work when settings say to dispatch to workers. lanes are sessions, or nodes without sessions'''
+        if self.settings.dispatch_mode == "workers":
+            self.worker_pool = WorkerPool.LanedWorkerPool(worker_count=self.settings.worker_count)
+
+        self.callback_thread_pool:typing.Optional[ThreadPoolExecutor] = None
+        '''runs callbacks registered with executor "thread". created first time one is needed'''
+        self.callback_process_pool:typing.Optional[ProcessPoolExecutor] = None
+        '''runs callbacks registered with executor "process". created first time one is needed'''
+        self._dispatch_memos:"dict[int, list]" = {}
+        '''id of event being dispatched to [number of dispatches of it going on, results of pure filters for it]'''
+        self.result_cache = Cache.MultiIndexer(cache=Cache.BoundedCache(max_size=self.settings.result_cache_size), input_secondary_indices=[
+                Cache.FieldValueIndex("function", keys_value_finder=lambda entry: [entry["function"]])
+            ]
+        )
+        '''(function key, cache key) to dict of filter's `result`, name of `function`, and time it `expires`. kept across events for
+        functions registered with a cache_ttl'''
+        self.expired_results = 0
+        '''count of cached results found too old when looked up'''
+        self.filter_plans = Cache.MultiIndexer(input_secondary_indices=[
+                Cache.FieldValueIndex("graph_node", keys_value_finder=lambda plan: [plan["graph_node"]])
+            ]
+        )
+        '''id of filter list in a graph node to order handler runs it in when adaptive_filter_order is on, with measurements it is based on'''
+        self.compiled_filters = Cache.MultiIndexer(input_secondary_indices=[
+                Cache.FieldValueIndex("graph_node", keys_value_finder=lambda entry: [entry["graph_node"]])
+            ]
+        )
+        '''graph node id and location of filter list in it to `CompiledFilter` made from it when compile_filters is on'''
+        self.transition_tables = Cache.MultiIndexer(input_secondary_indices=[
+                Cache.FieldValueIndex("graph_node", keys_value_finder=lambda table: [table["graph_node"]]),
+                Cache.FieldValueIndex("targets", keys_value_finder=lambda table: table["targets"])
+            ]
+        )
+        '''(graph node id, event) to `records` list of TransitionRecords for event and all node names they go to as `targets`. made when
+        node is validated or first time it is needed, dropped when graph node or any node it goes to is added or changed'''
+
         self.register_module(BaseFuncs)
 
         self.pass_to_callbacks = pass_to_callbacks if pass_to_callbacks else {}
@@ -178,6 +370,7 @@ class DialogHandler():
          dev note: assumed handler is now responsible for the objects passed in'''
         #TODO: second pass ok and debug running
         for node_id, node in node_list.items():
+            self._drop_transition_tables(node.id)
             if node.id in self.graph_node_indexer:
                 if overwrites_ok:
                     # make sure to update existing active nodes. since active node has direct reference to the graph node
@@ -195,6 +388,9 @@ class DialogHandler():
                     exec_log.info(f"updated node {node.id}")
                     self.graph_node_indexer.set_item(node.id, node)
                     self.graph_node_validation_status.remove_item(node_id)
+                    self.reset_filter_plans(node.id)
+                    for compiled_key in self.compiled_filters.get_keys(node.id, index_name="graph_node", default=[]):
+                        self.compiled_filters.remove_item(compiled_key)
                 else:
                     # possible exception, want to have setting for whether or not it gets thrown
                     exec_log.warning(f"tried adding <{node.id}>, but is duplicate. ignoring it.")
@@ -232,9 +428,37 @@ class DialogHandler():
             warning_list = []
             for function_section in function_sections_info:
                 warning_list.extend(self.validate_function_list(function_section))
-            self.graph_node_validation_status.add_item(graph_node_name, {"yaml_warnings": warning_list}) 
+            self.graph_node_validation_status.add_item(graph_node_name, {"yaml_warnings": warning_list})
+        for event_key in graph_node.events:
+            self.get_transition_table(graph_node, event_key)
         return next_nodes
 
+    def get_transition_table(self, graph_node:BaseType.BaseGraphNode, event_key:str):
+        '''get records for transitions of graph node on event, building them if they aren't made yet
+
+        Returns
+        ---
+        `list[TransitionRecord]` in order they are listed in yaml'''
+        table_key = (graph_node.id, event_key)
+        if table_key in self.transition_tables.cache:
+            return self.transition_tables.get_ref(table_key)["records"]
+        records = [TransitionRecord(index, transition, self.graph_node_indexer.cache)
+                   for index, transition in enumerate(graph_node.get_transitions(event_key))]
+        targets = set()
+        for record in records:
+            targets.update(record.named_counts.keys())
+            for node_name in record.missing_nodes:
+                exec_log.warning(f"handler id'd <{id(self)}> node <{graph_node.id}> event <{event_key}> transition <{record.index}> transition to <{node_name}> transition won't work, goal node doesn't exist.")
+        self.transition_tables.add_item(table_key, {"graph_node": graph_node.id, "targets": list(targets), "records": records})
+        return records
+
+    def _drop_transition_tables(self, node_id:str):
+        '''forget transition records of node and of nodes that transition to it, they are rebuilt next time they are needed'''
+        table_keys = set(self.transition_tables.get_keys(node_id, index_name="graph_node", default=[]))
+        table_keys.update(self.transition_tables.get_keys(node_id, index_name="targets", default=[]))
+        for table_key in table_keys:
+            self.transition_tables.remove_item(table_key)
+
     def validate_function_list(self, function_section_info:ValidationUtils.FunctionSectionInfo):
             func_list = function_section_info.function_list
             node_id = function_section_info.node_id
@@ -252,6 +476,12 @@ class DialogHandler():
                         if_action_warnings = self.validate_function_list(ValidationUtils.FunctionSectionInfo(callback.actions, node_id, purpose, string_rep+" actions for if statement", event_type=event_type))
                         warning_list.extend(if_filter_warnings)
                         warning_list.extend(if_action_warnings)
+                    elif isinstance(callback, SectionUtils.DeadlineSubSection):
+                        deadline_warnings = self.validate_function_list(ValidationUtils.FunctionSectionInfo(callback.actions, node_id, purpose, string_rep+" actions for deadline", event_type=event_type))
+                        warning_list.extend(deadline_warnings)
+                    elif isinstance(callback, SectionUtils.ConcurrentSubSection):
+                        concurrent_warnings = self.validate_function_list(ValidationUtils.FunctionSectionInfo(callback.actions, node_id, purpose, string_rep+" concurrent actions", event_type=event_type))
+                        warning_list.extend(concurrent_warnings)
                     elif issubclass(callback.__class__, SectionUtils.LogicOpSubSection):
                         subsection_warnings = self.validate_function_list(ValidationUtils.FunctionSectionInfo(callback.callbacks, node_id, purpose, string_rep, event_type=event_type))
                         warning_list.extend(subsection_warnings)
@@ -333,7 +563,8 @@ class DialogHandler():
             function works in handler. see CallbackUtils for settings
         * override_settings -  `dict[str, Any]`
             dict holding setting name to settings this handler should override function's default ones with. currently only looks for
-            'allowed_purposes' and 'cb_key'
+            'allowed_purposes', 'cb_key', 'executor', 'timeout', 'pure', 'cache_ttl', 'cache_key', and 'call_style'. call_style is found from how function is defined, override
+            with a `CALL_STYLE` if function returns an awaitable without being annotated to
             
         Return
         ---
@@ -360,10 +591,27 @@ class DialogHandler():
                                         f"If trying to register a different function than what is registered already, change the key you are registering with. "+ \
                                         "Be aware yaml has to match the key registered with")
 
+        executor = getattr(func, "executor", None)
+        if "executor" in override_settings:
+            executor = override_settings["executor"]
+        if executor not in CbUtils.CALLBACK_EXECUTORS:
+            exec_log.warning(f"dialog handler tried registering function <{func.__name__}> with executor <{executor}>, not one of <{CbUtils.CALLBACK_EXECUTORS}>")
+            return False
+        call_style = override_settings.get("call_style", CbUtils.classify_call_style(func))
+        if executor is not None and call_style is CALL_STYLE.COROUTINE:
+            # coroutines already give up event loop while waiting, and a thread can't await them
+            exec_log.warning(f"dialog handler registering coroutine function <{func.__name__}> with executor <{executor}>, will run it on event loop instead")
+            executor = None
+
         dev_log.debug(f"handler id'd {id(self)} registered callback <{func}> with key <{cb_key}> {'same as default,' if cb_key == func.cb_key else 'overridden,'} for purposes: " +\
-                            f"<{[purpose.name for purpose in permitted_purposes]}> {'same as default' if permitted_purposes == func.allowed_purposes else 'overridden'}")
+                            f"<{[purpose.name for purpose in permitted_purposes]}> {'same as default' if permitted_purposes == func.allowed_purposes else 'overridden'}, executor <{executor}>, call style <{call_style.value}>")
         #TODO: this needs upgrading if doing qualified names
-        self.functions_cache.add_item(cb_key, {"ref": func, "permitted_purposes": permitted_purposes, "registered_key": cb_key})
+        timeout = override_settings.get("timeout", getattr(func, "timeout", None))
+        pure = override_settings.get("pure", getattr(func, "pure", False))
+        cache_ttl = override_settings.get("cache_ttl", getattr(func, "cache_ttl", None))
+        cache_key = override_settings.get("cache_key", getattr(func, "cache_key", None))
+        self.functions_cache.add_item(cb_key, {"ref": func, "permitted_purposes": permitted_purposes, "registered_key": cb_key, "executor": executor,
+                                               "timeout": timeout, "call_style": call_style, "pure": pure, "cache_ttl": cache_ttl, "cache_key": cache_key})
         return True
 
     def register_functions(self, function_overrides):
@@ -389,6 +637,34 @@ class DialogHandler():
         to overrides, and only those funcitons from module are registered'''
         return self.register_functions(module.dialog_func_info)
 
+    def get_function_info(self, func_key:str):
+        '''settings handler uses for running a registered function, for debugging and profiling
+
+        Returns
+        ---
+        `dict` with `permitted_purposes`, `executor`, `timeout`, `pure`, `cache_ttl`, and `call_style` of function as registered, None if function isn't registered'''
+        if func_key not in self.functions_cache:
+            return None
+        func_info = self.functions_cache.get_ref(func_key)
+        return {
+            "permitted_purposes": list(func_info["permitted_purposes"]),
+            "executor": func_info.get("executor"),
+            "timeout": func_info.get("timeout"),
+            "pure": func_info.get("pure", False),
+            "cache_ttl": func_info.get("cache_ttl"),
+            "call_style": self._get_call_style(func_key, func_info)
+        }
+
+    def _get_call_style(self, func_key:str, func_info:dict) -> CALL_STYLE:
+        '''call style function was registered with. functions that got into cache without going through `register_function` are
+        classified now and their info updated, so they are indexed by call style like the rest'''
+        if "call_style" not in func_info:
+            dev_log.debug(f"handler id'd <{id(self)}> function <{func_key}> has no call style recorded, classifying it now")
+            old_secondary_keys = self.functions_cache.get_all_secondary_keys(func_key)
+            func_info["call_style"] = CbUtils.classify_call_style(func_info["ref"])
+            self.functions_cache.set_item(func_key, func_info, old_secondary_keys)
+        return func_info["call_style"]
+
     def function_is_permitted(self, func_key:str, purpose:POSSIBLE_PURPOSES, escalate_errors=False):
         '''
         Checks if function is allowed to run for the given section.
@@ -416,6 +692,7 @@ class DialogHandler():
     ################################################################################################
     ################################################################################################'''
 
+    @uses_handler_clock
     async def start_at(self, node_id:str, event_key:str, event):
         '''start the graph execution at the given node with given event. checks if node exists and operation is allowed.'''
         # keeping this separate from event handling process to reduce work per event 
@@ -466,7 +743,7 @@ class DialogHandler():
         try:
             await self._run_actions_on_node(active_node, event_key, event, version="start")
             dev_log.debug(f"dialog handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{node_id}> event <{id(event)}><{event_key}> starting custom filter process")
-            start_filters_result = self._run_filters_on_node(active_node, event_key, event, version="start")
+            start_filters_result = await self._run_filters_on_node(active_node, event_key, event, version="start")
             dev_log.debug(f"dialog handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{node_id}> event <{id(event)}><{event_key}> start_at finished filter process. passed? <{start_filters_result}>")
         except Exception as e:
             start_filters_result = False
@@ -481,22 +758,149 @@ class DialogHandler():
         await self._track_new_active_node(active_node, event)
         exec_log.info(f"started active version of <{node_id}>, unique id is <{self.get_active_node_key(active_node)}>")
 
-    async def handle_event(self, event_key:str, event):
+    @uses_handler_clock
+    async def handle_event(self, event_key:str, event, priority:typing.Optional[int]=None):
         '''entrypoint for event happening and getting node responses to event. Once handler is notified, it sends out the event info
-        to all nodes that are waiting for that type of event.
+        to all nodes that are waiting for that type of event. If handler limits events in flight, this waits for event's turn as well
 
         Parameters
         ---
         event_key - `str`
             the key used internally for what the event is
         event - `Any`
-            the actual event data. handler itself doesn't care about what type it is, just make sure all the types of callback 
-            specified via yaml can handle that type of event'''
-        task = self._create_handle_event_task(event_type=event_key, event=event)
+            the actual event data. handler itself doesn't care about what type it is, just make sure all the types of callback
+            specified via yaml can handle that type of event
+        priority - `Optional[int]`
+            priority for this event, lower is sooner. defaults to what settings have for event key'''
+        task = await self.submit_event(event_key, event, priority=priority)
         await task
 
-    def notify_event(self, event_key, event):
-        return self._create_handle_event_task(event_type=event_key, event=event)
+    @uses_handler_clock
+    def notify_event(self, event_key, event, priority:typing.Optional[int]=None):
+        '''schedule event for handling without waiting. returns awaitable that finishes when event is done being handled. If handler
+        limits events in flight and ingress queue is full under "block" policy, event is rejected and awaitable is already finished with None'''
+        awaitable = self._offer_event(event_key, event, self.get_event_priority(event_key, priority))
+        if awaitable is None:
+            self.ingress_rejected_count += 1
+            exec_log.warning(f"handler id'd <{id(self)}> ingress queue full, rejected event <{id(event)}><{event_key}>")
+            awaitable = asyncio.get_running_loop().create_future()
+            awaitable.set_result(None)
+        return awaitable
+
+    @uses_handler_clock
+    async def submit_event(self, event_key, event, priority:typing.Optional[int]=None):
+        '''schedule event for handling, waiting for room in ingress queue if it is full under "block" policy. returns awaitable that
+        finishes when event is done being handled, or with None if event was dropped before handling started'''
+        priority = self.get_event_priority(event_key, priority)
+        while True:
+            awaitable = self._offer_event(event_key, event, priority)
+            if awaitable is not None:
+                return awaitable
+            waiter = asyncio.get_running_loop().create_future()
+            self._ingress_space_waiters.append(waiter)
+            await waiter
+
+    '''#############################################################################################
+    ################################################################################################
+    ####                                       EVENT ADMISSION SECTION
+    ################################################################################################
+    ################################################################################################'''
+
+    def get_event_priority(self, event_key, priority:typing.Optional[int]=None):
+        '''priority to use for event, priority given by caller wins over settings'''
+        if priority is not None:
+            return priority
+        return self.settings.event_priorities.get(event_key, self.settings.default_priority)
+
+    def _offer_event(self, event_type, event, priority:int):
+        '''start event now if there's room, otherwise put it in ingress queue following settings' policy.
+
+        Returns
+        ---
+        awaitable for event being handled, None if queue is full and policy is to block'''
+        max_in_flight = self.settings.max_events_in_flight
+        if max_in_flight is None or (self.events_in_flight < max_in_flight and len(self.ingress_queue) == 0):
+            return self._start_event(event_type, event, priority)
+        if self.settings.ingress_limit is not None and len(self.ingress_queue) >= self.settings.ingress_limit:
+            if self.settings.ingress_policy == "block":
+                return None
+            if self.settings.ingress_policy == "drop_oldest":
+                self._drop_pending_event(self.ingress_queue.pop_least_urgent())
+            elif self.settings.ingress_policy == "drop_type":
+                droppable = next((pending for pending in self.ingress_queue if pending.event_type in self.settings.droppable_events), None)
+                if droppable is not None:
+                    self.ingress_queue.remove(droppable)
+                    self._drop_pending_event(droppable)
+                elif event_type in self.settings.droppable_events:
+                    # nothing older to make room with and this one is allowed to be dropped
+                    self.ingress_dropped_count += 1
+                    dev_log.info(f"handler id'd <{id(self)}> ingress queue full, dropped new event <{id(event)}><{event_type}>")
+                    dropped = asyncio.get_running_loop().create_future()
+                    dropped.set_result(None)
+                    return dropped
+        # strict ordering means no cutting in line, everything waits as one class
+        queued_priority = self.settings.default_priority if self.settings.strict_event_order else priority
+        pending = HandlerTasks.PendingEvent(event_type, event, asyncio.get_running_loop().create_future(), priority=queued_priority)
+        self.ingress_queue.append(pending)
+        dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_type}> waiting in ingress queue, depth <{len(self.ingress_queue)}>")
+        return pending.future
+
+    def _start_event(self, event_type, event, priority:int):
+        task = self._create_handle_event_task(event_type=event_type, event=event, priority=priority)
+        if self.settings.max_events_in_flight is not None:
+            task.admitted = True
+            self.events_in_flight += 1
+        return task
+
+    def _drop_pending_event(self, pending:HandlerTasks.PendingEvent):
+        self.ingress_dropped_count += 1
+        dev_log.info(f"handler id'd <{id(self)}> ingress queue full, dropped waiting event <{id(pending.event)}><{pending.event_type}>")
+        if not pending.future.done():
+            pending.future.set_result(None)
+
+    def _admit_pending_events(self):
+        '''start events waiting in ingress queue while there is room. called whenever an admitted event finishes'''
+        while len(self.ingress_queue) > 0 and self.events_in_flight < self.settings.max_events_in_flight:
+            pending = self.ingress_queue.popleft()
+            self._wake_ingress_waiter()
+            if pending.future.done():
+                # caller gave up on it
+                continue
+            task = self._start_event(pending.event_type, pending.event, pending.priority)
+            task.add_done_callback(lambda task, future=pending.future: self._resolve_pending_future(task, future))
+
+    def _resolve_pending_future(self, task:HandlerTasks.HandleEventTask, future:asyncio.Future):
+        if future.done():
+            return
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def _wake_ingress_waiter(self):
+        while len(self._ingress_space_waiters) > 0:
+            waiter = self._ingress_space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def get_ingress_metrics(self):
+        '''numbers on events waiting to be handled
+
+        Returns
+        ---
+        `dict[str, int]` - `ingress_depth` events waiting in queue, `events_in_flight` events being handled that count against limit,
+        `blocked_submitters` callers waiting for room in queue, `rejected` events turned away because queue was full under block policy,
+        `dropped` events dropped by drop policies'''
+        return {
+            "ingress_depth": len(self.ingress_queue),
+            "events_in_flight": self.events_in_flight,
+            "blocked_submitters": len([waiter for waiter in self._ingress_space_waiters if not waiter.done()]),
+            "rejected": self.ingress_rejected_count,
+            "dropped": self.ingress_dropped_count
+        }
 
     '''#############################################################################################
     ################################################################################################
@@ -513,7 +917,7 @@ class DialogHandler():
         #TODO: custom exception handling could be expanded depending on use
         debugging_phase = "event_filters"
         # try: #try catch around whole event running, got tired of it being hard to trace Exceptions so removed
-        filter_result = self._run_filters_on_node(active_node, event_key, event)
+        filter_result = await self._run_filters_on_node(active_node, event_key, event)
         if not filter_result:
             exec_log.info(f"node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> failed filter stage")
             return RunNodeEventOutput()
@@ -530,6 +934,8 @@ class DialogHandler():
         except Exception as e:
             exec_log.warning(f"failed to handle event <{event_key}> <{id(event)}> on node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> at stage {debugging_phase}")
             print(traceback.format_exc())
+            if isinstance(e, ExceptionEvent.CallbackTimeoutError):
+                return await self._run_event_on_node(active_node=active_node, event_key="node_error", event=ExceptionEvent.CallbackTimeoutEvent(event=event, exception=e, section=debugging_phase))
             return await self._run_event_on_node(active_node=active_node, event_key="node_error", event=ExceptionEvent.SimpleExceptionEvent(event=event, exception=e, section=debugging_phase))
 
         # checking if should close after event, combine event schedule_close flag and what was returned fron transitions
@@ -550,7 +956,7 @@ class DialogHandler():
         #     print(exc_type, fname, exc_tb.tb_lineno)
         #     dialog_logger.info(f"exception on handling event on node <{self.get_active_node_key(active_node)}> node details: <{vars(active_node)}> exception:<{e}>")
 
-    def _run_filters_on_node(self, active_node:BaseType.BaseNode, event_key:str, event, version:typing.Union[str, None] = None):
+    async def _run_filters_on_node(self, active_node:BaseType.BaseNode, event_key:str, event, version:typing.Union[str, None] = None):
         '''runs all custom filter callbacks for either starting at node with given event or for the given node and event pair. Filters are all syncronous callbacks.
         Catches and logs all errors from trying to run functions, stops going through list immediately
         
@@ -574,7 +980,7 @@ class DialogHandler():
             #     node_filters = []
 
         try:
-            return self._filter_list_runner(active_node, event, node_filters, purpose=POSSIBLE_PURPOSES.FILTER)
+            return await self._filter_list_runner(active_node, event, node_filters, purpose=POSSIBLE_PURPOSES.FILTER, plan_key=(version, event_key))
         except Exception as e:
             exec_log.error(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}>, exception happened when trying to run filters. assuming skip")
             dev_log.error(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}>, exception happened when trying to run filters, details {e}")
@@ -632,7 +1038,7 @@ class DialogHandler():
             return control_data
         return None
     
-    def _run_transition_filters_on_node(self, active_node:BaseType.BaseNode, event_key:str, event):
+    async def _run_transition_filters_on_node(self, active_node:BaseType.BaseNode, event_key:str, event):
         '''runs filters for transitions for the given node and event. Runs filters for each transition in order and returns the first single transition that passes filters
         
         Return
@@ -643,24 +1049,22 @@ class DialogHandler():
         - `session_action` what to do with the session when transitioning
         - `session_timeout` if there's an adjustment to session timeout, grabs value from current Active Node
         - `close_flags` if node and/or session should be closed after handling event, value grabbed from yaml'''
-        node_transition_list = active_node.graph_node.get_transitions(event_key)
-        passed_transition = None
-        for transition_ind, transition in enumerate(node_transition_list):
+        for record in self.get_transition_table(active_node.graph_node, event_key):
+            transition_ind = record.index
             dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> starting checking transtion number <{transition_ind}>")
             # first update any counts
-            yaml_named_counts = BaseType.BaseGraphNode.parse_node_names(transition["node_names"])
-            if "transition_counters" in transition:
-                count_results = self._counter_runner(yaml_named_counts, active_node, event, transition["transition_counters"], POSSIBLE_PURPOSES.TRANSITION_COUNTER)
+            if record.counters is not None:
+                count_results = await self._counter_runner(dict(record.named_counts), active_node, event, record.counters, POSSIBLE_PURPOSES.TRANSITION_COUNTER)
                 dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> transition <{transition_ind}> counters finished executing, counts are {count_results}, node ids <{count_results.keys()}>")
+                # clean up counts, counters could have named any node
+                for node_name in list(count_results.keys()):
+                    if node_name not in self.graph_node_indexer:
+                        exec_log.warning(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> transition <{transition_ind}> transition to <{node_name}> transition won't work, goal node doesn't exist.")
+                        del count_results[node_name]
             else:
-                count_results = yaml_named_counts
+                # missing nodes already taken out and warned about when record was made
+                count_results = dict(record.node_counts)
                 dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> transition <{transition_ind}> no counters so counts are {count_results}, node ids <{count_results.keys()}>")
-            
-            # clean up counts
-            for node_name in list(count_results.keys()):
-                if node_name not in self.graph_node_indexer:
-                    exec_log.warning(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> transition <{transition_ind}> transition to <{node_name}> transition won't work, goal node doesn't exist.")
-                    del count_results[node_name]
 
             if len(count_results) < 1:
                 # no next nodes named. transition must go to some node
@@ -670,10 +1074,11 @@ class DialogHandler():
             # if no filters then, auto true result
             # transition filters will receive the full count in goal_name
             filter_res = True
-            if "transition_filters" in transition:
-                exec_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> transition <{transition_ind}> has transition filters {transition['transition_filters']}")
+            if record.filters is not None:
+                exec_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> transition <{transition_ind}> has transition filters {record.filters}")
                 try:
-                    filter_res = self._filter_list_runner(active_node, event, transition["transition_filters"], POSSIBLE_PURPOSES.TRANSITION_FILTER, goal_node=count_results)
+                    filter_res = await self._filter_list_runner(active_node, event, record.filters, POSSIBLE_PURPOSES.TRANSITION_FILTER, goal_node=count_results,
+                                                                plan_key=("transition", event_key, transition_ind))
                     if not isinstance(filter_res, bool):
                         # if any weird resutls, assume false
                         filter_res = False
@@ -684,25 +1089,21 @@ class DialogHandler():
                     dev_log.error(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> transition <{transition_ind}> exception happened when trying to filter transitions, details {e}")
             
             if filter_res:
-                transition_close_flag = []
-                if "schedule_close" in transition:
-                    transition_close_flag = transition["schedule_close"]
-                passed_transition = {
+                return {
                     "count": count_results,
-                    "actions": transition["transition_actions"],
-                    "session_action": (transition["session_chaining"] if isinstance(transition["session_chaining"], str) else list(transition["session_chaining"].keys())[0])
-                                    if "session_chaining" in transition else "end",
-                    "session_timeout": None if "session_chaining" not in transition or isinstance(transition["session_chaining"], str) else list(transition["session_chaining"].values())[0],
-                    "close_flags": transition_close_flag
+                    "actions": record.actions,
+                    "session_action": record.session_action,
+                    "session_timeout": record.session_timeout,
+                    "close_flags": record.close_flags,
+                    "parallel": record.parallel
                 }
-                return passed_transition
         return None
         
     async def _run_transitions_on_node(self, active_node:BaseType.BaseNode, event_key:str, event):
         '''handles transitions for a node (not including closing current one if needed) for the given active node and event.
         Calls to running transition filters to find transition that passes then sets up next nodes and runs actions on all next nodes'''
         dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> starting handling transitions")
-        passed_transition = self._run_transition_filters_on_node(active_node, event_key, event)
+        passed_transition = await self._run_transition_filters_on_node(active_node, event_key, event)
         if passed_transition is None:
             # no transitions passed, returning to say no changes to nodes
             return {"close_node": False, "close_session": False}
@@ -714,9 +1115,11 @@ class DialogHandler():
         '''get timeout for session'''
 
         section_exceptions = []
-        callbacks_list:list[typing.Tuple[BaseType.BaseNode, list, int]] = []
+        callbacks_list:list[typing.Tuple[BaseType.BaseNode, list, int, bool]] = []
+        session_additions:"dict[int, typing.Tuple[SessionData.SessionData, list[BaseType.BaseNode]]]" = {}
         # first pass is setting up active nodes and sessions for callbacks to work on
         for next_node_name, count in passed_transition["count"].items():
+            batched = count >= self.settings.batch_activation_size
             for i in range(count):
                 dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> setting up node <{next_node_name}> number <{i}>")
                 session = None
@@ -752,29 +1155,42 @@ class DialogHandler():
                     section_exceptions.append(next_node)
                 exec_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> activated next node, <{self.get_active_node_key(next_node)}><{next_node_name}>, copy <{i}>")
                 if session_action != "end" and session is not None:
-                    # only end doesn't want node added to session
+                    # only end doesn't want node added to session. added all at once after setup so big transitions don't check for repeats every time
                     dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> adding next node <{self.get_active_node_key(next_node)}><{next_node.graph_node.id}> to session <{self.get_session_key(session)}>")
-                    session.add_node(next_node)
-                    dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> session debugging, session <{self.get_session_key(session)}>, now has node list is <{[str(self.get_active_node_key(x))+ ' ' +x.graph_node.id for x in session.get_linked_nodes()]}>")
-                callbacks_list.append((next_node, passed_transition["actions"], i))
+                    session_additions.setdefault(id(session), (session, []))[1].append(next_node)
+                callbacks_list.append((next_node, passed_transition["actions"], i, batched))
+        for session, new_nodes in session_additions.values():
+            session.add_nodes(new_nodes)
+            if dev_log.isEnabledFor(logging.INFO):
+                dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> session debugging, session <{self.get_session_key(session)}>, now has node list is <{[str(self.get_active_node_key(x))+ ' ' +x.graph_node.id for x in session.get_linked_nodes()]}>")
 
         # all setup, do all changes
-        for callback_settings in callbacks_list:
-            next_node = callback_settings[0]
-            action_list = callback_settings[1]
-            copy_num = callback_settings[2]
-            dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> executing transition actions for next node <{self.get_active_node_key(next_node)}><{next_node.graph_node.id}> copy <{copy_num}> list: <{action_list}>")
-            control_data = self.generate_action_control_data({"copy":copy_num})
-            # session could be chained and thus something that is already registered and timeout could be changed during actions
-            # node is always new so no need to grab old timeout
-            old_session_timeout = copy.deepcopy(next_node.session.timeout) if next_node.session is not None and next_node.session.timeout is not None else None
-            before_callbacks_keys = self.active_node_cache.get_all_secondary_keys(self.get_active_node_key(active_node))
-            await self._action_list_runner(active_node, event, action_list, POSSIBLE_PURPOSES.TRANSITION_ACTION, goal_node=next_node, control_data=control_data, section_name="transition_actions")
-            dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> finished transition actions for next node <{self.get_active_node_key(next_node)}><{next_node.graph_node.id}> copy <{copy_num}>")
-            self.active_node_cache.set_item(self.get_active_node_key(active_node), active_node, before_callbacks_keys)
-            if next_node.session is not None and len(self.get_active_timeout_tracker(next_node.session)) > 0:
-                self.update_timeout_tracker(next_node.session, old_session_timeout)
-            await self._track_new_active_node(next_node, event)
+        if passed_transition["parallel"]:
+            limit = self.settings.parallel_transition_limit if passed_transition["parallel"] is True else passed_transition["parallel"]
+            await self._run_parallel_transition_setup(active_node, event_key, event, callbacks_list, limit)
+        else:
+            pending_batch:list[BaseType.BaseNode] = []
+            for next_node, action_list, copy_num, batched in callbacks_list:
+                if len(pending_batch) > 0 and (not batched or pending_batch[0].graph_node is not next_node.graph_node):
+                    await self._track_new_active_nodes(pending_batch, event)
+                    pending_batch = []
+                dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> executing transition actions for next node <{self.get_active_node_key(next_node)}><{next_node.graph_node.id}> copy <{copy_num}> list: <{action_list}>")
+                control_data = self.generate_action_control_data({"copy":copy_num})
+                # session could be chained and thus something that is already registered and timeout could be changed during actions
+                # node is always new so no need to grab old timeout
+                old_session_timeout = copy.deepcopy(next_node.session.timeout) if next_node.session is not None and next_node.session.timeout is not None else None
+                before_callbacks_keys = self.active_node_cache.get_all_secondary_keys(self.get_active_node_key(active_node))
+                await self._action_list_runner(active_node, event, action_list, POSSIBLE_PURPOSES.TRANSITION_ACTION, goal_node=next_node, control_data=control_data, section_name="transition_actions")
+                dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> finished transition actions for next node <{self.get_active_node_key(next_node)}><{next_node.graph_node.id}> copy <{copy_num}>")
+                self.active_node_cache.set_item(self.get_active_node_key(active_node), active_node, before_callbacks_keys)
+                if next_node.session is not None and len(self.get_active_timeout_tracker(next_node.session)) > 0:
+                    self.update_timeout_tracker(next_node.session, old_session_timeout)
+                if batched:
+                    pending_batch.append(next_node)
+                else:
+                    await self._track_new_active_node(next_node, event)
+            if len(pending_batch) > 0:
+                await self._track_new_active_nodes(pending_batch, event)
         
         if session_action == "section" and active_node.session is not None:
             dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> sectioning, closing nodes from before transition")
@@ -783,18 +1199,47 @@ class DialogHandler():
         return {"close_node": "node" in  passed_transition["close_flags"], "close_session": "session" in  passed_transition["close_flags"]}
 
 
+    async def _run_parallel_transition_setup(self, active_node:BaseType.BaseNode, event_key:str, event,
+                                             callbacks_list:"list[typing.Tuple[BaseType.BaseNode, list, int, bool]]", limit:int):
+        '''second half of transitions for transitions marked parallel. runs transition actions then node tracking for each next node side by side,
+        at most limit nodes at a time, and waits for all of them. batching is skipped since each node is already independent of the others'''
+        dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> setting up <{len(callbacks_list)}> next nodes in parallel, limit <{limit}>")
+        # actions from all next nodes can change current node and shared sessions, so keys and timeouts from before are taken once and
+        # indexing is updated once everything is done
+        before_callbacks_keys = self.active_node_cache.get_all_secondary_keys(self.get_active_node_key(active_node))
+        old_session_timeouts = {}
+        for next_node, _, _, _ in callbacks_list:
+            if next_node.session is not None and id(next_node.session) not in old_session_timeouts:
+                old_session_timeouts[id(next_node.session)] = (next_node.session, copy.deepcopy(next_node.session.timeout))
+
+        async def setup_next_node(next_node:BaseType.BaseNode, action_list:list, copy_num:int):
+            control_data = self.generate_action_control_data({"copy":copy_num})
+            await self._action_list_runner(active_node, event, action_list, POSSIBLE_PURPOSES.TRANSITION_ACTION, goal_node=next_node, control_data=control_data, section_name="transition_actions")
+            dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_key}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> finished transition actions for next node <{self.get_active_node_key(next_node)}><{next_node.graph_node.id}> copy <{copy_num}>")
+            await self._track_new_active_node(next_node, event)
+
+        try:
+            await AsyncUtils.gather_with_limit([setup_next_node(next_node, action_list, copy_num) for next_node, action_list, copy_num, _ in callbacks_list], limit=limit)
+        finally:
+            self.active_node_cache.set_item(self.get_active_node_key(active_node), active_node, before_callbacks_keys)
+            for session, old_session_timeout in old_session_timeouts.values():
+                if len(self.get_active_timeout_tracker(session)) > 0:
+                    self.update_timeout_tracker(session, old_session_timeout)
+
     '''#############################################################################################
     ################################################################################################
     ####                   I-DONT-REALLY-HAVE-A-NAME-BUT-IT-DOESNT-FIT-ELSEWHERE SECTION
     ################################################################################################
     ################################################################################################'''
 
+    @uses_handler_clock
     def get_display_info(self, detail_level="item_info"):
         if detail_level == "list_overview":
             short_blurb = ""
             short_blurb += "graph nodes: " + str(len(self.graph_node_indexer)) + "\n"
             short_blurb += "functions: " + str(len(self.functions_cache)) + "\n"
-            short_blurb += "active: " + str(len(self.active_node_cache))
+            short_blurb += "active: " + str(len(self.active_node_cache)) + "\n"
+            short_blurb += "queued tasks: " + str(len(self.advanced_event_queue))
             return short_blurb
         if detail_level == "item_info":
             return "WIP"
@@ -821,6 +1266,26 @@ class DialogHandler():
         #     await self.close_node(active_node, timed_out=False)
 
 
+    async def _track_new_active_nodes(self, active_nodes:"list[BaseType.BaseNode]", event):
+        '''same as `_track_new_active_node` for many copies of the same graph node. node actions still run for each node in order, then
+        all of them are added to handler's tracking together and their timeouts are watched by one waiter'''
+        dev_log.info(f"handler id'd <{id(self)}> adding <{len(active_nodes)}> copies of node <{active_nodes[0].graph_node.id}> to internal tracking and running node callbacks")
+        node_actions = active_nodes[0].graph_node.get_node_actions()
+        for active_node in active_nodes:
+            active_node.activate()
+            await self._action_list_runner(active_node, event, node_actions, POSSIBLE_PURPOSES.ACTION, control_data={})
+
+        self.create_timeout_group(active_nodes)
+        checked_sessions = set()
+        for active_node in active_nodes:
+            if active_node.session is not None and id(active_node.session) not in checked_sessions:
+                checked_sessions.add(id(active_node.session))
+                if len(self.get_active_timeout_tracker(active_node.session)) == 0:
+                    self.create_timeout_tracker(active_node.session)
+        self.active_node_cache.add_items({self.get_active_node_key(active_node): active_node for active_node in active_nodes})
+        dev_log.info(f"handler id'd <{id(self)}> finished adding tracking for <{len(active_nodes)}> copies of node <{active_nodes[0].graph_node.id}>")
+
+    @uses_handler_clock
     async def close_node(self, active_node:BaseType.BaseNode, timed_out=False, emergency_remove=False):
         '''Goes through handler's process to close the given node. Calls the custom close callbacks if not emergency close mode, then removes node from
         internal trackers
@@ -836,31 +1301,12 @@ class DialogHandler():
         dev_log.info(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> starting closing")
         if not active_node.is_active():
             return
-        active_node.notify_closing()
-        exec_log.info(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> losing. timed out? <{timed_out}>, emergency? <{emergency_remove}>")
-        if not emergency_remove:
-            try:
-                await self._run_actions_on_node(active_node, "close", {"timed_out":timed_out}, version="close")
-            except Exception as e:
-                pass
-            dev_log.info(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> finished custom callbacks closing node, now clearing node from internal trackers")
-
-        active_node.close()
+        await self._run_node_closing(active_node, timed_out=timed_out, emergency_remove=emergency_remove)
 
         # this section closes the session if no other nodes in it are active. make sure sectioning session doesn't clear out all nodes
         if active_node.session and active_node.session is not None:
             exec_log.debug(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> close_node checking linked session is dead <{self.get_session_key(active_node.session)}>")
-            printing_active = [node.graph_node.id for node in active_node.session.get_linked_nodes()]
-            dev_log.debug(f"linked nodes to check are <{[f'<{str(self.get_active_node_key(node))}><{node.graph_node.id}> <{node.is_active()}>' for node in active_node.session.get_linked_nodes()]}>")
-            session_void = True
-            for node in active_node.session.get_linked_nodes():
-                if node.is_active():
-                    session_void = False
-                    break
-            
-            if session_void:
-                exec_log.debug(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> close_node found linked session is dead <{self.get_session_key(active_node.session)}>")
-                await self.close_session(active_node.session, timed_out=timed_out)
+            await self._close_session_if_void(active_node.session, timed_out=timed_out)
 
         printing_active = {x: node.graph_node.id for x, node in self.active_node_cache.cache.items()}
         dev_log.debug(f"before remove, state is active nodes are <{printing_active}>")
@@ -873,14 +1319,62 @@ class DialogHandler():
         dev_log.debug(f"after remove, state is active nodes are <{printing_active}>")
         # printing_forwarding = {event:[str(x)+' '+self.active_node_cache.get(x)[0].graph_node.id for x in nodes] for event,nodes in self.active_node_cache.items(index_name="event_forwarding")}
         # dialog_logger.debug(f"after remove state is event forwarding <{printing_forwarding}>")
+
+    @uses_handler_clock
+    async def close_nodes(self, active_nodes:"list[BaseType.BaseNode]", timed_out=False, emergency_remove=False):
+        '''close many nodes at once, see `close_node`. up to `session_close_limit` nodes run close callbacks at the same time, then all are
+        removed from tracking together and each session they were in is checked once for if it should close'''
+        active_nodes = [active_node for active_node in active_nodes if active_node.is_active()]
+        if len(active_nodes) == 0:
+            return
+        dev_log.info(f"handler id'd <{id(self)}> closing <{len(active_nodes)}> nodes together")
+        await AsyncUtils.gather_with_limit([self._run_node_closing(active_node, timed_out=timed_out, emergency_remove=emergency_remove) for active_node in active_nodes],
+                                           limit=self.settings.session_close_limit)
+        sessions = {}
+        for active_node in active_nodes:
+            if active_node.session is not None:
+                sessions.setdefault(id(active_node.session), active_node.session)
+        for session in sessions.values():
+            await self._close_session_if_void(session, timed_out=timed_out)
+        self.active_node_cache.remove_items([self.get_active_node_key(active_node) for active_node in active_nodes])
+        dev_log.info(f"handler id'd <{id(self)}> finished closing <{len(active_nodes)}> nodes together")
+
+    async def _run_node_closing(self, active_node:BaseType.BaseNode, timed_out=False, emergency_remove=False):
+        '''first part of closing node, marks it closing, runs custom close callbacks if not emergency close mode, and marks it closed'''
+        if not active_node.is_active():
+            # something else started closing it while waiting for a turn
+            return
+        active_node.notify_closing()
+        exec_log.info(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> losing. timed out? <{timed_out}>, emergency? <{emergency_remove}>")
+        if not emergency_remove:
+            try:
+                await self._run_actions_on_node(active_node, "close", {"timed_out":timed_out}, version="close")
+            except Exception as e:
+                pass
+            dev_log.info(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> finished custom callbacks closing node, now clearing node from internal trackers")
+
+        active_node.close()
+
+    async def _close_session_if_void(self, session:SessionData.SessionData, timed_out=False):
+        '''closes session if none of its nodes are left'''
+        dev_log.debug(f"linked nodes to check are <{[f'<{str(self.get_active_node_key(node))}><{node.graph_node.id}> <{node.is_active()}>' for node in session.get_linked_nodes()]}>")
+        for node in session.get_linked_nodes():
+            # nodes still running close actions count as alive, otherwise first node to finish when several close at once ends session
+            # while others are still closing
+            if node.status in (ITEM_STATUS.ACTIVE, ITEM_STATUS.CLOSING):
+                return
+        exec_log.debug(f"handler id'd <{id(self)}> found linked session is dead <{self.get_session_key(session)}>")
+        await self.close_session(session, timed_out=timed_out)
     
+    @uses_handler_clock
     async def clear_session_history(self, session:SessionData.SessionData, timed_out=False, exceptions=[]):
-        '''closes all nodes in session that are still active and aren't in exception list'''
-        for node in session.get_linked_nodes():
-            if node.is_active() and node not in exceptions:
-                await self.close_node(node, timed_out=timed_out)
+        '''closes all nodes in session that are still active and aren't in exception list. up to `session_close_limit` nodes close at the same
+        time, all are finished before returning'''
+        closing_nodes = [node for node in session.get_linked_nodes() if node.is_active() and node not in exceptions]
+        await AsyncUtils.gather_with_limit([self.close_node(node, timed_out=timed_out) for node in closing_nodes], limit=self.settings.session_close_limit)
         session.clear_session_history(exceptions)
     
+    @uses_handler_clock
     async def close_session(self, session:SessionData.SessionData, timed_out=False):
         if not session.is_active():
             return
@@ -928,9 +1422,9 @@ class DialogHandler():
         control_keys = control_data.keys()
         '''base set of keys this call to _action_list_runner control_data has'''
         section_data = {}
-        async def recur_list_helper(func_sub_list, control_data):
-            nonlocal section_data
+        async def recur_list_helper(func_sub_list, control_data, section_data):
             nonlocal control_keys
+            section_datapack = self._make_datapack(active_node, event, goal_node=goal_node, section_name=section_name, section_data=section_data)
             for callback in func_sub_list:
                 # get a copy for each loop to prevent errors from building up over callbacks
                 loop_control_copy = copy.deepcopy(control_data)
@@ -945,11 +1439,31 @@ class DialogHandler():
                             goal_node=goal_node,
                             callb_section_data=section_data,
                             control_data=loop_control_copy,
-                            section_name=section_name)
+                            section_name=section_name,
+                            datapack=section_datapack)
                 elif isinstance(callback, SectionUtils.IfSubSection):
-                    filter_res = self._filter_list_runner(active_node=active_node, event=event, filter_list=callback.filters, purpose=POSSIBLE_PURPOSES.FILTER, section_data=section_data)
+                    filter_res = await self._filter_list_runner(active_node=active_node, event=event, filter_list=callback.filters, purpose=POSSIBLE_PURPOSES.FILTER, section_data=section_data)
                     if filter_res:
-                        loop_control_copy = await recur_list_helper(callback.actions, loop_control_copy)
+                        loop_control_copy = await recur_list_helper(callback.actions, loop_control_copy, section_data)
+                elif isinstance(callback, SectionUtils.DeadlineSubSection):
+                    try:
+                        loop_control_copy = await asyncio.wait_for(recur_list_helper(callback.actions, loop_control_copy, section_data), callback.seconds)
+                    except asyncio.TimeoutError:
+                        exec_log.warning(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> event <{id(event)}> deadline of <{callback.seconds}> seconds in section <{section_name}> passed, cancelled")
+                        raise ExceptionEvent.CallbackTimeoutError("deadline", callback.seconds, section_name) from None
+                elif isinstance(callback, SectionUtils.ConcurrentSubSection):
+                    # each action gets own copies so they don't step on each other while running, changes are merged after in listed order
+                    section_snapshot = dict(section_data)
+                    control_snapshot = copy.deepcopy(loop_control_copy)
+                    child_sections = [dict(section_snapshot) for child in callback.actions]
+                    child_results = await asyncio.gather(*[recur_list_helper([child], copy.deepcopy(control_snapshot), child_section)
+                                                           for child, child_section in zip(callback.actions, child_sections)], return_exceptions=True)
+                    for result in child_results:
+                        if isinstance(result, BaseException):
+                            raise result
+                    for child_section, child_control in zip(child_sections, child_results):
+                        self._merge_concurrent_changes(section_data, section_snapshot, child_section)
+                        self._merge_concurrent_changes(loop_control_copy, control_snapshot, child_control)
                 else:
                     key = list(callback.keys())[0]
                     value = callback[key]
@@ -962,29 +1476,43 @@ class DialogHandler():
                             base_parameter=value,
                             callb_section_data=section_data,
                             control_data=loop_control_copy,
-                            section_name=section_name)
+                            section_name=section_name,
+                            datapack=section_datapack)
                 # cleanup control data to save and prepare for next round
                 for key in control_keys:
                     if key in loop_control_copy:
                         control_data[key] = loop_control_copy[key]
                 dev_log.debug(f"control data at end of {callback}: {control_data}")
             return control_data
-        control_data = await recur_list_helper(action_list, control_data)
+        control_data = await recur_list_helper(action_list, control_data, section_data)
         dev_log.info(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> event <{id(event)}> funished unning action list <{action_list}> in section <{section_name}>, control data is {control_data}")
         return control_data
     
-    def _counter_runner(self, yaml_count, active_node:BaseType.BaseNode, event, action_list, purpose:POSSIBLE_PURPOSES):
+    def _merge_concurrent_changes(self, target:dict, snapshot:dict, changed:dict):
+        '''apply what one concurrent action changed compared to snapshot taken before actions started onto target. called for each action in
+        order they are listed so if two change the same key, later one in list wins'''
+        for key, value in changed.items():
+            if key not in snapshot or (snapshot[key] is not value and snapshot[key] != value):
+                target[key] = value
+        for key in snapshot:
+            if key not in changed and key in target:
+                del target[key]
+
+    async def _counter_runner(self, yaml_count, active_node:BaseType.BaseNode, event, action_list, purpose:POSSIBLE_PURPOSES):
         # control data is the count of nodes to transition to. not treating it like action section control data because
         #       it is ok to delete things from count.
         section_data = {}
+        section_datapack = self._make_datapack(active_node, event, section_name="transition_counters", section_data=section_data)
         for callback in action_list:
             if isinstance(callback, str):
                 # is just function name, no parameters
-                self._run_func(callback, purpose, active_node, event, callb_section_data=section_data, section_name="transition_counters", control_data=yaml_count)
+                await self._run_func_async(callback, purpose, active_node, event, callb_section_data=section_data, section_name="transition_counters", control_data=yaml_count,
+                                           datapack=section_datapack)
             else:
                 key = list(callback.keys())[0]
                 value = callback[key]
-                self._run_func(key, purpose, active_node, event, base_parameter=value, callb_section_data=section_data, section_name="transition_counters", control_data=yaml_count)
+                await self._run_func_async(key, purpose, active_node, event, base_parameter=value, callb_section_data=section_data, section_name="transition_counters", control_data=yaml_count,
+                                           datapack=section_datapack)
             # cleanup the control data to what is expected
             for item in list(yaml_count.keys()):
                 if not isinstance(yaml_count[item], int):
@@ -992,8 +1520,8 @@ class DialogHandler():
         return yaml_count
 
 
-    def _filter_list_runner(self, active_node:BaseType.BaseNode, event, filter_list, purpose:POSSIBLE_PURPOSES,
-                           goal_node=None, operator="and", section_data=None):
+    async def _filter_list_runner(self, active_node:BaseType.BaseNode, event, filter_list, purpose:POSSIBLE_PURPOSES,
+                           goal_node=None, operator="and", section_data=None, plan_key:typing.Optional[tuple]=None):
         '''
         helper for running a section of filter callbacks for given purpose, node, and event. 
         List of filter functions can have nested lists, but the keys for those nested lists have to be 'and' or 'or', which are built in keywords for 
@@ -1002,89 +1530,450 @@ class DialogHandler():
         
         As of v3.7 each section of filters in yaml has a separate data structure for intermediary values (nested lists do not count as seperate sections for this functionalty)
         Intermediary values are not stored in node and are discarded after section finishes executing but can be accessed by any callback in that section
-        
+
+        plan_key names where list is in graph node. with adaptive_filter_order setting on, only lists given one can be reordered
+
         Return
         ---
         'boolean' - if active node and event situation passes custom filter list'''
         if section_data is None:
             # object meant for temp just passing data to rest of functions in this section.
             section_data = {}
-        section_name = "filters" if purpose.value == POSSIBLE_PURPOSES.FILTER else "transition_filters"
+        section_name = "filters" if purpose == POSSIBLE_PURPOSES.FILTER else "transition_filters"
         #TODO: figure out section progress data structure
+        section_datapack = self._make_datapack(active_node, event, goal_node=goal_node, section_name=section_name, section_data=section_data)
 
-        def recur_list_helper(func_sub_list, operator):
-            for filter in func_sub_list:
-                if isinstance(filter, str):
-                    # is just function name, no parameters
-                    filter_run_result = self._run_func(func_name=filter, purpose=purpose, active_node=active_node, event=event, goal_node=goal_node, callb_section_data=section_data, section_name=section_name)
-                    if not isinstance(filter_run_result, bool):
-                        filter_run_result = False
-                elif isinstance(filter, SectionUtils.LogicOpSubSection):
-                    if filter.name == "not":
-                        filter_run_result = not recur_list_helper(filter.callbacks, operator="and")
-                    else:
-                        filter_run_result = recur_list_helper(filter.callbacks, operator=filter.name)
+        if self.settings.compile_filters and plan_key is not None and not self.settings.adaptive_filter_order:
+            compiled = self._get_compiled_filter(active_node, plan_key, filter_list, operator)
+            async def run_filter(func_name, base_parameter):
+                return await self._run_func_async(func_name, purpose, active_node, event, goal_node=goal_node, base_parameter=base_parameter,
+                                                  callb_section_data=section_data, section_name=section_name, datapack=section_datapack)
+            return await compiled.predicate(run_filter)
+
+        async def run_entry(filter, path):
+            if isinstance(filter, str):
+                # is just function name, no parameters
+                filter_run_result = await self._run_func_async(func_name=filter, purpose=purpose, active_node=active_node, event=event, goal_node=goal_node, callb_section_data=section_data, section_name=section_name,
+                                                               datapack=section_datapack)
+                if not isinstance(filter_run_result, bool):
+                    filter_run_result = False
+            elif isinstance(filter, SectionUtils.LogicOpSubSection):
+                if filter.name == "not":
+                    filter_run_result = not await recur_list_helper(filter.callbacks, "and", path)
                 else:
-                    # is a dict representing function call with arguments or nested operator, should only have one key:value pair
-                    key = list(filter.keys())[0]
-                    value = filter[key]
-
-                    # argument in vlaue is expected to be one object. a list, a dict, a string etc
-                    filter_run_result = self._run_func(key, purpose, active_node, event, goal_node=goal_node, base_parameter=value, callb_section_data=section_data, section_name=section_name)
-                    if not isinstance(filter_run_result, bool):
-                        filter_run_result = False
-                # find if hit early break because not possible to change result with rest of list
-                if operator == "and" and not filter_run_result:
-                    return False
-                if operator == "or" and filter_run_result:
-                    return True
+                    filter_run_result = await recur_list_helper(filter.callbacks, filter.name, path)
+            else:
+                # is a dict representing function call with arguments or nested operator, should only have one key:value pair
+                key = list(filter.keys())[0]
+                value = filter[key]
+
+                # argument in vlaue is expected to be one object. a list, a dict, a string etc
+                filter_run_result = await self._run_func_async(key, purpose, active_node, event, goal_node=goal_node, base_parameter=value, callb_section_data=section_data, section_name=section_name,
+                                                               datapack=section_datapack)
+                if not isinstance(filter_run_result, bool):
+                    filter_run_result = False
+            return filter_run_result
+
+        async def recur_list_helper(func_sub_list, operator, path):
+            plan = None
+            if self.settings.adaptive_filter_order and plan_key is not None:
+                plan = self._get_filter_plan(active_node, section_name, plan_key + path, func_sub_list, operator)
+            if plan is None:
+                for index, filter in enumerate(func_sub_list):
+                    filter_run_result = await run_entry(filter, path + (index,))
+                    # find if hit early break because not possible to change result with rest of list
+                    if operator == "and" and not filter_run_result:
+                        return False
+                    if operator == "or" and filter_run_result:
+                        return True
+            else:
+                measuring = plan["order"] is None
+                order = self._measuring_filter_order(plan) if measuring else plan["order"]
+                if measuring:
+                    plan["runs"] += 1
+                try:
+                    for index in order:
+                        start = time.perf_counter()
+                        filter_run_result = await run_entry(func_sub_list[index], path + (index,))
+                        if measuring:
+                            plan["samples"][index][0] += 1
+                            plan["samples"][index][1] += 1 if filter_run_result else 0
+                            plan["samples"][index][2] += time.perf_counter() - start
+                        if operator == "and" and not filter_run_result:
+                            return False
+                        if operator == "or" and filter_run_result:
+                            return True
+                finally:
+                    if measuring and plan["runs"] >= self.settings.filter_order_samples:
+                        self._fix_filter_order(plan)
             # end of for loop, means failed to find early break point
             if operator == "and":
                 return True
             if operator == "or":
                 return False
-        return recur_list_helper(filter_list, operator)
+        return await recur_list_helper(filter_list, operator, ())
+
+    def _get_compiled_filter(self, active_node:BaseType.BaseNode, plan_key:tuple, filter_list:list, operator:str):
+        '''find or make generated predicate for filter list at plan_key in active node's graph node'''
+        compiled_key = (active_node.graph_node.id,) + plan_key
+        if compiled_key in self.compiled_filters.cache:
+            return self.compiled_filters.get_ref(compiled_key)["compiled"]
+        if plan_key[0] == "transition":
+            root = f"{active_node.graph_node.id}.events.{plan_key[1]}.transitions[{plan_key[2]}].transition_filters"
+        elif plan_key[0] == "start":
+            root = f"{active_node.graph_node.id}.graph_start.{plan_key[1]}.filters"
+        else:
+            root = f"{active_node.graph_node.id}.events.{plan_key[1]}.filters"
+        compiled = FilterCompiler.compile_filters(filter_list, operator=operator, root=root, debug=self.settings.filter_debug)
+        self.compiled_filters.add_item(compiled_key, {"graph_node": active_node.graph_node.id, "compiled": compiled})
+        return compiled
+
+    def get_compiled_filter(self, graph_node_id:str, *location):
+        '''see generated predicate for a filter list when compile_filters is on, ie `get_compiled_filter("node1", None, "message")` for
+        message event filters, `get_compiled_filter("node1", "transition", "message", 0)` for filters on first message transition
+
+        Returns
+        ---
+        `FilterCompiler.CompiledFilter` or None if list hasn't been compiled yet'''
+        compiled_key = (graph_node_id,) + location
+        if compiled_key not in self.compiled_filters.cache:
+            return None
+        return self.compiled_filters.get_ref(compiled_key)["compiled"]
+
+    def _get_filter_plan(self, active_node:BaseType.BaseNode, section_name:str, list_key:tuple, func_sub_list:list, operator:str):
+        '''find or make plan for running a filter list in adaptive order, None if list has to run in yaml order. list_key is where list is in
+        graph node, plans are kept per graph node and list key since handler gets a new copy of filters each run'''
+        plan_key = (active_node.graph_node.id,) + list_key
+        if plan_key in self.filter_plans.cache:
+            plan = self.filter_plans.get_ref(plan_key)
+            return plan if plan["reorderable"] else None
+        if len(func_sub_list) < 2:
+            return None
+        reorderable = True
+        for filter in func_sub_list:
+            if isinstance(filter, SectionUtils.LogicOpSubSection):
+                continue
+            func_name = filter if isinstance(filter, str) else list(filter.keys())[0]
+            if func_name in self.functions_cache.cache and getattr(self.functions_cache.get_ref(func_name)["ref"], "runtime_input_key", None) is not None:
+                # filters before this one may be setting its input, order matters
+                reorderable = False
+        plan = {"graph_node": active_node.graph_node.id, "location": list_key, "section": section_name, "operator": operator, "callbacks": func_sub_list,
+                "reorderable": reorderable, "runs": 0, "samples": [[0, 0, 0.0] for filter in func_sub_list], "order": None}
+        self.filter_plans.add_item(plan_key, plan, or_overwrite=True)
+        return plan if reorderable else None
+
+    def _measuring_filter_order(self, plan:dict):
+        '''order to use while still measuring filters. rotates which one goes first so ones late in list get measured too'''
+        count = len(plan["callbacks"])
+        start = plan["runs"] % count
+        return [(start + offset) % count for offset in range(count)]
+
+    def _fix_filter_order(self, plan:dict):
+        '''pick order with lowest expected cost from measurements and keep it. for "and" filters that are cheap and often fail go first,
+        for "or" ones that are cheap and often pass. ties and unmeasured filters keep yaml order'''
+        def rank(index):
+            calls, passes, seconds = plan["samples"][index]
+            if calls == 0:
+                return (1, 0, index)
+            deciding_rate = (calls - passes) / calls if plan["operator"] == "and" else passes / calls
+            if deciding_rate == 0:
+                return (1, 0, index)
+            return (0, (seconds / calls) / deciding_rate, index)
+        plan["order"] = sorted(range(len(plan["callbacks"])), key=rank)
+        dev_log.info(f"handler id'd <{id(self)}> fixed filter order for graph node <{plan['graph_node']}> section <{plan['section']}> to <{self._filter_plan_names(plan, plan['order'])}>")
+
+    def _filter_plan_names(self, plan:dict, order:"list[int]"):
+        names = []
+        for index in order:
+            filter = plan["callbacks"][index]
+            if isinstance(filter, SectionUtils.LogicOpSubSection):
+                names.append(filter.name)
+            else:
+                names.append(filter if isinstance(filter, str) else list(filter.keys())[0])
+        return names
+
+    def get_filter_plans(self, graph_node_id:typing.Optional[str]=None):
+        '''see what order adaptive_filter_order setting has picked for filter lists
+
+        Parameters
+        ---
+        * graph_node_id - `Optional[str]`
+            only get plans for lists in this graph node, None for all
+
+        Returns
+        ---
+        `list[dict[str, Any]]` one for each filter list handler has run. has `graph_node`, `location` of list in node, `section`, `operator`, `reorderable`, `fixed` if
+        order has been picked, `order` names of filters and nested lists in order they run, and `stats` list of per filter `callback`,
+        `calls`, `pass_rate`, `avg_seconds` in yaml order'''
+        if graph_node_id is None:
+            plans = list(self.filter_plans.cache.values())
+        else:
+            plans = self.filter_plans.get(graph_node_id, index_name="graph_node", default=[])
+        results = []
+        for plan in plans:
+            yaml_order = list(range(len(plan["callbacks"])))
+            results.append({
+                "graph_node": plan["graph_node"],
+                "location": plan["location"],
+                "section": plan["section"],
+                "operator": plan["operator"],
+                "reorderable": plan["reorderable"],
+                "fixed": plan["order"] is not None,
+                "order": self._filter_plan_names(plan, plan["order"] if plan["order"] is not None else yaml_order),
+                "stats": [{"callback": name, "calls": calls, "pass_rate": passes / calls if calls > 0 else None, "avg_seconds": seconds / calls if calls > 0 else None}
+                          for name, (calls, passes, seconds) in zip(self._filter_plan_names(plan, yaml_order), plan["samples"])]
+            })
+        return results
+
+    def reset_filter_plans(self, graph_node_id:typing.Optional[str]=None):
+        '''forget filter orders and measurements so they are picked again, for one graph node or all of them'''
+        if graph_node_id is None:
+            self.filter_plans.clear()
+            return
+        for plan_key in self.filter_plans.get_keys(graph_node_id, index_name="graph_node", default=[]):
+            self.filter_plans.remove_item(plan_key)
 
     async def _run_func_async(self, func_name:str, purpose:POSSIBLE_PURPOSES, active_node:BaseType.BaseNode, event,
                              goal_node:typing.Union[BaseType.BaseNode, str]=None, base_parameter=None, callb_section_data=None,
-                             section_name="", control_data=None, section_progress=None):
-        '''helper for setup and running a dialog callback that could be async. awaits result if asynchronous.
-        check `_run_func` for details on parameters'''
-        run_func_built = self._run_func(func_name=func_name, purpose=purpose, active_node=active_node, event=event,
+                             section_name="", control_data=None, section_progress=None, datapack:typing.Optional[CbUtils.CallbackDatapack]=None):
+        '''helper for setup and running a dialog callback that could be async. awaits result if asynchronous or if callback is
+        run in an executor, raising `CallbackTimeoutError` if that takes longer than callback's timeout. Pure filters reuse result from
+        earlier in same event dispatch if there is one, filters with a cache_ttl reuse results from earlier events.
+        func_name and purpose are for checking function is allowed to run, rest are values that dialog callbacks need. Base parameter is
+        what is read in from yaml. section and control data are assumed to be managed by caller, which is usually the function section
+        handlers'''
+        if not self.function_is_permitted(func_name, purpose):
+            return self._not_permitted_result(func_name, purpose, active_node, event)
+        func_info = self.functions_cache.get_ref(func_name)
+        memo_key = None
+        if func_info.get("pure", False) and purpose in [POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER]:
+            memo_key = self._get_pure_memo_key(func_name, func_info, event, base_parameter, callb_section_data)
+            if memo_key is not None and memo_key in self._dispatch_memos[id(event)][1]:
+                dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}> pure filter <{func_name}> already ran for this dispatch, reusing result")
+                return self._dispatch_memos[id(event)][1][memo_key]
+        result_key = None
+        if func_info.get("cache_ttl") is not None and purpose in [POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER]:
+            datapack = self._fill_datapack(datapack, active_node, event, goal_node=goal_node, base_parameter=base_parameter, callb_section_data=callb_section_data,
+                                           section_name=section_name, control_data=control_data, section_progress=section_progress)
+            result_key = self._get_result_cache_key(func_name, func_info, datapack)
+            cached_entry = self._lookup_cached_result(result_key) if result_key is not None else None
+            if cached_entry is not None:
+                dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}> filter <{func_name}> using cached result")
+                if memo_key is not None and id(event) in self._dispatch_memos:
+                    self._dispatch_memos[id(event)][1][memo_key] = cached_entry["result"]
+                return cached_entry["result"]
+        result = await self._await_func(func_info, func_name=func_name, purpose=purpose, active_node=active_node, event=event,
                                        goal_node=goal_node, base_parameter=base_parameter, callb_section_data=callb_section_data,
-                                       section_name=section_name, control_data=control_data, section_progress=section_progress)
-        if inspect.isawaitable(run_func_built):
+                                       section_name=section_name, control_data=control_data, section_progress=section_progress, datapack=datapack)
+        if memo_key is not None and id(event) in self._dispatch_memos:
+            self._dispatch_memos[id(event)][1][memo_key] = result
+        if result_key is not None:
+            self.result_cache.add_item(result_key, {"result": result, "function": func_name,
+                                                    "expires": Clock.now() + func_info["cache_ttl"]}, or_overwrite=True)
+        return result
+
+    async def _await_func(self, func_info:dict, func_name:str, purpose:POSSIBLE_PURPOSES, active_node:BaseType.BaseNode, event,
+                          goal_node=None, base_parameter=None, callb_section_data=None, section_name="", control_data=None, section_progress=None,
+                          datapack:typing.Optional[CbUtils.CallbackDatapack]=None):
+        '''calls permitted function and waits for result as its call style and executor need, within its timeout'''
+        run_func_built = self._call_func(func_info, func_name=func_name, purpose=purpose, active_node=active_node, event=event,
+                                       goal_node=goal_node, base_parameter=base_parameter, callb_section_data=callb_section_data,
+                                       section_name=section_name, control_data=control_data, section_progress=section_progress, datapack=datapack)
+        # registered call style says if result needs awaiting. sync ones still get checked in case they weren't classified right
+        call_style = self._get_call_style(func_name, func_info)
+        if func_info.get("executor") is None and call_style is not CALL_STYLE.COROUTINE:
+            if not inspect.isawaitable(run_func_built):
+                return run_func_built
+            if call_style is CALL_STYLE.SYNC:
+                dev_log.info(f"handler id'd <{id(self)}> function <{func_name}> registered as sync gave back an awaitable, now treating it as sync_awaitable")
+                old_secondary_keys = self.functions_cache.get_all_secondary_keys(func_name)
+                func_info["call_style"] = CALL_STYLE.SYNC_AWAITABLE
+                self.functions_cache.set_item(func_name, func_info, old_secondary_keys)
+
+        timeout = func_info.get("timeout")
+        if timeout is None:
             return await run_func_built
-        return run_func_built
+        try:
+            return await asyncio.wait_for(run_func_built, timeout)
+        except asyncio.TimeoutError:
+            exec_log.warning(f"handler id'd <{id(self)}> node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> event <{id(event)}> callback <{func_name}> took longer than <{timeout}> seconds, cancelled")
+            raise ExceptionEvent.CallbackTimeoutError(func_name, timeout, section_name) from None
     
-    def _run_func(self, func_name:str, purpose:POSSIBLE_PURPOSES, active_node:BaseType.BaseNode, event, 
-                 goal_node:"typing.Union[BaseType.BaseNode, dict[str,int]]"=None, base_parameter=None, callb_section_data=None, section_name="", control_data=None, section_progress=None):
-        '''helper for setup and running a single callback. 
-        func_name and purpose is for checking information on formatting, rest are values that dialog callbacks need
-        Base parameter expected to be what is read in from yaml. Will be deep copied if there is data.
-        section and control data are assumed to be managed by caller, which is usually the function section handlers'''
-        if not self.function_is_permitted(func_name, purpose):
-            dev_log.debug(f"Dialog handler id'd <{id(self)}> tried running function named <{func_name}> for node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> section <{purpose}> event id'd <{id(event)}> type <{type(event)}>, not allowed")
-            if purpose in [POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER]:
-                # filter functions, whether transtion or not, expect bool returns. must return some bool and assume not allowed
-                # (function not listed in handler, or running for wrong purpose) means failed filter
-                return False
-            else:
-                return None
+    def _not_permitted_result(self, func_name:str, purpose:POSSIBLE_PURPOSES, active_node:BaseType.BaseNode, event):
+        '''what running a function that isn't allowed to run gives back'''
+        dev_log.debug(f"Dialog handler id'd <{id(self)}> tried running function named <{func_name}> for node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> section <{purpose}> event id'd <{id(event)}> type <{type(event)}>, not allowed")
+        if purpose in [POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER]:
+            # filter functions, whether transtion or not, expect bool returns. must return some bool and assume not allowed
+            # (function not listed in handler, or running for wrong purpose) means failed filter
+            return False
+        else:
+            return None
+
+    def _call_func(self, func_info:dict, func_name:str, purpose:POSSIBLE_PURPOSES, active_node:BaseType.BaseNode, event,
+                   goal_node:"typing.Union[BaseType.BaseNode, dict[str,int]]"=None, base_parameter=None, callb_section_data=None, section_name="", control_data=None, section_progress=None,
+                   datapack:typing.Optional[CbUtils.CallbackDatapack]=None):
+        '''calls registered function already checked to be permitted, handing it to its executor if it has one. reuses given section
+        datapack, only swapping in this callback's parameter and control data, otherwise builds one'''
         dev_log.debug(f"Dialog handler id'd <{id(self)}> starting running function named <{func_name}> for node <{self.get_active_node_key(active_node)}><{active_node.graph_node.id}> section <{purpose}> event id'd <{id(event)}> type <{type(event)}>")
-        func_ref = self.functions_cache.get(func_name)[0]["ref"]
-        datapack = CbUtils.CallbackDatapack(
-                                            active_node=active_node,
-                                            event=event,
-                                            base_parameter=copy.deepcopy(base_parameter) if base_parameter is not None else None,
-                                            goal_node_name=goal_node if isinstance(goal_node, str) else None,
-                                            goal_node=goal_node if not isinstance(goal_node, str) else None,
-                                            section_name=section_name,
-                                            section_data=callb_section_data if callb_section_data is not None else {},
-                                            control_data=control_data if control_data is not None else {},
-                                            section_progress=section_progress if section_progress is not None else {},
-                                            **self.pass_to_callbacks)
+        func_ref = func_info["ref"]
+        datapack = self._fill_datapack(datapack, active_node, event, goal_node=goal_node, base_parameter=base_parameter, callb_section_data=callb_section_data,
+                                       section_name=section_name, control_data=control_data, section_progress=section_progress)
+        if func_info.get("executor") == "thread":
+            # executor threads don't get context on their own, copy it so callback sees same clock
+            return asyncio.get_running_loop().run_in_executor(self.get_callback_thread_pool(), contextvars.copy_context().run, func_ref, datapack)
+        if func_info.get("executor") == "process":
+            return self._run_func_in_process(func_ref, datapack)
         return func_ref(datapack)
+
+    def _make_datapack(self, active_node:BaseType.BaseNode, event, goal_node:"typing.Union[BaseType.BaseNode, dict[str,int], str]"=None, section_name="",
+                       section_data=None, section_progress=None):
+        '''datapack for a section of callbacks, base parameter and control data are filled in for each callback'''
+        return CbUtils.CallbackDatapack(
+                                        active_node=active_node,
+                                        event=event,
+                                        base_parameter=None,
+                                        goal_node_name=goal_node if isinstance(goal_node, str) else None,
+                                        goal_node=goal_node if not isinstance(goal_node, str) else None,
+                                        section_name=section_name,
+                                        section_data=section_data if section_data is not None else {},
+                                        section_progress=section_progress,
+                                        extras=self.pass_to_callbacks)
+
+    def _fill_datapack(self, datapack:typing.Optional[CbUtils.CallbackDatapack], active_node:BaseType.BaseNode, event, goal_node=None, base_parameter=None,
+                       callb_section_data=None, section_name="", control_data=None, section_progress=None):
+        '''get datapack ready for one callback, making one if there isn't a section datapack to reuse'''
+        if datapack is None:
+            datapack = self._make_datapack(active_node, event, goal_node=goal_node, section_name=section_name, section_data=callb_section_data, section_progress=section_progress)
+        else:
+            # section data set again in case a callback replaced the dict instead of editing it
+            datapack.section_data = callb_section_data if callb_section_data is not None else datapack.section_data
+        datapack.base_parameter = copy.deepcopy(base_parameter) if base_parameter is not None else None
+        datapack.control_data = control_data if control_data is not None else {}
+        return datapack
+
+    def _get_result_cache_key(self, func_name:str, func_info:dict, datapack:CbUtils.CallbackDatapack):
+        '''key to keep filter's result under across events, None if result shouldn't be cached: runtime input for function is waiting in
+        section data, or key function didn't give back something hashable'''
+        runtime_input_key = getattr(func_info["ref"], "runtime_input_key", None)
+        if runtime_input_key is not None and runtime_input_key in datapack.section_data:
+            return None
+        try:
+            if func_info.get("cache_key") is not None:
+                result_key = (func_name, func_info["cache_key"](datapack))
+            else:
+                result_key = (func_name, CbUtils.freeze_parameter(datapack.base_parameter))
+            hash(result_key)
+        except TypeError as e:
+            exec_log.warning(f"handler id'd <{id(self)}> couldn't make cache key for filter <{func_name}>, running it without cache. {e}")
+            return None
+        return result_key
+
+    def _lookup_cached_result(self, result_key):
+        '''get cached result entry if it hasn't expired, dropping it if it has'''
+        entry = self.result_cache.get_ref(result_key, None) if result_key in self.result_cache.cache else None
+        if entry is not None and entry["expires"] <= Clock.now():
+            self.result_cache.remove_item(result_key)
+            self.expired_results += 1
+        if result_key not in self.result_cache:
+            return None
+        return self.result_cache.get_ref(result_key)
+
+    def invalidate_cached_results(self, func_name:typing.Optional[str]=None, cache_key=None):
+        '''drop kept filter results so next run calls the filter again
+
+        Parameters
+        ---
+        * func_name - `Optional[str]`
+            registered key of filter to drop results for, None to drop everything
+        * cache_key - `Any`
+            only drop the result kept under this key, what function's cache_key gives back. None to drop all of function's results
+
+        Returns
+        ---
+        `int` number of results dropped'''
+        if func_name is None:
+            dropped = len(self.result_cache)
+            self.result_cache.clear()
+            return dropped
+        if cache_key is not None:
+            return 1 if self.result_cache.remove_item((func_name, cache_key)) is not None else 0
+        result_keys = self.result_cache.get_keys(func_name, index_name="function", default=[])
+        for result_key in result_keys:
+            self.result_cache.remove_item(result_key)
+        return len(result_keys)
+
+    def get_result_cache_stats(self):
+        '''numbers on how well cross event filter result cache is doing
+
+        Returns
+        ---
+        `dict[str, Any]` cache's `size`, `hits`, `misses`, `evictions`, `hit_ratio`, plus `expired` count of results found too old and
+        `by_function` registered function key to count of results kept for it'''
+        stats = self.result_cache.cache.get_stats()
+        stats["expired"] = self.expired_results
+        stats["by_function"] = {func_name: len(result_keys) for func_name, result_keys in self.result_cache.secondary_indices["function"].pointers.items()
+                                if len(result_keys) > 0}
+        return stats
+
+    def _get_pure_memo_key(self, func_name:str, func_info:dict, event, base_parameter, section_data):
+        '''key to store pure filter's result under for current dispatch of event, None if result shouldn't be shared: event isn't being
+        dispatched, runtime input for function is waiting in section data, or parameter can't be made into a key'''
+        if id(event) not in self._dispatch_memos:
+            return None
+        runtime_input_key = getattr(func_info["ref"], "runtime_input_key", None)
+        if runtime_input_key is not None and section_data is not None and runtime_input_key in section_data:
+            return None
+        try:
+            return (func_name, CbUtils.freeze_parameter(base_parameter))
+        except TypeError:
+            return None
+
+    def _open_dispatch_memo(self, event):
+        '''start sharing pure filter results for event while it is dispatched to nodes'''
+        memo = self._dispatch_memos.setdefault(id(event), [0, {}])
+        memo[0] += 1
+
+    def _close_dispatch_memo(self, event):
+        memo = self._dispatch_memos.get(id(event))
+        if memo is None:
+            return
+        memo[0] -= 1
+        if memo[0] <= 0:
+            del self._dispatch_memos[id(event)]
+
+    async def _run_func_in_process(self, func_ref, datapack:CbUtils.CallbackDatapack):
+        '''run callback on a picklable view of datapack in process pool, then merge section and control data it changed back'''
+        view = CbUtils.CallbackDataView(datapack)
+        result, section_data, control_data = await asyncio.get_running_loop().run_in_executor(
+                self.get_callback_process_pool(), CbUtils.run_callback_view, func_ref, view)
+        CbUtils.merge_view_results(datapack, section_data, control_data)
+        return result
+
+    def get_callback_thread_pool(self):
+        '''get thread pool for callbacks registered with executor "thread", making it if needed'''
+        if self.callback_thread_pool is None:
+            self.callback_thread_pool = ThreadPoolExecutor(max_workers=self.settings.callback_threads, thread_name_prefix=f"dialog_handler_{id(self)}")
+        return self.callback_thread_pool
+
+    def get_callback_process_pool(self):
+        '''get process pool for callbacks registered with executor "process", making it if needed'''
+        if self.callback_process_pool is None:
+            self.callback_process_pool = ProcessPoolExecutor(max_workers=self.settings.callback_processes)
+        return self.callback_process_pool
+
+    def shutdown_callback_executors(self, wait=True):
+        '''shut down executors that run callbacks off of event loop. they are made again if another callback needs them
+
+        Parameters
+        ---
+        wait - `bool`
+            whether to block until callbacks already running finish'''
+        if self.callback_thread_pool is not None:
+            self.callback_thread_pool.shutdown(wait=wait, cancel_futures=True)
+            self.callback_thread_pool = None
+        if self.callback_process_pool is not None:
+            self.callback_process_pool.shutdown(wait=wait, cancel_futures=True)
+            self.callback_process_pool = None
     
     '''#############################################################################################
     ################################################################################################
@@ -1104,63 +1993,240 @@ class DialogHandler():
         '''wrapper for how the system determines for ids of sessions. Just to make sure it is consistent across the handler'''
         return id(session)
 
+    SNAPSHOT_VERSION = 1
+    '''format version of data `snapshot` makes, restore refuses other versions'''
+
+    @uses_handler_clock
+    def snapshot(self) -> bytes:
+        '''save active nodes and their sessions so they can be brought back with `restore`, ie after a restart. nodes save graph node id,
+        time left before timeout, and whatever node type gives from `BaseNode.snapshot_state`. sessions save data and time left. nodes that
+        are closing or closed and tasks in progress aren't saved.
+
+        Returns
+        ---
+        `bytes` pickled snapshot'''
+        session_indices:"dict[int, int]" = {}
+        sessions = []
+        nodes = []
+        now = Clock.now()
+        for active_node in self.active_node_cache.cache.values():
+            if not active_node.is_active():
+                continue
+            session_index = None
+            if active_node.session is not None:
+                session = active_node.session
+                session_index = session_indices.get(id(session))
+                if session_index is None:
+                    session_index = len(sessions)
+                    session_indices[id(session)] = session_index
+                    sessions.append({"time_left": session.timeout - now if session.timeout is not None else None, "data": session.data})
+            nodes.append({
+                "graph_node": active_node.graph_node.id,
+                "session": session_index,
+                "time_left": active_node.timeout - now if active_node.timeout is not None else None,
+                "state": active_node.snapshot_state()
+            })
+        dev_log.info(f"handler id'd <{id(self)}> snapshot has <{len(nodes)}> nodes and <{len(sessions)}> sessions")
+        return pickle.dumps({"version": DialogHandler.SNAPSHOT_VERSION, "saved_at": Clock.get_clock().to_wall(now), "sessions": sessions, "nodes": nodes},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    @uses_handler_clock
+    def restore(self, snapshot:bytes) -> "list[BaseType.BaseNode]":
+        '''bring back nodes and sessions saved by `snapshot` into this handler. nodes come back active without running any actions, keep the
+        time they had left before timing out, and are registered and given timeout tracking all at once. nodes whose graph node this handler
+        doesn't have are skipped. snapshot is unpickled so only restore ones from trusted places
+
+        Returns
+        ---
+        `list[BaseNode]` restored nodes in order they were saved'''
+        loaded = pickle.loads(snapshot)
+        if loaded.get("version") != DialogHandler.SNAPSHOT_VERSION:
+            raise ValueError(f"snapshot version <{loaded.get('version')}> can't be restored, handler reads version <{DialogHandler.SNAPSHOT_VERSION}>")
+        now = Clock.now()
+        sessions:"list[typing.Optional[SessionData.SessionData]]" = [None] * len(loaded["sessions"])
+        session_nodes:"dict[int, list[BaseType.BaseNode]]" = {}
+        restored = []
+        skipped = 0
+        for saved_node in loaded["nodes"]:
+            if saved_node["graph_node"] not in self.graph_node_indexer:
+                skipped += 1
+                continue
+            session = None
+            if saved_node["session"] is not None:
+                session = sessions[saved_node["session"]]
+                if session is None:
+                    saved_session = loaded["sessions"][saved_node["session"]]
+                    session = SessionData.SessionData(timeout_duration=timedelta(seconds=-1))
+                    session.timeout = now + saved_session["time_left"] if saved_session["time_left"] is not None else None
+                    session.data = saved_session["data"]
+                    sessions[saved_node["session"]] = session
+            active_node = self.graph_node_indexer.get_ref(saved_node["graph_node"]).activate_node(session)
+            active_node.timeout = now + saved_node["time_left"] if saved_node["time_left"] is not None else None
+            active_node.restore_state(saved_node["state"])
+            active_node.activate()
+            if session is not None:
+                session_nodes.setdefault(saved_node["session"], []).append(active_node)
+            restored.append(active_node)
+        if skipped > 0:
+            exec_log.warning(f"handler id'd <{id(self)}> restore skipped <{skipped}> nodes whose graph nodes aren't in handler")
+
+        for session_index, linked_nodes in session_nodes.items():
+            sessions[session_index].add_nodes(linked_nodes)
+        self.active_node_cache.add_items({self.get_active_node_key(active_node): active_node for active_node in restored})
+        self.create_timeout_group(restored)
+        self.create_timeout_group([session for session in sessions if session is not None])
+        dev_log.info(f"handler id'd <{id(self)}> restored <{len(restored)}> nodes and <{len([session for session in sessions if session is not None])}> sessions")
+        return restored
+
     '''#############################################################################################
     ################################################################################################
     ####                                       TASK MANGEMENT SECTION
     ################################################################################################
     ################################################################################################'''
 
-    def _remove_task_tracking(self, task_id):
-        '''remove task tracking from handler and do any cleanup needed'''
-        removed_task:HandlerTasks.HandlerTask = self.advanced_event_queue.remove_item(task_id)
-        if removed_task is not None:
-            # break any potential circular references. should not happen when using pattern of events in tracking is only previous scheduled tasks
-            removed_task.locking_tasks.clear()
+    def _track_task(self, task:HandlerTasks.HandlerTask):
+        '''add task to handler's queue. task will retire itself from queue the moment its run ends, so queue only ever holds pending
+        tasks and lookups for ordering don't need to filter anything out'''
+        self.advanced_event_queue.add_item(id(task), task)
+        task.add_finish_callback(self._retire_task)
+        # finish callbacks don't run if task is cancelled before it starts, done callback catches that
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task:HandlerTasks.HandlerTask):
+        '''done callback for tracked tasks. retires task if it never got to run its finish callbacks. exception is fetched so asyncio
+        knows it was handled, handler already logs it when task retires and tasks like timeout waiters are never awaited'''
+        exception = None if task.cancelled() else task.exception()
+        if id(task) not in self.advanced_event_queue:
+            return
+        task.was_cancelled = task.cancelled()
+        if exception is not None:
+            task.error = repr(exception)
+        self._retire_task(task)
+
+    def _retire_task(self, task:HandlerTasks.HandlerTask):
+        '''called when tracked task finishes. moves task out of queue of work and remembers a small record of it in ring of completed tasks.
+        Task lets go of event, node, and session it was working on so those can be freed right away'''
+        if self.advanced_event_queue.remove_item(id(task)) is None:
+            return
+        # if latest is done, nothing pending to order after anymore
+        if self._last_event_task is task:
+            self._last_event_task = None
+        if self._last_timeout_task is task:
+            self._last_timeout_task = None
+        if task.type == "EventTask" and task.admitted:
+            self.events_in_flight -= 1
+            self._admit_pending_events()
+        self.retired_task_count += 1
+        record = HandlerTasks.CompletedTaskRecord(task, node_id=self._get_task_node_key(task), session_id=self._get_task_session_key(task))
+        if record.exception is not None:
+            dev_log.warning(f"handler id'd <{id(self)}> task <{record.task_id}><{record.type}> finished with exception <{record.exception}>")
+        task.release()
+        self.completed_tasks.add_item(next(self._completed_task_keys), record)
+
+    def _get_task_node_key(self, task:HandlerTasks.HandlerTask):
+        '''key of node task is working on, None if task doesn't work on a node'''
+        if task.type == "NodeEventTask":
+            return self.get_active_node_key(task.active_node)
+        if task.type in ["NodeTimeoutTask", "TimeoutWaiter"] and issubclass(task.timeoutable.__class__, BaseType.BaseNode):
+            return self.get_active_node_key(task.timeoutable)
+        return None
+
+    def _get_task_session_key(self, task:HandlerTasks.HandlerTask):
+        '''key of session task is working on, None if task doesn't work on a session'''
+        if task.type == "SessionEventTask":
+            return self.get_session_key(task.session)
+        if task.type in ["SessionTimeoutTask", "TimeoutWaiter"] and isinstance(task.timeoutable, SessionData.SessionData):
+            return self.get_session_key(task.timeoutable)
+        return None
 
-    def _filter_active_tasks(self, task_list:'list[HandlerTasks.HandlerTask]', extra_filter_tasks=None):
-        '''cache cannot index using wether or not task completed. filter out anything that has completed and clean up anything that should
-        be cleared out of tracking'''
-        filtered_list = []
-        for task in task_list:
-            dev_log.debug(f"checking up on task <{id(task)}>, done? <{task.done()}> exception <{task.exception() if task.done() else 'not done'}>")
-            if task.stop_time is None:
-                # if stop time is filled, task is done, so filtering only looking for tasks that are done
-                if extra_filter_tasks is None or id(task) not in [id(task) for task in extra_filter_tasks]:
-                    # if none, there isn't any extra filters so can add
-                    filtered_list.append(task)
-            elif task.stop_time + self.settings.task_age < datetime.utcnow():
-                self._remove_task_tracking(id(task))
-        return filtered_list
+    def _get_ordering_locks(self, is_timeout=False):
+        '''tasks a new event or timeout task needs to wait on to keep strict ordering. events wait on earlier events, timeouts wait on
+        earlier events and timeouts. each ordered task already waits on the ones before it of the same kind, so only the latest event and
+        latest timeout are needed no matter how many are queued'''
+        if not self.settings.strict_event_order:
+            return []
+        locks = []
+        if self._last_event_task is not None:
+            locks.append(self._last_event_task)
+        if is_timeout and self._last_timeout_task is not None:
+            locks.append(self._last_timeout_task)
+        return locks
+
+    def _add_ordered_task(self, task:HandlerTasks.HandlerTask):
+        '''give event or timeout task its order number and make it latest task of its kind for ordering'''
+        task.sequence = next(self._event_sequence)
+        if task.type == "EventTask":
+            self._last_event_task = task
+        else:
+            self._last_timeout_task = task
 
-    def _create_handle_event_task(self, event_type, event):
+    def _exclude_tasks(self, task_list:'list[HandlerTasks.HandlerTask]', exclude_ids:'set[int]'=None):
+        '''queue only holds pending tasks, this is for removing specific tasks caller knows it shouldn't wait on'''
+        if not exclude_ids:
+            return task_list
+        return [task for task in task_list if id(task) not in exclude_ids]
+
+    def get_queue_metrics(self):
+        '''numbers on how much task bookkeeping handler is holding on to
+
+        Returns
+        ---
+        `dict[str, Any]` - `queued_tasks` count of unfinished tasks in queue, `queued_by_type` task type to count of unfinished tasks,
+        `completed_records` count of finished tasks remembered, `retired_tasks` total tasks finished so far, `completed_evictions` finished
+        tasks forgotten because of size or age limits'''
+        type_index = self.advanced_event_queue.secondary_indices["task_type"]
+        return {
+            "queued_tasks": len(self.advanced_event_queue),
+            "queued_by_type": {task_type: len(task_keys) for task_type, task_keys in type_index.pointers.items()},
+            "completed_records": len(self.completed_tasks),
+            "retired_tasks": self.retired_task_count,
+            "completed_evictions": self.completed_tasks.cache.evictions,
+            "workers": self.worker_pool.get_stats() if self.worker_pool is not None else None,
+            "ingress": self.get_ingress_metrics()
+        }
+
+    def _create_handle_event_task(self, event_type, event, priority:typing.Optional[int]=None):
         dev_log.info(f"handler id'd <{id(self)}> has been notified of event happening. event <{id(event)}><{event_type}> oject type <{type(event)}>, creating task for handling")
-        to_await_event_tasks = []
-        existing_event_tasks:list[HandlerTasks.HandlerTask] = self.advanced_event_queue.get("EventTask", index_name="task_type", default=[])
-        existing_event_tasks = self._filter_active_tasks(existing_event_tasks)
-        if self.settings.strict_event_order:
-            to_await_event_tasks.extend(existing_event_tasks)
-        task = HandlerTasks.HandleEventTask(handler_func=self._handle_event_task, event_type=event_type, event=event, locking_tasks=to_await_event_tasks)
+        to_await_event_tasks = self._get_ordering_locks()
+        task = HandlerTasks.HandleEventTask(handler_func=self._handle_event_task, event_type=event_type, event=event, locking_tasks=to_await_event_tasks,
+                                            priority=self.get_event_priority(event_type, priority))
         dev_log.debug(f"task for <{id(event)}><{event_type}> task is <{id(task)}> waiting on other tasks. locking tasks are <{[id(item) for item in to_await_event_tasks]}>")
-        self.advanced_event_queue.add_item(id(task), task)
+        self._add_ordered_task(task)
+        self._track_task(task)
         return task
     
-    async def _handle_event_task(self, event_type, event, waiting_period_sec):
+    async def _handle_event_task(self, event_type, event, waiting_period_sec, priority:typing.Optional[int]=None):
         dev_log.info(f"handler id'd <{id(self)}> event <{id(event)}><{event_type}> starting handling")
+        self._open_dispatch_memo(event)
+        try:
+            await self._dispatch_event(event_type, event, waiting_period_sec, priority=priority)
+        finally:
+            self._close_dispatch_memo(event)
+
+    async def _dispatch_event(self, event_type, event, waiting_period_sec, priority:typing.Optional[int]=None):
+        '''send event out to all nodes waiting for it and wait for them to finish handling it'''
         waiting_node_keys = self.active_node_cache.get_keys(event_type, index_name="event_forwarding", default=[])
         dev_log.debug(f"handler id'd <{id(self)}>, event <{id(event)}><{event_type}> nodes waiting for event are <{[f'<{str(self.get_active_node_key(self.active_node_cache.get_ref(x)))}><{self.active_node_cache.get_ref(x).graph_node.id}>' for x in waiting_node_keys]}>")
         # don't use gather here, think it batches it so all nodes responding to event have to pass callbacks before any one of them go on to transitions
         # each node is mostly independent of others for each event and don't want them to wait for another node to finish
-        
+        if self.worker_pool is not None:
+            notify_results = await asyncio.gather(*self.dispatch_event_work(event, event_type, waiting_node_keys, priority=priority))
+            dev_log.debug(f"handler id'd <{id(self)}>, event <{id(event)}> end of handle_event results are <{notify_results}>")
+            return
+
         session_tasks, node_tasks = self.gather_event_tasks(event, event_type, waiting_period_sec=waiting_period_sec, waiting_node_keys=waiting_node_keys)
 
         notify_results = await asyncio.gather(*[*node_tasks, *session_tasks.values()])
         dev_log.debug(f"handler id'd <{id(self)}>, event <{id(event)}> end of handle_event results are <{notify_results}>")
 
-    def gather_event_tasks(self, event, event_type, waiting_period_sec, waiting_node_keys, filter_tasks=None):
+    def gather_event_tasks(self, event, event_type, waiting_period_sec, waiting_node_keys, filter_tasks=None, node_events:typing.Optional[dict]=None):
+        '''create and track tasks for running event on given nodes and their sessions, each waiting on earlier tasks for same node or session.
+        node_events can give a different event object for some node keys, those nodes get that instead of event'''
         session_tasks:dict[str, HandlerTasks.HandleSessionEventTask] = {}
         '''track sessions that are involved for the nodes we are trying to run on'''
         node_tasks = []
         '''tasks for all nodes to run on'''
+        exclude_ids = set(id(task) for task in filter_tasks) if filter_tasks else None
 
         # new event needs to be scheduled for all nodes that are waiting for it
         # either at same time as previous events or after, is a setting
@@ -1173,25 +2239,26 @@ class DialogHandler():
             if node.session is not None:
                 # find if there's any previous events still being processed for the session
                 found_session_tasks = self.advanced_event_queue.get(self.get_session_key(node.session), index_name="session_id", default=[])
-                found_session_tasks = self._filter_active_tasks(found_session_tasks, filter_tasks)
+                found_session_tasks = self._exclude_tasks(found_session_tasks, exclude_ids)
                 # event ordering constraints mean new event tasks must wait for all previous. 
                 # including new node tasks for previous event session tasks
                 node_locking_tasks.extend(found_session_tasks)
                 session_locking_tasks.extend(found_session_tasks)
                 # timeout tasks also require working on node so should lock for those
                 found_session_timeouts = self.advanced_event_queue.get(self.get_session_key(node.session), index_name="session_timeouts",default=[])
-                found_session_timeouts = self._filter_active_tasks(found_session_timeouts, filter_tasks)
+                found_session_timeouts = self._exclude_tasks(found_session_timeouts, exclude_ids)
                 node_locking_tasks.extend(found_session_timeouts)
                 session_locking_tasks.extend(found_session_timeouts)
             # find if any previous events still being processed for the node
             found_node_tasks = self.advanced_event_queue.get(self.get_active_node_key(node), index_name="node_id", default=[])
-            found_node_tasks = self._filter_active_tasks(found_node_tasks, filter_tasks)
+            found_node_tasks = self._exclude_tasks(found_node_tasks, exclude_ids)
             node_locking_tasks.extend(found_node_tasks)
             # also wait for timeout events
             timeout_tasks = self.advanced_event_queue.get(self.get_active_node_key(node), index_name="node_timeouts", default=[])
-            timeout_tasks = self._filter_active_tasks(timeout_tasks, filter_tasks)
+            timeout_tasks = self._exclude_tasks(timeout_tasks, exclude_ids)
             node_locking_tasks.extend(timeout_tasks)
-            node_task = HandlerTasks.HandleNodeEventTask(self._run_event_on_node, active_node=node, event=event, event_type=event_type, locking_tasks=node_locking_tasks, waiting_period_sec=waiting_period_sec)
+            node_event = node_events.get(node_key, event) if node_events is not None else event
+            node_task = HandlerTasks.HandleNodeEventTask(self._run_event_on_node, active_node=node, event=node_event, event_type=event_type, locking_tasks=node_locking_tasks, waiting_period_sec=waiting_period_sec)
             dev_log.debug(f"task created for running event <{id(event)}><{event_type}> on <{self.get_active_node_key(node)}><{node.graph_node.id}>, id <{id(node_task)}> locking are: {[id(task) for task in node_locking_tasks]}")
             if node.session is not None and self.get_session_key(node.session) not in session_tasks:
                 # there won't be a session for this event yet since still processing and adding to trackers is last step
@@ -1203,12 +2270,60 @@ class DialogHandler():
             node_tasks.append(node_task)
         # only add the current event tasks to tracking after processing so can't accidentally wait on task from this round
         for task in node_tasks:
-            self.advanced_event_queue.add_item(id(task), task)
+            self._track_task(task)
         for task in session_tasks.values():
             task.set_node_tasks(node_tasks)
-            self.advanced_event_queue.add_item(id(task), task)
+            self._track_task(task)
         return session_tasks, node_tasks
 
+    def get_work_lane(self, timeoutable:typing.Union[BaseType.BaseNode, SessionData.SessionData]):
+        '''key of worker lane work on a node or session goes in. all nodes in a session share a lane so session stays consistent'''
+        if isinstance(timeoutable, SessionData.SessionData):
+            return ("session", self.get_session_key(timeoutable))
+        if timeoutable.session is not None:
+            return ("session", self.get_session_key(timeoutable.session))
+        return ("node", self.get_active_node_key(timeoutable))
+
+    def dispatch_event_work(self, event, event_type, waiting_node_keys, priority:typing.Optional[int]=None) -> "list[asyncio.Future]":
+        '''worker mode version of `gather_event_tasks`. sorts nodes into lanes and submits one work item per lane to worker pool'''
+        lane_nodes:"dict[typing.Any, list[BaseType.BaseNode]]" = {}
+        for node_key in waiting_node_keys:
+            node = self.active_node_cache.get_ref(node_key)
+            lane_nodes.setdefault(self.get_work_lane(node), []).append(node)
+        futures = []
+        for lane, nodes in lane_nodes.items():
+            futures.append(self.worker_pool.submit(lane, self._run_event_on_lane, nodes, event_type, event, nodes[0].session,
+                                                   priority=self.get_event_priority(event_type, priority)))
+        dev_log.debug(f"handler id'd <{id(self)}> event <{id(event)}><{event_type}> submitted work for <{len(waiting_node_keys)}> nodes in <{len(futures)}> lanes")
+        return futures
+
+    async def _run_event_on_lane(self, nodes:"list[BaseType.BaseNode]", event_type, event, session:typing.Optional[SessionData.SessionData]=None):
+        '''worker item for running event on nodes that share a lane, one after another. if nodes are in a session, this also does what
+        `session_event_task` does afterwards'''
+        close_session = False
+        for node in nodes:
+            result = await self._run_event_on_node(node, event_type, event)
+            if result is not None and result.close_session is not None:
+                close_session = close_session or result.close_session
+        if session is not None and close_session:
+            dev_log.debug(f"handler id'd <{id(self)}>, handling event <{id(event)}><{event_type}> for session <{self.get_session_key(session)}> found needs to close session")
+            await self.close_session(session)
+
+    async def _run_timeout_on_lane(self, timeoutable:typing.Union[BaseType.BaseNode, SessionData.SessionData], nodes:"list[BaseType.BaseNode]", event):
+        '''worker item for handling a timeout, runs timeout event on nodes then closes timeoutable if it still timed out'''
+        session = timeoutable if isinstance(timeoutable, SessionData.SessionData) else timeoutable.session
+        await self._run_event_on_lane(nodes, "timeout", event, session)
+        if timeoutable.timeout is not None and timeoutable.timeout <= Clock.now():
+            if isinstance(timeoutable, SessionData.SessionData):
+                await self.close_session(timeoutable, timed_out=True)
+            else:
+                await self.close_node(timeoutable, timed_out=True)
+
+    def stop_workers(self):
+        '''stop worker pool if handler has one. work not done yet is cancelled'''
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
+
     async def session_event_task(self, session, event_type, event, node_tasks):
         dev_log.debug(f"handler id'd <{id(self)}>, handling event <{id(event)}><{event_type}> for session <{self.get_active_node_key(session)}> starting session task, waiting on <{[id(task) for task in node_tasks]}>")
         await asyncio.gather(*node_tasks)
@@ -1238,12 +2353,12 @@ class DialogHandler():
         #   not using timeout passed for conditions in case this task started after timeout was set because it was set to be veerrrrryyy soon
         while timeoutable.timeout is not None and timeoutable.is_active():
             # the wait and keep checking loop
-            while datetime.utcnow() < timeoutable.timeout:
+            while Clock.now() < timeoutable.timeout:
                 task.status = TASK_STATE.WAITING
                 # try to sleep at most the given waiting_seconds just so is somewhat active and can respond to cancels or changes
-                delay = min(max(0, (timeoutable.timeout - datetime.utcnow()).total_seconds()), waiting_seconds)
+                delay = min(max(0, timeoutable.timeout - Clock.now()), waiting_seconds)
                 dev_log.debug(f"handler id'd <{id(self)}> waiting for a timeout for <{type}><{self.get_active_node_key(timeoutable) if type == 'Node' else self.get_session_key(timeoutable)}>. sleeping for <{delay}>")
-                await asyncio.sleep(delay)
+                await Clock.sleep(delay)
                 if not timeoutable.is_active() or timeoutable.timeout is None:
                     dev_log.debug(f"handler id'd <{id(self)}> after waiting for a timeout for <{type}><{self.get_active_node_key(timeoutable) if type == 'Node' else self.get_session_key(timeoutable)}>. found it is closed or timeout disabled")
                     # if timeout was stopped or node already closed, don't need to continue checking and running
@@ -1253,22 +2368,98 @@ class DialogHandler():
             if id(task) not in self.advanced_event_queue:
                 return
             task.status = TASK_STATE.EVENT
+            await self._run_timeout_handling(timeoutable, type, waiting_seconds)
+            if timeoutable.status == ITEM_STATUS.CLOSED:
+                return
+            if timeoutable.timeout is not None and Clock.now() > timeoutable.timeout:
+                # if actual timeout set and has passed
+                return
 
-            existing_event_tasks:list[HandlerTasks.HandlerTask] = []
-            if self.settings.strict_event_order:
-                # events must happen in order they came so wait on all timeouts as well
-                existing_event_tasks = self.advanced_event_queue.get("EventTask", index_name="task_type", default=[])
-                existing_event_tasks = self._filter_active_tasks(existing_event_tasks)
-                timeout_events = self.advanced_event_queue.get("SessionTimeoutTask", index_name="task_type", default=[])
-                timeout_events = self._filter_active_tasks(timeout_events)
-                existing_event_tasks.extend(timeout_events)
-                timeout_events = self.advanced_event_queue.get("NodeTimeoutTask", index_name="task_type", default=[])
-                timeout_events = self._filter_active_tasks(timeout_events)
-                existing_event_tasks.extend(timeout_events)
-            if type == "Node" and len(self._filter_active_tasks(self.advanced_event_queue.get(self.get_active_node_key(timeoutable), index_name="NodeTimeoutTask", default = []))) > 0:
+    async def wait_timeout_group(self, timeoutables:list, waiting_seconds):
+        '''tracker task watching timeouts for a group of nodes or sessions, works like `wait_timeout` for each one. runs timeout
+        handling for each as it comes due, finishes once none are left that can time out'''
+        task = asyncio.current_task()
+        watching = list(timeoutables)
+        while True:
+            watching = [timeoutable for timeoutable in watching if timeoutable.is_active()]
+            timed = [timeoutable for timeoutable in watching if timeoutable.timeout is not None]
+            if len(timed) == 0:
+                return
+            now = Clock.now()
+            due = [timeoutable for timeoutable in timed if timeoutable.timeout <= now]
+            if len(due) == 0:
+                task.status = TASK_STATE.WAITING
+                delay = min(max(0, min(timeoutable.timeout for timeoutable in timed) - now), waiting_seconds)
+                dev_log.debug(f"handler id'd <{id(self)}> waiting for timeouts of group of <{len(timed)}>. sleeping for <{delay}>")
+                await Clock.sleep(delay)
+                continue
+            if id(task) not in self.advanced_event_queue:
+                return
+            task.status = TASK_STATE.EVENT
+            await asyncio.gather(*[self._run_timeout_handling(timeoutable, "Node" if issubclass(timeoutable.__class__, BaseType.BaseNode) else "Session", waiting_seconds)
+                                   for timeoutable in due])
+            # same as single waiter, stop watching anything that had its timeout handled and still wasn't given more time
+            now = Clock.now()
+            due_ids = set(id(timeoutable) for timeoutable in due)
+            watching = [timeoutable for timeoutable in watching if id(timeoutable) not in due_ids or (timeoutable.timeout is not None and timeoutable.timeout > now)]
+
+    async def _run_timeout_handling(self, timeoutable:typing.Union[BaseType.BaseNode, SessionData.SessionData], type:str, waiting_seconds):
+        '''queue task to handle timeout of node or session that is due, in order with events, and wait for it. nodes go into a sweep with
+        other nodes timing out around the same time'''
+        if type == "Node":
+            return await self._join_timeout_sweep(timeoutable, waiting_seconds)
+        await self._queue_timeout_task(timeoutable, type, waiting_seconds)
+
+    async def _join_timeout_sweep(self, active_node:BaseType.BaseNode, waiting_seconds):
+        '''add node that timed out to sweep that is collecting, starting one if there isn't one, and wait until sweep handled it'''
+        sweep = self.timeout_sweep
+        if sweep is None:
+            sweep = {"nodes": [], "node_ids": set(), "future": asyncio.get_running_loop().create_future()}
+            self.timeout_sweep = sweep
+            sweep["task"] = asyncio.create_task(self._run_timeout_sweep(sweep, waiting_seconds))
+        if id(active_node) not in sweep["node_ids"]:
+            sweep["node_ids"].add(id(active_node))
+            sweep["nodes"].append(active_node)
+        # shield so one waiter getting cancelled doesn't cancel sweep for others
+        await asyncio.shield(sweep["future"])
+
+    async def _run_timeout_sweep(self, sweep:dict, waiting_seconds):
+        '''waits for sweep window then handles all nodes collected as one timeout task'''
+        await Clock.sleep(self.settings.timeout_sweep_window)
+        # done collecting, anything timing out from now on starts next sweep
+        if self.timeout_sweep is sweep:
+            self.timeout_sweep = None
+        try:
+            if len(sweep["nodes"]) == 1:
+                await self._queue_timeout_task(sweep["nodes"][0], "Node", waiting_seconds)
+            else:
+                self.timeout_sweep_count += 1
+                await self._queue_timeout_task(sweep["nodes"], "Node", waiting_seconds)
+        except Exception as e:
+            sweep["future"].set_exception(e)
+            # waiters might have been cancelled, don't complain about nobody getting exception
+            sweep["future"].exception()
+        else:
+            sweep["future"].set_result(None)
+
+    async def _queue_timeout_task(self, timeoutable:typing.Union[BaseType.BaseNode, SessionData.SessionData, list], type:str, waiting_seconds):
+        '''queue task to handle timeout of node or session, or list of nodes for a sweep, in order with events and wait for it'''
+        # events must happen in order they came so under strict ordering timeouts wait for all earlier events and timeouts
+        existing_event_tasks:list[HandlerTasks.HandlerTask] = self._get_ordering_locks(is_timeout=True)
+        timeoutables = timeoutable if isinstance(timeoutable, list) else [timeoutable]
+        for item in timeoutables:
+            if type == "Node" and len(self.advanced_event_queue.get_keys(self.get_active_node_key(item), index_name="node_timeouts", default=[])) > 0:
                 dev_log.error(f"TIMEOUT WAITER FOUND THERE'S ANOTHER TASK HANDLING TIMEOUT. LIKELY SOMETHING VERY WRONG THERE'S TWO TASKS WAITING ON SAME THING")
-            if type == "Session" and len(self._filter_active_tasks(self.advanced_event_queue.get(self.get_session_key(timeoutable), index_name="SessionTimeoutTask", default = []))) > 0:
+            if type == "Session" and len(self.advanced_event_queue.get_keys(self.get_session_key(item), index_name="session_timeouts", default=[])) > 0:
                 dev_log.error(f"TIMEOUT WAITER FOUND THERE'S ANOTHER TASK HANDLING TIMEOUT. LIKELY SOMETHING VERY WRONG THERE'S TWO TASKS WAITING ON SAME THING")
+        if isinstance(timeoutable, list):
+            timeout_handler_task = HandlerTasks.HandleTimeoutSweepTask(
+                self.handle_timeout_sweep,
+                timeoutables=timeoutable,
+                locking_tasks=existing_event_tasks,
+                waiting_period_sec=waiting_seconds
+            )
+        else:
             timeout_handler_task = HandlerTasks.HandleTimeoutTask(
                 self.handle_timeout,
                 timeoutable=timeoutable,
@@ -1276,15 +2467,11 @@ class DialogHandler():
                 locking_tasks=existing_event_tasks,
                 waiting_period_sec=waiting_seconds
             )
-            dev_log.debug(f"handler id'd <{id(self)}> timeout waiter for <{type}><{self.get_active_node_key(timeoutable) if type == 'Node' else self.get_session_key(timeoutable)}>. created timeout handler task <{id(timeout_handler_task)}> locking tasks found to be <{[id(task) for task in existing_event_tasks]}>")
-            self.advanced_event_queue.add_item(id(timeout_handler_task), timeout_handler_task)
-            dev_log.debug(f"task queue size <{len(self.advanced_event_queue)}>")
-            await timeout_handler_task
-            if timeoutable.status == ITEM_STATUS.CLOSED:
-                return
-            if timeoutable.timeout is not None and datetime.utcnow() > timeoutable.timeout:
-                # if actual timeout set and has passed
-                return
+        dev_log.debug(f"handler id'd <{id(self)}> timeout waiter for <{type}><{[self.get_active_node_key(item) if type == 'Node' else self.get_session_key(item) for item in timeoutables]}>. created timeout handler task <{id(timeout_handler_task)}> locking tasks found to be <{[id(task) for task in existing_event_tasks]}>")
+        self._add_ordered_task(timeout_handler_task)
+        self._track_task(timeout_handler_task)
+        dev_log.debug(f"task queue size <{len(self.advanced_event_queue)}>")
+        await timeout_handler_task
 
     async def handle_timeout(self, timeoutable:typing.Union[BaseType.BaseNode, SessionData.SessionData], waiting_seconds):
         if not timeoutable.is_active():
@@ -1295,7 +2482,8 @@ class DialogHandler():
             nodes = [self.get_active_node_key(timeoutable)]
         elif isinstance(timeoutable, SessionData.SessionData):
             type = "Session"
-            nodes = [self.get_active_node_key(node) for node in timeoutable.linked_nodes]
+            # session keeps nodes that already closed until it is cleared, those aren't tracked anymore
+            nodes = [self.get_active_node_key(node) for node in timeoutable.linked_nodes if node.is_active()]
         task = asyncio.current_task()
         event = {"type": type, "original_timeout": timeoutable.timeout}
         #TODO: timeout handler when object is wrong type?
@@ -1305,19 +2493,44 @@ class DialogHandler():
         # session represents what session needs to handle timeout event potentially having close session flag
         # nodes are either one or all of the same session
         # these are the nodes that have to run the timeout event
+        if self.worker_pool is not None:
+            node_objs = [self.active_node_cache.get_ref(node_key) for node_key in nodes if node_key in self.active_node_cache]
+            await self.worker_pool.submit(self.get_work_lane(timeoutable), self._run_timeout_on_lane, timeoutable, node_objs, event,
+                                          priority=self.get_event_priority("timeout"))
+            return
 
         session_tasks, node_tasks = self.gather_event_tasks(event, 'timeout', waiting_period_sec=waiting_seconds, waiting_node_keys=nodes, filter_tasks=[task])
         final_await_list = [*node_tasks, *session_tasks.values()]
 
         # await all event handling to finish before continuing timeout handling
         await asyncio.gather(*final_await_list)
-        if timeoutable.timeout is not None and timeoutable.timeout <= datetime.utcnow():
+        if timeoutable.timeout is not None and timeoutable.timeout <= Clock.now():
             dev_log.debug(f"handler id'd <{id(self)}> timeout handler for <{type}><{self.get_active_node_key(timeoutable) if type == 'Node' else self.get_session_key(timeoutable)}>. found timeout gone, need to close")
             if type == "Node":
                 await self.close_node(timeoutable, timed_out=True)
             else:
                 await self.close_session(timeoutable, timed_out=True)
 
+    async def handle_timeout_sweep(self, active_nodes:"list[BaseType.BaseNode]", waiting_seconds):
+        '''handle timeouts of many nodes at once. like `handle_timeout` each node gets its own timeout event, but event tasks are set up in one
+        go and nodes still timed out after are closed together'''
+        active_nodes = [active_node for active_node in active_nodes if active_node.is_active()]
+        if len(active_nodes) == 0:
+            return
+        dev_log.debug(f"handler id'd <{id(self)}> timeout sweep handling <{len(active_nodes)}> nodes. started")
+        if self.worker_pool is not None:
+            # work goes to lanes per node or session anyways, nothing to share
+            await asyncio.gather(*[self.handle_timeout(active_node, waiting_seconds) for active_node in active_nodes])
+            return
+
+        task = asyncio.current_task()
+        node_events = {self.get_active_node_key(active_node): {"type": "Node", "original_timeout": active_node.timeout} for active_node in active_nodes}
+        session_tasks, node_tasks = self.gather_event_tasks(next(iter(node_events.values())), 'timeout', waiting_period_sec=waiting_seconds,
+                                                            waiting_node_keys=list(node_events.keys()), filter_tasks=[task], node_events=node_events)
+        await asyncio.gather(*node_tasks, *session_tasks.values())
+        now = Clock.now()
+        await self.close_nodes([active_node for active_node in active_nodes if active_node.timeout is not None and active_node.timeout <= now], timed_out=True)
+
     '''#############################################################################################
     ################################################################################################
     ####                                       CLEANING OUT NODES SECTION
@@ -1357,11 +2570,24 @@ class DialogHandler():
         if issubclass(timeoutable.__class__, BaseType.BaseNode):
             task = HandlerTasks.HandleTimeoutWaiter(self.wait_timeout, timeoutable, waiting_period_sec=4)
             dev_log.debug(f"handler id'd <{id(self)}> creating timeout task <{id(task)}> for node <{self.get_active_node_key(timeoutable)}><{timeoutable.graph_node.id}>, handling happens in <{timeoutable.time_left()}>")
-            self.advanced_event_queue.add_item(id(task), task)
+            self._track_task(task)
         elif isinstance(timeoutable, SessionData.SessionData):
             task = HandlerTasks.HandleTimeoutWaiter(self.wait_timeout, timeoutable, waiting_period_sec=4)
             dev_log.debug(f"handler id'd <{id(self)}> creating timeout task <{id(task)}> for session <{self.get_session_key(timeoutable)}>, handling happens in <{timeoutable.time_left()}>")
-            self.advanced_event_queue.add_item(id(task), task)
+            self._track_task(task)
+
+    def create_timeout_group(self, timeoutables:list):
+        '''like `create_timeout_tracker` for many nodes or sessions at once. everything in list that can time out and isn't tracked yet
+        is watched by one shared waiter task'''
+        untracked = [timeoutable for timeoutable in timeoutables if timeoutable.timeout is not None and len(self.get_active_timeout_tracker(timeoutable)) == 0]
+        if len(untracked) == 0:
+            return
+        if len(untracked) == 1:
+            self.create_timeout_tracker(untracked[0])
+            return
+        task = HandlerTasks.HandleGroupTimeoutWaiter(self.wait_timeout_group, untracked, waiting_period_sec=4)
+        dev_log.debug(f"handler id'd <{id(self)}> creating group timeout task <{id(task)}> for <{len(untracked)}> items")
+        self._track_task(task)
 
     def update_timeout_tracker(self,
                                timeoutable:typing.Union[BaseType.BaseNode, SessionData.SessionData],
@@ -1375,7 +2601,7 @@ class DialogHandler():
             timeoutable_id = self.get_session_key(timeoutable)
             type = "Session"
             dev_log.debug(f"updating timeout tracker for a session. think id is <{timeoutable_id}>, new timeout {timeoutable.timeout} odl timeout is {old_timeout}")
-            dev_log.debug(f"current status is <{[id(self.advanced_event_queue.get_ref(task_key).timeoutable) for task_key in self.advanced_event_queue.get_keys('TimeoutWaiter', index_name='task_type')]}>")
+            dev_log.debug(f"current status is <{[id(self.advanced_event_queue.get_ref(task_key).timeoutable) for task_key in self.advanced_event_queue.get_keys('TimeoutWaiter', index_name='task_type', default=[])]}>")
         if timeoutable.timeout is not None:
             # there is a timeout on item
             if old_timeout is None:
@@ -1394,11 +2620,14 @@ class DialogHandler():
         this_cleaning = asyncio.current_task()
         cleaning_logger.info(f"clean task id <{id(this_cleaning)}><{this_cleaning}> starting, period is <{task_period}>")
         # want forever running task while handler is alive
+        # tasks retire themselves when done, only thing left is forgetting finished ones that got too old while ring is quiet
         while True:
-            tasks_list = list(self.advanced_event_queue.cache.values())
-            self._filter_active_tasks(tasks_list)
-            await asyncio.sleep(task_period)
+            expired = self.completed_tasks.cache.expire()
+            if expired > 0:
+                cleaning_logger.debug(f"clean task id <{id(this_cleaning)}> dropped <{expired}> old finished tasks")
+            await Clock.sleep(task_period)
 
+    @uses_handler_clock
     def start_cleaning(self, event_loop:asyncio.AbstractEventLoop=None):
         if self.cleaning_task is None:
             event_loop = asyncio.get_event_loop() if event_loop is None else event_loop
@@ -1,6 +1,6 @@
 #TODO: is adding values onto fields such as event filters feasible?
 #TODO: double check if inherited from parent class's set and update methods should be used (probably, but further down pipeline problem)
-from datetime import datetime, timedelta
+from datetime import timedelta
 import typing
 import src.utils.SessionData as SessionData
 import yaml
@@ -11,6 +11,7 @@ import src.utils.Cache as Cache
 import src.utils.ValidationUtils as ValidationUtils
 import src.utils.DotNotator as DotNotator
 import src.utils.SectionUtils as SectionUtils
+import src.utils.Clock as Clock
 
 class BaseGraphNode:
     VERSION = "3.8.0"
@@ -135,6 +136,11 @@ properties:
                                             - type: "array"
                                               items:
                                                 enum: ["node", "session"]
+                                    parallel:
+                                        anyOf:
+                                            - type: boolean
+                                            - type: integer
+                                              minimum: 1
                                     session_chaining:
                                         oneOf:
                                             - enum: ["start", "chain", "section"]
@@ -335,7 +341,7 @@ required: ["id"]
             # specifically, don't time out
             self.timeout = None
         else:
-            self.timeout = datetime.utcnow() + timeout_duration
+            self.timeout = Clock.now() + timeout_duration.total_seconds()
 
     def activate_node(self, session:typing.Union[None, SessionData.SessionData]=None) -> "BaseNode":
         '''creates and returns an active Node of the GraphNode's type. if there's a passed in session object, ties the created active node to the session'''
@@ -554,7 +560,7 @@ required: ["id"]
             # this class doesn't have any fields to add, only base type cannot be allowed to do this
             if cls.__name__ == BaseGraphNode.__name__:
                 raise Exception("Base type fields definition is critically malformed. whole system canot be used.")
-            cls.CLASS_FIELDS = (datetime.utcnow(), list(final_definitions.values()))
+            cls.CLASS_FIELDS = (Clock.now(), list(final_definitions.values()))
             return list(final_definitions.values())
         if not isinstance(self_modifications, dict) or "options" not in self_modifications or self_modifications["options"] is None:
             raise Exception(f"node type <{cls.TYPE}> has badly formed fields. Must be either empty or have a list of fields in yaml format")
@@ -564,7 +570,7 @@ required: ["id"]
                 raise Exception(f"node type <{cls.TYPE}> has malformed option: An option in definition is missing a name")
             final_definitions[single_field["name"]] = single_field
 
-        cls.CLASS_FIELDS = (datetime.utcnow(), list(final_definitions.values()))
+        cls.CLASS_FIELDS = (Clock.now(), list(final_definitions.values()))
         return list(final_definitions.values())
 
     @classmethod
@@ -590,12 +596,12 @@ required: ["id"]
             # this class doesn't have any schema to add, only base type cannot be allowed to do this
             if cls.__name__ == BaseGraphNode.__name__:
                 raise Exception("Base type schema is critically malformed. whole system canot be used.")
-            cls.PARSED_SCHEMA = (datetime.utcnow(), final_schema)
+            cls.PARSED_SCHEMA = (Clock.now(), final_schema)
             return copy.deepcopy(final_schema)
         if not isinstance(self_schema, dict):
             raise Exception(f"node type <{cls.TYPE}> seems to have badly formed schema.")
         final_schema["allOf"].append(self_schema)
-        cls.PARSED_SCHEMA = (datetime.utcnow(), final_schema)
+        cls.PARSED_SCHEMA = (Clock.now(), final_schema)
         return copy.deepcopy(final_schema)
     
     @classmethod
@@ -720,6 +726,9 @@ required: ["id"]
                         for name in sub_section_results: result_function_names.add(name)
                         sub_section_results = grab_from_subsection(action.actions)
                         for name in sub_section_results: result_function_names.add(name)
+                    elif isinstance(action, (SectionUtils.DeadlineSubSection, SectionUtils.ConcurrentSubSection)):
+                        sub_section_results = grab_from_subsection(action.actions)
+                        for name in sub_section_results: result_function_names.add(name)
                     else:
                         sub_section_results = grab_from_subsection(action.callbacks)
                         for name in sub_section_results: result_function_names.add(name)
@@ -773,6 +782,8 @@ required: ["id"]
             return [], DotNotator.parse_dot_notation(keys, self, custom_func_name="indexer", skip_first_custom=True)
 
 class BaseNode:
+    SNAPSHOT_SKIP = ("graph_node", "session", "status", "timeout")
+    '''attributes handler saves itself in snapshots, left out of `snapshot_state`'''
     def __init__(self, graph_node:BaseGraphNode, session:typing.Union[None, SessionData.SessionData]=None, timeout_duration:timedelta=None) -> None:
         self.graph_node = graph_node
         self.session = session
@@ -785,12 +796,21 @@ class BaseNode:
             # specifically, don't time out
             self.timeout = None
         else:
-            self.timeout = datetime.utcnow() + timeout_duration
+            self.timeout = Clock.now() + timeout_duration.total_seconds()
 
     def time_left(self) -> timedelta:
         if self.timeout is None:
             return None
-        return self.timeout - datetime.utcnow()
+        return timedelta(seconds=self.timeout - Clock.now())
+
+    def snapshot_state(self) -> dict:
+        '''state of this node to save in handler snapshot besides graph node, session, and timeout. base version saves every other
+        attribute as is, node types holding things that can't be pickled should override this and `restore_state`'''
+        return {key: value for key, value in vars(self).items() if key not in BaseNode.SNAPSHOT_SKIP}
+
+    def restore_state(self, state:dict):
+        '''put back state from `snapshot_state` on node newly made for a restore'''
+        self.__dict__.update(state)
 
     def activate(self):
         self.status = ITEM_STATUS.ACTIVE
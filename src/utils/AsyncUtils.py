@@ -0,0 +1,33 @@
+import asyncio
+import typing
+
+async def gather_with_limit(awaitables:"typing.Iterable[typing.Awaitable]", limit:typing.Optional[int]=None, return_exceptions:bool=False) -> list:
+    '''run awaitables side by side with at most limit of them running at once and wait for all of them to finish.
+    Unlike `asyncio.gather`, an exception doesn't return early, everything else is still finished before first exception is raised
+
+    Parameters
+    ---
+    awaitables - `Iterable[Awaitable]`
+        coroutines or futures to run. coroutines past the limit aren't started until a spot frees up
+    limit - `int | None`
+        max number running at once, None or less than 1 means no limit
+    return_exceptions - `bool`
+        put exceptions in result list instead of raising them
+
+    Returns
+    ---
+    `list` of results in same order as awaitables were given'''
+    awaitables = list(awaitables)
+    if limit is None or limit < 1 or limit >= len(awaitables):
+        results = await asyncio.gather(*awaitables, return_exceptions=True)
+    else:
+        semaphore = asyncio.Semaphore(limit)
+        async def limited(awaitable):
+            async with semaphore:
+                return await awaitable
+        results = await asyncio.gather(*[limited(awaitable) for awaitable in awaitables], return_exceptions=True)
+    if not return_exceptions:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+    return results
@@ -1,11 +1,13 @@
 import typing
 import copy
-from datetime import datetime, timedelta
+from datetime import timedelta
 import asyncio
 import uuid
 from enum import Enum
+from collections import OrderedDict
 
 from src.utils.Enums import CLEANING_STATE
+import src.utils.Clock as Clock
 # for better logging
 import logging
 import sys
@@ -66,6 +68,12 @@ class AbstractIndex:
         '''callback when item has been added to data stores under given primary key and needs to be added to this index's tracking.'''
         pass
 
+    def add_items(self, entries:dict):
+        '''callback when a batch of items have been added to data stores, entries maps primary key to item. Defaults to calling `add_item`
+        for each, indices that can update their tracking in one go should override'''
+        for primary_key, item in entries.items():
+            self.add_item(primary_key, item)
+
     def remove_item(self, primary_key, item):
         '''callback when item under given primary key has been removed from data stores and index tracking also needs to remove secondary keys. Takes item that was removed as Index object doesn't have 
         reference to cache to retrive that info'''
@@ -122,6 +130,19 @@ class FieldValueIndex(AbstractIndex):
     def add_item(self, primary_key, item):
         self._add_pointers(primary_key, self.get_item_secondary_keys(primary_key, item))
 
+    def add_items(self, entries:dict):
+        # group primary keys by secondary key first so each pointer set is only updated once for whole batch
+        grouped_keys:dict[typing.Hashable, list[typing.Hashable]] = {}
+        for primary_key, item in entries.items():
+            for secondary_key in self.get_item_secondary_keys(primary_key, item):
+                if secondary_key not in grouped_keys:
+                    grouped_keys[secondary_key] = []
+                grouped_keys[secondary_key].append(primary_key)
+        for secondary_key, primary_keys in grouped_keys.items():
+            if secondary_key not in self.pointers:
+                self.pointers[secondary_key] = set()
+            self.pointers[secondary_key].update(primary_keys)
+
     def remove_item(self, primary_key, item):
         self._remove_pointers(primary_key, self.get_item_secondary_keys(primary_key, item))
     
@@ -200,6 +221,8 @@ class MultiIndexer:
             get will return the object itself not a copy'''
         self.cache = cache if cache is not None else {}
         self.is_cache_obj = issubclass(self.cache.__class__, Cache)
+        if self.is_cache_obj:
+            self.cache.set_eviction_listener(self._evicted_from_cache)
         self.secondary_indices:dict[str, AbstractIndex] = {}
 
         if input_secondary_indices:
@@ -217,6 +240,8 @@ class MultiIndexer:
             return False
         self.cache = cache
         self.is_cache_obj = issubclass(self.cache.__class__, Cache)
+        if self.is_cache_obj:
+            self.cache.set_eviction_listener(self._evicted_from_cache)
         # indices should be up to date with cache so need to clean up
         self.reindex()
         return True
@@ -269,7 +294,10 @@ class MultiIndexer:
         If no entries are found, returns the value of default'''
         if index_name == "primary" or index_name == "":
             cachev2_logger.debug(f"getting data from primary index")
-            if key in self.cache:
+            found = key in self.cache
+            if self.is_cache_obj:
+                self.cache.record_lookup(key, found)
+            if found:
                 # don't want to format default value into a list so there's a filter
                 # primary index assumed to have only one entry mapped, so format it as a list
                 return [key]
@@ -366,7 +394,8 @@ class MultiIndexer:
     
     def add_items(self, entries:dict, or_overwrite=False):
         '''
-        adds a bunch of entries into cache. check add_item for details on process
+        adds a bunch of entries into cache. check add_item for details on process. New entries are stored first then handed to each index
+        as one batch, entries that overwrite existing ones go through set_item one at a time
 
         Parameters
         ---
@@ -380,10 +409,37 @@ class MultiIndexer:
         `array` A list of primary keys that were successfully added or overwritten
         '''
         results = []
+        new_entries = {}
         for key, value in entries.items():
-            result = self.add_item(key, value, or_overwrite=or_overwrite)
-            if result is not None:
-                results.append(result)
+            if key in self.cache:
+                if or_overwrite:
+                    results.append(self.set_item(key, value))
+                continue
+            if self.is_cache_obj:
+                self.cache.add_item(key, value)
+            else:
+                self.cache[key] = value
+            new_entries[key] = value
+            results.append(key)
+        if self.is_cache_obj:
+            # bounded caches can evict entries added earlier in this same batch, those don't go in indices
+            new_entries = {key: value for key, value in new_entries.items() if key in self.cache}
+        for index in self.secondary_indices.values():
+            index.add_items(new_entries)
+        return results
+
+    def remove_items(self, primary_keys):
+        '''
+        removes a bunch of entries from cache. check remove_item for details on process
+
+        Returns
+        ---
+        `array` A list of items that were removed, entries that weren't found are skipped
+        '''
+        results = []
+        for primary_key in primary_keys:
+            if primary_key in self.cache:
+                results.append(self.remove_item(primary_key))
         return results
     
     def remove_item(self, primary_key):
@@ -482,6 +538,12 @@ class MultiIndexer:
             for key, item in self.cache.items():
                 index.add_item(key, item)
 
+    def _evicted_from_cache(self, primary_key, item):
+        '''callback for Cache objects that drop items on their own (see `BoundedCache`). Cache has already removed the item, this
+        cleans up secondary indices so they don't point at keys that are gone'''
+        for index in self.secondary_indices.values():
+            index.remove_item(primary_key, item)
+
     def clear(self):
         '''clear out all data in cache and index information'''
         self.cache.clear()
@@ -489,7 +551,10 @@ class MultiIndexer:
             index.clear()
 
     def __contains__(self, key):
-        return key in self.cache
+        found = key in self.cache
+        if self.is_cache_obj:
+            self.cache.record_lookup(key, found)
+        return found
     
     def __len__(self):
         return len(self.cache)
@@ -500,6 +565,21 @@ class Cache:
     For example extra handlers for when items are added, more control over get returning copies or objects, seperate callbacks for adding new vs setting existing.'''
     def __init__(self) -> None:
         self.data = {}
+        self.eviction_listener = None
+        '''function that is called with primary key and item whenever cache drops an item by itself. MultiIndexer sets this'''
+
+    def set_eviction_listener(self, listener):
+        '''MultiIndexer uses this to register for notifications when cache removes items without being asked to'''
+        self.eviction_listener = listener
+
+    def record_lookup(self, primary_key, found):
+        '''MultiIndexer calls this once for every lookup by primary key made through it, so caches that keep stats or track use only
+        count lookups callers asked for and not internal accesses. does nothing here'''
+        pass
+
+    def _notify_evicted(self, primary_key, item):
+        if self.eviction_listener is not None:
+            self.eviction_listener(primary_key, item)
 
     def add_item(self, primary_key, item):
         '''MultiIndexer uses this as callback to add new item to cache'''
@@ -551,4 +631,108 @@ class Cache:
     def keys(self):
         '''MultiIndexer uses this for looping'''
         return self.data.keys()
-   
\ No newline at end of file
+
+class BoundedCache(Cache):
+    '''Cache that caps how much it holds. Useful for bookkeeping that would otherwise grow for as long as the program runs.
+    Items are dropped when there are more than `max_size` of them (least recently used goes first) or when they were last written more
+    than `max_age` ago. Every drop is reported to the eviction listener so a MultiIndexer using this cache keeps its secondary indices in sync.
+
+    Reads never evict, so MultiIndexer doesn't find keys disappearing in the middle of a lookup. Items that are too old are dropped on the
+    next add or set, or whenever `expire` is called.
+
+    Keeps counters for `hits`, `misses` and `evictions`. Lookups are counted and mark item as recently used when they are reported through
+    `record_lookup`, which MultiIndexer does for `in` checks and primary key gets. Calling `get` or `get_ref` directly is treated as internal
+    access and doesn't count.'''
+    def __init__(self, max_size:typing.Optional[int]=None, max_age:typing.Optional[timedelta]=None) -> None:
+        '''
+        Parameters
+        ---
+        * max_size - `Optional[int]`
+            most items to hold at once, None for no limit
+        * max_age - `Optional[timedelta | float]`
+            how long after an item is last written before it is dropped, None for never. numbers are seconds'''
+        super().__init__()
+        if max_size is not None and max_size < 1:
+            raise ValueError(f"bounded cache max_size must be at least 1, got {max_size}")
+        self.max_size = max_size
+        self.max_age:typing.Optional[float] = max_age.total_seconds() if isinstance(max_age, timedelta) else max_age
+        '''seconds items are kept after last write'''
+        self.data:OrderedDict = OrderedDict()
+        '''primary key to item, ordered least recently used first'''
+        self.write_times:OrderedDict = OrderedDict()
+        '''primary key to time on `Clock` item was last written, ordered oldest first'''
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self, primary_key):
+        item = self.data.pop(primary_key)
+        del self.write_times[primary_key]
+        self.evictions += 1
+        self._notify_evicted(primary_key, item)
+
+    def expire(self, now:typing.Optional[float]=None):
+        '''drop all items last written more than max_age ago. Only looks at the expired items, not the whole cache.
+
+        Returns
+        ---
+        `int` number of items dropped'''
+        if self.max_age is None:
+            return 0
+        cutoff = (now if now is not None else Clock.now()) - self.max_age
+        dropped = 0
+        while len(self.write_times) > 0:
+            oldest_key, written = next(iter(self.write_times.items()))
+            if written > cutoff:
+                break
+            self._evict(oldest_key)
+            dropped += 1
+        return dropped
+
+    def _enforce_size(self):
+        if self.max_size is None:
+            return
+        while len(self.data) > self.max_size:
+            self._evict(next(iter(self.data)))
+
+    def add_item(self, primary_key, item):
+        self.expire()
+        self.data[primary_key] = item
+        self.data.move_to_end(primary_key)
+        self.write_times[primary_key] = Clock.now()
+        self.write_times.move_to_end(primary_key)
+        self._enforce_size()
+
+    def set_item(self, primary_key, item):
+        self.add_item(primary_key, item)
+
+    def remove_item(self, primary_key):
+        if primary_key in self.data:
+            del self.data[primary_key]
+            del self.write_times[primary_key]
+
+    def record_lookup(self, primary_key, found):
+        if not found:
+            self.misses += 1
+            return
+        self.hits += 1
+        self.data.move_to_end(primary_key)
+
+    def clear(self):
+        self.data.clear()
+        self.write_times.clear()
+
+    def get_stats(self):
+        '''counters for how well cache is doing
+
+        Returns
+        ---
+        `dict[str, Any]` with current `size`, `hits`, `misses`, `evictions` and `hit_ratio` (None if no lookups yet)'''
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups > 0 else None
+        }
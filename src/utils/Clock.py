@@ -0,0 +1,157 @@
+import time
+import heapq
+import asyncio
+import typing
+import itertools
+import contextlib
+import contextvars
+from datetime import datetime, timedelta
+
+class Clock:
+    '''source of time for every deadline and timestamp handler keeps. times are float seconds on the clock's own scale, only differences
+    between them mean anything. use `to_wall` to get a datetime for showing to people'''
+    def now(self) -> float:
+        raise NotImplementedError
+
+    def to_wall(self, clock_time:float) -> datetime:
+        '''utc wall clock time that clock_time happens at, for display only. don't compare or store the result'''
+        return datetime.utcnow() + timedelta(seconds=clock_time - self.now())
+
+    async def sleep(self, seconds:float):
+        '''wait until clock has moved ahead by seconds'''
+        await asyncio.sleep(seconds)
+
+class MonotonicClock(Clock):
+    '''clock using `time.monotonic`, doesn't jump when system time is changed'''
+    def now(self) -> float:
+        return time.monotonic()
+
+class VirtualClock(Clock):
+    '''clock for simulations that only moves when told to. sleeping on it waits until `advance` or `run_for` moves time past wake up time,
+    so hours of timeouts can be played through in however long it takes to run the code woken up.
+
+    After waking sleepers clock lets tasks it woke, and tasks started since, run until each is sleeping on clock again or finished
+    before moving on, so work started by a wake up gets to set its own timers first. Tasks stuck on threads or outside io are only
+    waited on for settle_rounds turns of event loop'''
+    def __init__(self, start:float=0.0, start_wall:typing.Optional[datetime]=None, settle_rounds:int=200) -> None:
+        self.time = start
+        self.start = start
+        self.start_wall = start_wall if start_wall is not None else datetime.utcnow()
+        '''wall clock time that start is shown as'''
+        self.settle_rounds = settle_rounds
+        '''most times to let event loop go around after waking sleepers before moving time again'''
+        self.sleepers:"list[typing.Tuple[float, int, asyncio.Future, typing.Optional[asyncio.Task]]]" = []
+        '''heap of wake up time, order slept in, future to finish, and task sleeping for each sleep waiting'''
+        self._sleep_order = itertools.count()
+        self._sleeping_tasks:"set[asyncio.Task]" = set()
+        self._woken_tasks:"set[asyncio.Task]" = set()
+        self._seen_tasks:"set[asyncio.Task]" = set()
+
+    def now(self) -> float:
+        return self.time
+
+    def to_wall(self, clock_time:float) -> datetime:
+        return self.start_wall + timedelta(seconds=clock_time - self.start)
+
+    async def sleep(self, seconds:float):
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        task = asyncio.current_task()
+        heapq.heappush(self.sleepers, (self.time + seconds, next(self._sleep_order), future, task))
+        self._sleeping_tasks.add(task)
+        try:
+            await future
+        finally:
+            self._sleeping_tasks.discard(task)
+
+    def next_wake_time(self) -> typing.Optional[float]:
+        '''time earliest sleeper still waiting wakes up, None if nothing is sleeping'''
+        while len(self.sleepers) > 0 and self.sleepers[0][2].done():
+            # cancelled sleeps
+            heapq.heappop(self.sleepers)
+        return self.sleepers[0][0] if len(self.sleepers) > 0 else None
+
+    async def settle(self):
+        '''let tasks woken since last settle, and tasks started since then, run until each one is sleeping on clock again or finished.
+        gives up after settle_rounds turns of event loop'''
+        current = asyncio.current_task()
+        busy = self._woken_tasks
+        self._woken_tasks = set()
+        for _ in range(self.settle_rounds):
+            await asyncio.sleep(0)
+            tasks = asyncio.all_tasks()
+            busy.update(tasks - self._seen_tasks)
+            self._seen_tasks = tasks
+            busy = {task for task in busy if task is not current and not task.done() and task not in self._sleeping_tasks}
+            if len(busy) == 0:
+                return
+
+    async def advance(self, seconds:float):
+        '''move time ahead by seconds, waking sleepers in order of their wake up time and letting what they start run before moving on'''
+        target = self.time + seconds
+        await self.settle()
+        wake_time = self.next_wake_time()
+        while wake_time is not None and wake_time <= target:
+            self.time = max(self.time, wake_time)
+            while len(self.sleepers) > 0 and self.sleepers[0][0] <= self.time:
+                _, _, future, task = heapq.heappop(self.sleepers)
+                if not future.done():
+                    future.set_result(None)
+                    if task is not None:
+                        # counts as busy until it runs, even though its sleep hasn't returned yet
+                        self._sleeping_tasks.discard(task)
+                        self._woken_tasks.add(task)
+            await self.settle()
+            wake_time = self.next_wake_time()
+        self.time = max(self.time, target)
+
+    async def run_for(self, seconds:float, tick:float=1.0):
+        '''advance by seconds in steps of tick, for simulations where other tasks start new work between wake ups (ie replaying events
+        on a schedule) and need loop to settle every so often'''
+        end = self.time + seconds
+        while self.time < end:
+            await self.advance(min(tick, end - self.time))
+
+_clock:Clock = MonotonicClock()
+_scoped_clock:"contextvars.ContextVar[typing.Optional[Clock]]" = contextvars.ContextVar("nodetion_clock", default=None)
+'''clock set by `use_clock` for current context, takes over from global one'''
+
+def get_clock() -> Clock:
+    '''clock code running right now uses. one from `use_clock` if inside one, otherwise global one'''
+    scoped = _scoped_clock.get()
+    return scoped if scoped is not None else _clock
+
+@contextlib.contextmanager
+def use_clock(clock:typing.Optional[Clock]):
+    '''use clock for code inside with block and for tasks started inside it, without changing clock for anything else. tasks copy
+    context when created, so they keep using clock after block ends. None keeps clock that is already in use'''
+    if clock is None:
+        yield get_clock()
+        return
+    token = _scoped_clock.set(clock)
+    try:
+        yield clock
+    finally:
+        _scoped_clock.reset(token)
+
+def set_clock(clock:Clock) -> Clock:
+    '''switch global clock everything outside a `use_clock` uses. deadlines set with old clock aren't converted, so do this before
+    creating nodes and sessions
+
+    Returns
+    ---
+    `Clock` that was being used before'''
+    global _clock
+    old_clock = _clock
+    _clock = clock
+    return old_clock
+
+def now() -> float:
+    '''current time on clock everything is using'''
+    return get_clock().now()
+
+async def sleep(seconds:float):
+    '''sleep on clock everything is using'''
+    await get_clock().sleep(seconds)
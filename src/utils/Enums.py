@@ -28,4 +28,9 @@ class CLEANING_STATE(Enum):
 class TASK_STATE(Enum):
     WAITING=2
     EVENT=3
-    CLOSING=4
\ No newline at end of file
+    CLOSING=4
+
+class CALL_STYLE(Enum):
+    COROUTINE="coroutine"           # async def, result always awaited
+    SYNC="sync"                     # plain function, result used as is
+    SYNC_AWAITABLE="sync_awaitable" # plain function that gives back something to await
@@ -0,0 +1,99 @@
+import typing
+# for better logging
+import logging
+# has setup for format that is pretty good looking
+import src.utils.LoggingHelper as logHelper
+import src.utils.SectionUtils as SectionUtils
+
+compiler_logger = logging.getLogger("filter_compiler")
+logHelper.use_default_setup(compiler_logger)
+compiler_logger.setLevel(logging.INFO)
+
+class FilterEvaluationError(Exception):
+    '''exception raised by a filter in a predicate compiled in debug mode, records where filter is in yaml'''
+    def __init__(self, yaml_path:str, func_name:str) -> None:
+        super().__init__(f"filter <{func_name}> at <{yaml_path}> raised an exception")
+        self.yaml_path = yaml_path
+        self.func_name = func_name
+
+class CompiledFilter:
+    '''generated predicate for one filter list'''
+    __slots__ = ("predicate", "source", "yaml_paths")
+
+    def __init__(self, predicate:"typing.Callable[[typing.Callable], typing.Awaitable[bool]]", source:str, yaml_paths:"list[str]") -> None:
+        self.predicate = predicate
+        '''async function that takes a runner for one filter, `runner(func_name, base_parameter)`, and gives back if list passes'''
+        self.source = source
+        '''generated python source, for debugging'''
+        self.yaml_paths = yaml_paths
+        '''path in yaml of each filter call, in order they appear in source'''
+
+async def _debug_call(runner, func_name, base_parameter, yaml_path):
+    try:
+        return await runner(func_name, base_parameter)
+    except Exception as e:
+        raise FilterEvaluationError(yaml_path, func_name) from e
+
+def compile_filters(filter_list:list, operator:str="and", root:str="filters", debug:bool=False):
+    '''turn list of filters from yaml into one async function. nested and/or/not lists become a single boolean expression with each filter
+    call in the same short circuit order the list would be walked in, and names and parameters are bound as constants so nothing is looked
+    up while running it. filters that don't give back a bool count as failing, same as when walking the list
+
+    Parameters
+    ---
+    * filter_list - `list`
+        filters as formatted by SectionUtils, may hold LogicOpSubSections
+    * operator - `str`
+        "and" or "or", how top level of list is combined
+    * root - `str`
+        name of section in yaml, start of paths for errors
+    * debug - `bool`
+        if exceptions from filters are wrapped in FilterEvaluationError saying where in yaml filter is
+
+    Returns
+    ---
+    `CompiledFilter`
+
+    Raises
+    ---
+    ValueError if list has something that isn't a filter or and/or/not list'''
+    constants:"dict[str, typing.Any]" = {"_debug_call": _debug_call}
+    yaml_paths:"list[str]" = []
+
+    def call_expression(func_name, base_parameter, yaml_path):
+        index = len(yaml_paths)
+        yaml_paths.append(yaml_path)
+        constants[f"_n{index}"] = func_name
+        constants[f"_p{index}"] = base_parameter
+        if debug:
+            constants[f"_y{index}"] = yaml_path
+            return f"((await _debug_call(run, _n{index}, _p{index}, _y{index})) is True)"
+        return f"((await run(_n{index}, _p{index})) is True)"
+
+    def list_expression(entries, list_operator, path):
+        if list_operator not in ["and", "or"]:
+            raise ValueError(f"filter list at <{path}> has unknown operator <{list_operator}>")
+        parts = []
+        for index, entry in enumerate(entries):
+            entry_path = f"{path}[{index}]"
+            if isinstance(entry, SectionUtils.LogicOpSubSection):
+                if entry.name == "not":
+                    parts.append(f"(not {list_expression(entry.callbacks, 'and', entry_path + '.not')})")
+                else:
+                    parts.append(list_expression(entry.callbacks, entry.name, f"{entry_path}.{entry.name}"))
+            elif isinstance(entry, str):
+                parts.append(call_expression(entry, None, f"{entry_path}.{entry}"))
+            elif isinstance(entry, dict) and len(entry) == 1:
+                func_name, base_parameter = next(iter(entry.items()))
+                parts.append(call_expression(func_name, base_parameter, f"{entry_path}.{func_name}"))
+            else:
+                raise ValueError(f"can't compile filter at <{entry_path}>, got <{entry}>")
+        if len(parts) == 0:
+            return "True" if list_operator == "and" else "False"
+        return "(" + f" {list_operator} ".join(parts) + ")"
+
+    source = f"async def compiled_filter(run):\n    return {list_expression(filter_list, operator, root)}\n"
+    compiler_logger.debug(f"compiled filter list at <{root}> to source <{source}>")
+    namespace = dict(constants)
+    exec(compile(source, f"<filters {root}>", "exec"), namespace)
+    return CompiledFilter(namespace["compiled_filter"], source, yaml_paths)
@@ -1,13 +1,13 @@
 import asyncio
 from asyncio.events import AbstractEventLoop
 import typing
-from datetime import datetime
+from collections import deque
 from src.utils.Enums import TASK_STATE, ITEM_STATUS
+import src.utils.Clock as Clock
 # for better logging
 import logging
 # has setup for format that is pretty good looking 
 import src.utils.LoggingHelper as logHelper
-from functools import reduce
 
 task_logger = logging.getLogger("tasks")
 logHelper.use_default_setup(task_logger)
@@ -26,33 +26,153 @@ class HandlerTask(asyncio.Task):
         self.locking_tasks = locking_tasks
         self.waiting_period_sec = waiting_period_sec
         self.handler_func = handler_func
-        self.scheduled_time = datetime.utcnow()
+        self.scheduled_time = Clock.now()
+        '''time on `Clock` task was created. start_time and stop_time are on same clock'''
         self.start_time = None
         self.stop_time = None
+        self.sequence = None
+        '''order number handler gave this task if it is an event or timeout task, None otherwise'''
+        self.was_cancelled = False
+        self.error = None
+        '''string description of exception task run ended with, if any'''
+        self.finish_callbacks = []
+        '''functions called with this task as soon as task run ends, before task is marked done. see `add_finish_callback`'''
 
     async def task_runner(self):
-        while not reduce(lambda x, y: x and y, [task.done() for task in self.locking_tasks], True):
-            task_logger.debug(f"task <{id(asyncio.current_task())}><{self.type}> sleeping for another <{self.waiting_period_sec}> seconds")
-            await asyncio.sleep(self.waiting_period_sec)
-        task_logger.debug(f"task <{id(asyncio.current_task())}><{self.type}> starting handling")
-        self.start_time = datetime.utcnow()
-        result = await self.do_task()
-        task_logger.debug(f"task <{id(asyncio.current_task())}><{self.type}> finished handling")
-        self.stop_time = datetime.utcnow()
-        return result
+        try:
+            # wait on locking tasks directly so task starts as soon as last one finishes. asyncio.wait doesn't raise their exceptions or
+            # cancel them if this task is cancelled
+            pending_locks = [task for task in self.locking_tasks if not task.done()]
+            if len(pending_locks) > 0:
+                task_logger.debug(f"task <{id(asyncio.current_task())}><{self.type}> waiting on <{len(pending_locks)}> locking tasks")
+                await asyncio.wait(pending_locks)
+            task_logger.debug(f"task <{id(asyncio.current_task())}><{self.type}> starting handling")
+            self.start_time = Clock.now()
+            result = await self.do_task()
+            task_logger.debug(f"task <{id(asyncio.current_task())}><{self.type}> finished handling")
+            return result
+        except asyncio.CancelledError:
+            self.was_cancelled = True
+            raise
+        except Exception as e:
+            self.error = repr(e)
+            raise
+        finally:
+            self.stop_time = Clock.now()
+            self.run_finish_callbacks()
+
+    def add_finish_callback(self, callback):
+        '''add function to be called with this task as soon as task run ends. unlike done callbacks, these run synchronously inside the task
+        so nothing else scheduled sees task as unfinished in between. callbacks are only called once. if task is cancelled before it ever
+        started running these will not be called, pair with a done callback to catch that'''
+        self.finish_callbacks.append(callback)
+
+    def run_finish_callbacks(self):
+        callbacks = self.finish_callbacks
+        self.finish_callbacks = []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                task_logger.warning(f"task <{id(self)}><{self.type}> finish callback <{callback}> raised <{e}>")
 
     async def do_task(self):
         return await self.handler_func()
 
+    def release(self):
+        '''drop references to anything task was working on. called once task is finished so big objects like events can be freed
+        while something still holds on to the task. children should call parent'''
+        self.locking_tasks = []
+
+class CompletedTaskRecord:
+    '''small stand-in for a finished task. holds type, ids, and timestamps only, so keeping a history of finished tasks doesn't
+    keep events, nodes, or sessions alive'''
+    __slots__ = ("task_id", "type", "sequence", "priority", "event_type", "node_id", "session_id", "scheduled_time", "start_time", "stop_time", "cancelled", "exception")
+
+    def __init__(self, task:HandlerTask, node_id=None, session_id=None) -> None:
+        self.task_id = id(task)
+        self.type = task.type
+        self.sequence = task.sequence
+        self.priority = getattr(task, "priority", None)
+        self.event_type = getattr(task, "event_type", None)
+        self.node_id = node_id
+        self.session_id = session_id
+        self.scheduled_time = task.scheduled_time
+        self.start_time = task.start_time
+        self.stop_time = task.stop_time
+        self.cancelled = task.was_cancelled
+        self.exception = task.error
+        '''string description of exception task finished with, if any. exception object itself is not kept since its traceback holds everything'''
+
+class PendingEvent:
+    '''event waiting in handler's ingress queue for room to start handling. future resolves when handling finishes, or to None if event
+    is dropped before it started'''
+    __slots__ = ("event_type", "event", "future", "priority")
+
+    def __init__(self, event_type, event, future:asyncio.Future, priority:int=0) -> None:
+        self.event_type = event_type
+        self.event = event
+        self.future = future
+        self.priority = priority
+
+class IngressQueue:
+    '''events waiting to be handled, split by priority. lower priority numbers come out first, same priority comes out oldest first'''
+    def __init__(self) -> None:
+        self.classes:"dict[int, deque[PendingEvent]]" = {}
+        self.size = 0
+
+    def append(self, pending:PendingEvent):
+        self.classes.setdefault(pending.priority, deque()).append(pending)
+        self.size += 1
+
+    def popleft(self) -> PendingEvent:
+        '''take next event to handle, oldest event of most urgent priority'''
+        return self._pop_from(min(self.classes))
+
+    def pop_least_urgent(self) -> PendingEvent:
+        '''take oldest event of least urgent priority, for making room'''
+        return self._pop_from(max(self.classes))
+
+    def _pop_from(self, priority) -> PendingEvent:
+        priority_class = self.classes[priority]
+        pending = priority_class.popleft()
+        if len(priority_class) == 0:
+            del self.classes[priority]
+        self.size -= 1
+        return pending
+
+    def remove(self, pending:PendingEvent):
+        priority_class = self.classes[pending.priority]
+        priority_class.remove(pending)
+        if len(priority_class) == 0:
+            del self.classes[pending.priority]
+        self.size -= 1
+
+    def __iter__(self):
+        '''goes through least urgent first, oldest first within a priority'''
+        for priority in sorted(self.classes, reverse=True):
+            yield from self.classes[priority]
+
+    def __len__(self):
+        return self.size
+
 class HandleEventTask(HandlerTask):
-    def __init__(self, handler_func, event_type, event, loop: AbstractEventLoop = None, name=None, locking_tasks=None, waiting_period_sec=5) -> None:
+    def __init__(self, handler_func, event_type, event, loop: AbstractEventLoop = None, name=None, locking_tasks=None, waiting_period_sec=5, priority:int=0) -> None:
         super().__init__(handler_func, loop=loop, name=name, locking_tasks=locking_tasks, waiting_period_sec=waiting_period_sec)
         self.event_type = event_type
         self.event = event
         self.type = "EventTask"
+        self.admitted = False
+        '''whether this task counts against handler's limit of events in flight'''
+        self.priority = priority
+        '''lower numbers are handled sooner where work has to wait, see HandlerSettings.event_priorities'''
 
     async def do_task(self):
-        return await self.handler_func(self.event_type, self.event, self.waiting_period_sec)
+        return await self.handler_func(self.event_type, self.event, self.waiting_period_sec, self.priority)
+
+    def release(self):
+        super().release()
+        self.event = None
 
 class HandleSessionEventTask(HandlerTask):
     def __init__(self, handler_func, session, event_type, event, loop:AbstractEventLoop=None, name=None, locking_tasks=None, waiting_period_sec=5) -> None:
@@ -67,6 +187,12 @@ class HandleSessionEventTask(HandlerTask):
     
     def set_node_tasks(self, node_tasks):
         self.node_tasks = node_tasks
+
+    def release(self):
+        super().release()
+        self.session = None
+        self.event = None
+        self.node_tasks = []
     
 class HandleNodeEventTask(HandlerTask):
     def __init__(self, handler_func, active_node, event_type, event, loop:AbstractEventLoop=None, name=None, locking_tasks=None, waiting_period_sec=5) -> None:
@@ -78,22 +204,59 @@ class HandleNodeEventTask(HandlerTask):
 
     async def do_task(self):
         return await self.handler_func(self.active_node, self.event_type, self.event)
+
+    def release(self):
+        super().release()
+        self.active_node = None
+        self.event = None
     
 class HandleTimeoutWaiter(HandlerTask):
     def __init__(self, handler_func, timeoutable, loop: AbstractEventLoop = None, name=None, waiting_period_sec=5) -> None:
         super().__init__(handler_func, loop=loop, name=name, locking_tasks=[], waiting_period_sec=waiting_period_sec)
         self.timeoutable = timeoutable
+        self.timeoutables = [timeoutable]
+        '''everything this waiter watches for timeouts'''
         self.type="TimeoutWaiter"
 
     async def do_task(self):
         return await self.handler_func(self.timeoutable, self.waiting_period_sec)
+
+    def release(self):
+        super().release()
+        self.timeoutable = None
+        self.timeoutables = []
+
+class HandleGroupTimeoutWaiter(HandleTimeoutWaiter):
+    '''one waiter watching timeouts of a group of nodes or sessions, ie many copies of a node made at once'''
+    def __init__(self, handler_func, timeoutables:list, loop: AbstractEventLoop = None, name=None, waiting_period_sec=5) -> None:
+        super().__init__(handler_func, timeoutables[0], loop=loop, name=name, waiting_period_sec=waiting_period_sec)
+        self.timeoutables = list(timeoutables)
+
+    async def do_task(self):
+        return await self.handler_func(self.timeoutables, self.waiting_period_sec)
     
     
 class HandleTimeoutTask(HandlerTask):
     def __init__(self, handler_func, timeoutable, type:typing.Literal["Node","Session"], loop:AbstractEventLoop=None, name=None, locking_tasks=None, waiting_period_sec=5) -> None:
         super().__init__(handler_func, loop=loop, name=name, locking_tasks=locking_tasks, waiting_period_sec=waiting_period_sec)
         self.timeoutable = timeoutable
+        self.timeoutables = [timeoutable]
+        '''everything this task is handling timeouts for'''
         self.type = type+"TimeoutTask"
 
     async def do_task(self):
-        return await self.handler_func(self.timeoutable, self.waiting_period_sec)
\ No newline at end of file
+        return await self.handler_func(self.timeoutable, self.waiting_period_sec)
+
+    def release(self):
+        super().release()
+        self.timeoutable = None
+        self.timeoutables = []
+
+class HandleTimeoutSweepTask(HandleTimeoutTask):
+    '''one task handling timeouts of many nodes that came due at the same time'''
+    def __init__(self, handler_func, timeoutables:list, loop:AbstractEventLoop=None, name=None, locking_tasks=None, waiting_period_sec=5) -> None:
+        super().__init__(handler_func, timeoutables[0], "Node", loop=loop, name=name, locking_tasks=locking_tasks, waiting_period_sec=waiting_period_sec)
+        self.timeoutables = list(timeoutables)
+
+    async def do_task(self):
+        return await self.handler_func(self.timeoutables, self.waiting_period_sec)
@@ -9,6 +9,19 @@ class IfSubSection(SubSection):
         self.filters = filters if filters is not None else []
         self.name = "if"
 
+class DeadlineSubSection(SubSection):
+    def __init__(self, seconds, actions=None):
+        self.seconds = seconds
+        '''how long the actions in this subsection get all together before they are cancelled'''
+        self.actions = actions if actions is not None else []
+        self.name = "deadline"
+
+class ConcurrentSubSection(SubSection):
+    def __init__(self, actions=None):
+        self.actions = actions if actions is not None else []
+        '''actions run at the same time, each one with its own copy of section and control data'''
+        self.name = "concurrent"
+
 class LogicOpSubSection(SubSection):
     def __init__(self, name, callbacks=None) -> None:
         self.name = name
@@ -31,6 +44,10 @@ def formatSection(section, purpose:POSSIBLE_PURPOSES):
                 if func_name in ["if"]:
                     subsection = IfSubSection(filters=formatSection(args["filters"], purpose=POSSIBLE_PURPOSES.FILTER), actions=formatSection(args["actions"], purpose))
                     section[index] = subsection
+                elif func_name in ["deadline"]:
+                    section[index] = DeadlineSubSection(seconds=args["seconds"], actions=formatSection(args["actions"], purpose))
+                elif func_name in ["concurrent"]:
+                    section[index] = ConcurrentSubSection(actions=formatSection(args, purpose))
                 else:
                     section[index] = LogicOpSubSection(name=func_name, callbacks=formatSection(args, purpose))
     return section
@@ -39,6 +56,6 @@ def formatSection(section, purpose:POSSIBLE_PURPOSES):
 def is_handler_structure(func_name, purpose:POSSIBLE_PURPOSES):
     if purpose in [POSSIBLE_PURPOSES.FILTER, POSSIBLE_PURPOSES.TRANSITION_FILTER] and func_name in ["and", "or", "not"]:
         return True
-    if purpose in [POSSIBLE_PURPOSES.ACTION, POSSIBLE_PURPOSES.TRANSITION_ACTION] and func_name in ["if"]:
+    if purpose in [POSSIBLE_PURPOSES.ACTION, POSSIBLE_PURPOSES.TRANSITION_ACTION] and func_name in ["if", "deadline", "concurrent"]:
         return True
     return False
\ No newline at end of file
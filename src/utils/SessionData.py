@@ -1,7 +1,8 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 import typing
 import src.DialogNodes.BaseType as BaseType
 from src.utils.Enums import ITEM_STATUS
+import src.utils.Clock as Clock
 
 class SessionData:
     DEFAULT_TTL = 600
@@ -9,7 +10,7 @@ class SessionData:
         self.linked_nodes:list[BaseType.BaseNode] = []
         timeout_duration = timeout_duration if timeout_duration is not None else timedelta(seconds=SessionData.DEFAULT_TTL)
         self.set_TTL(timeout_duration)
-        # self.timeout:typing.Union[datetime, None] after above call
+        # self.timeout:typing.Union[float, None] after above call, time on `Clock` to time out at
         self.data:"dict[str, typing.Any]" = {}
         self.status = ITEM_STATUS.INACTIVE
 
@@ -20,7 +21,7 @@ class SessionData:
             # specifically, don't time out
             self.timeout = None
         else:
-            self.timeout = datetime.utcnow() + timeout_duration
+            self.timeout = Clock.now() + timeout_duration.total_seconds()
 
         # time_left = min(self.time_left(),*[node.time_left() for node in self.linked_nodes])
         # for node in self.linked_nodes:
@@ -37,6 +38,23 @@ class SessionData:
         self.linked_nodes.append(active_node)
         return True
 
+    def add_nodes(self, active_nodes:list):
+        '''adds all given active nodes into linked nodes in order, skipping repeats. checks for repeats once for the whole list instead
+        of once per node
+
+        Returns
+        ---
+        `int` number of nodes added'''
+        linked_ids = set(id(node) for node in self.linked_nodes)
+        added = 0
+        for active_node in active_nodes:
+            if id(active_node) in linked_ids:
+                continue
+            linked_ids.add(id(active_node))
+            self.linked_nodes.append(active_node)
+            added += 1
+        return added
+
     def clear_session_history(self, exceptions=[]):
         '''clears the linked nodes recorded by this session except for anything passed in exceptions.DOES NOT DELETE NODES. 
         use handler to close nodes'''
@@ -56,7 +74,7 @@ class SessionData:
         '''returns the difference between session timeout and current time'''
         if self.timeout is None:
             return None
-        return self.timeout - datetime.utcnow()
+        return timedelta(seconds=self.timeout - Clock.now())
     
     def activate(self):
         self.status = ITEM_STATUS.ACTIVE
@@ -1,8 +1,8 @@
 import asyncio
 from asyncio.events import AbstractEventLoop
 import typing
-from datetime import datetime
 from src.utils.Enums import TASK_STATE, ITEM_STATUS
+import src.utils.Clock as Clock
 # for better logging
 import logging
 # has setup for format that is pretty good looking 
@@ -32,21 +32,21 @@ class HandlerTimeoutTask(asyncio.Task):
 
     async def task_runner(self):
         task_clean_logger.debug(f"task for item <{id(self.timeoutable)}> starting task run")
-        while self.timeoutable.timeout is not None and datetime.utcnow() <= self.timeoutable.timeout:
+        while self.timeoutable.timeout is not None and Clock.now() <= self.timeoutable.timeout:
             # big outer loop to catch if timeout has been updated at the end
-            while datetime.utcnow() < self.timeoutable.timeout:
+            while Clock.now() < self.timeoutable.timeout:
                 #TODO: this can cause infinite loop, fix later
-                now = datetime.utcnow()
-                delay = max(0, (self.timeoutable.timeout - datetime.utcnow()).total_seconds())
+                now = Clock.now()
+                delay = max(0, self.timeoutable.timeout - now)
                 task_clean_logger.debug(f"task for item <{id(self.timeoutable)}> sleeping for <{delay}> now <{now}> timeout <{self.timeoutable.timeout}> check <{now < self.timeoutable.timeout}>")
-                await asyncio.sleep(delay)
+                await Clock.sleep(delay)
                 if self.timeoutable.status == ITEM_STATUS.CLOSED or self.timeoutable.timeout is None:
                     task_clean_logger.info(f"task for item <{id(self.timeoutable)}> awoke to timout not being needed. returning")
                     return
             self.state = TASK_STATE.EVENT
             task_clean_logger.info(f"task for item <{id(self.timeoutable)}> doing timeout event callbacks")
             await self.timeout_handler(self.timeoutable)
-            if self.timeoutable.timeout is not None and self.timeoutable.timeout <= datetime.utcnow():
+            if self.timeoutable.timeout is not None and self.timeoutable.timeout <= Clock.now():
                 task_clean_logger.info(f"task for item <{id(self.timeoutable)}> found needs to close item")
                 self.state = TASK_STATE.CLOSING
                 await self.close_handler(self.timeoutable)
@@ -0,0 +1,153 @@
+import asyncio
+import typing
+import itertools
+from collections import deque
+# for better logging
+import logging
+# has setup for format that is pretty good looking
+import src.utils.LoggingHelper as logHelper
+
+pool_logger = logging.getLogger("worker_pool")
+logHelper.use_default_setup(pool_logger)
+pool_logger.setLevel(logging.DEBUG)
+
+class WorkItem:
+    '''one piece of work waiting in a lane. future is resolved with what the function returns'''
+    __slots__ = ("lane", "func", "args", "future", "priority")
+
+    def __init__(self, lane, func, args, future:asyncio.Future, priority:int=0) -> None:
+        self.lane = lane
+        self.func = func
+        self.args = args
+        self.future = future
+        self.priority = priority
+
+class LanedWorkerPool:
+    '''fixed number of worker coroutines pulling work off of a shared queue. Work is sorted into lanes by a key, items in the same lane
+    run one at a time in the order they were submitted while different lanes run side by side. Lanes take turns, after a worker finishes an
+    item in a lane that lane goes to back of the line if it has more work.
+
+    Items can have a priority, lower numbers go first. Lanes waiting for a worker are picked by the best priority of any item waiting in
+    them, so urgent work doesn't sit behind other lanes. Items inside a lane still run in order submitted, urgent item waits for what is ahead
+    of it in its own lane.
+
+    Workers are started on first submit so pool can be created outside of a running event loop.
+    Work items must not wait on other items in the same lane, that would deadlock the lane'''
+    def __init__(self, worker_count:int=8) -> None:
+        if worker_count < 1:
+            raise ValueError(f"worker pool needs at least one worker, got <{worker_count}>")
+        self.worker_count = worker_count
+        self.lanes:"dict[typing.Any, deque[WorkItem]]" = {}
+        '''lanes that have work pending or running, mapped to queue of items. first item is the one running or next to run'''
+        self.ready_lanes:typing.Optional[asyncio.PriorityQueue] = None
+        '''lanes that have work and no worker on them, as (priority, order, lane). a lane may be in here more than once if it got more
+        urgent work while waiting, extra entries are skipped'''
+        self.queued_lanes:"dict[typing.Any, int]" = {}
+        '''lanes currently waiting in ready_lanes mapped to best priority they were queued with'''
+        self._ready_order = itertools.count()
+        self.workers:"list[asyncio.Task]" = []
+        self.stopping_workers:"set[asyncio.Task]" = set()
+        '''workers `stop` cancelled. cancellation only ends a worker if it is one of these, otherwise it just ends the item being worked on'''
+        self.submitted_count = 0
+        self.completed_count = 0
+
+    def submit(self, lane, func, *args, priority:int=0) -> asyncio.Future:
+        '''schedule awaitable function to be called with given arguments after everything submitted to same lane before it.
+
+        Parameters
+        ---
+        * lane - `Any`
+            hashable key for what ordering group work belongs to
+        * func - `Callable`
+            async function to run
+        * args
+            arguments to pass to function
+        * priority - `int`
+            keyword only. lower numbers are picked up by workers sooner
+
+        Returns
+        ---
+        `asyncio.Future` that resolves to result of function, or has the exception function raised'''
+        self._start_workers()
+        item = WorkItem(lane, func, args, asyncio.get_running_loop().create_future(), priority)
+        self.submitted_count += 1
+        if lane in self.lanes:
+            # lane is either in ready queue or has a worker on it already, either way it will get to this item
+            self.lanes[lane].append(item)
+            if lane in self.queued_lanes and priority < self.queued_lanes[lane]:
+                # waiting lane just got more urgent
+                self._queue_lane(lane, priority)
+        else:
+            self.lanes[lane] = deque([item])
+            self._queue_lane(lane, priority)
+        return item.future
+
+    def _queue_lane(self, lane, priority:int):
+        self.queued_lanes[lane] = priority
+        self.ready_lanes.put_nowait((priority, next(self._ready_order), lane))
+
+    def _start_workers(self):
+        if len(self.workers) > 0:
+            return
+        self.ready_lanes = asyncio.PriorityQueue()
+        loop = asyncio.get_running_loop()
+        self.workers = [loop.create_task(self._worker()) for _ in range(self.worker_count)]
+        pool_logger.debug(f"worker pool <{id(self)}> started <{self.worker_count}> workers")
+
+    async def _worker(self):
+        worker = asyncio.current_task()
+        ready_lanes = self.ready_lanes
+        try:
+            while True:
+                priority, order, lane = await ready_lanes.get()
+                if lane not in self.queued_lanes:
+                    # extra entry from lane getting more urgent, lane was already picked up
+                    continue
+                del self.queued_lanes[lane]
+                lane_items = self.lanes[lane]
+                item = lane_items[0]
+                if not item.future.cancelled():
+                    try:
+                        result = await item.func(*item.args)
+                        if not item.future.cancelled():
+                            item.future.set_result(result)
+                    except asyncio.CancelledError:
+                        if worker in self.stopping_workers:
+                            raise
+                        # something item was waiting on got cancelled, not this worker. item is done, lane moves on
+                        pool_logger.debug(f"worker pool <{id(self)}> item in lane <{lane}> was cancelled")
+                        item.future.cancel()
+                    except Exception as e:
+                        pool_logger.debug(f"worker pool <{id(self)}> item in lane <{lane}> raised <{e}>")
+                        if not item.future.cancelled():
+                            item.future.set_exception(e)
+                self.completed_count += 1
+                lane_items.popleft()
+                if len(lane_items) > 0:
+                    self._queue_lane(lane, min(lane_item.priority for lane_item in lane_items))
+                else:
+                    del self.lanes[lane]
+        finally:
+            self.stopping_workers.discard(worker)
+
+    def stop(self):
+        '''cancel workers and any work that hasn't finished. pool can be submitted to again afterwards and will start new workers'''
+        for worker in self.workers:
+            self.stopping_workers.add(worker)
+            worker.cancel()
+        self.workers = []
+        for lane_items in self.lanes.values():
+            for item in lane_items:
+                item.future.cancel()
+        self.lanes = {}
+        self.queued_lanes = {}
+        self.ready_lanes = None
+
+    def get_stats(self):
+        return {
+            "workers": len(self.workers),
+            "busy_lanes": len(self.lanes),
+            "queued_items": sum(len(lane_items) for lane_items in self.lanes.values()),
+            "submitted": self.submitted_count,
+            "completed": self.completed_count
+        }
@@ -3,11 +3,20 @@ import yaml
 import typing
 import inspect
 import os
-from src.utils.Enums import POSSIBLE_PURPOSES
+import enum
+import types
+import collections.abc
+from src.utils.Enums import POSSIBLE_PURPOSES, CALL_STYLE
+
+CALLBACK_EXECUTORS = [None, "thread", "process"]
+'''where handler can run a callback. None runs it inline on event loop, "thread" runs it in handler's callback thread pool,
+"process" runs it in handler's callback process pool with a CallbackDataView instead of a datapack'''
 #TODO: implement allowed events
 #TODO: implement allowed nodes
-def callback_settings(schema:typing.Union[dict, str]=None, allowed_purposes:'list[POSSIBLE_PURPOSES]'=None, runtime_input_key:typing.Optional[str]=None, 
-                      cb_key:str=None, description_blurb="", allowed_events:"list[str]"=None, allowed_nodes:"list[str]"=None):
+def callback_settings(schema:typing.Union[dict, str]=None, allowed_purposes:'list[POSSIBLE_PURPOSES]'=None, runtime_input_key:typing.Optional[str]=None,
+                      cb_key:str=None, description_blurb="", allowed_events:"list[str]"=None, allowed_nodes:"list[str]"=None,
+                      executor:typing.Optional[str]=None, timeout:typing.Optional[float]=None, pure:bool=False,
+                      cache_ttl:typing.Optional[float]=None, cache_key:"typing.Optional[typing.Callable[[CallbackDatapack], typing.Hashable]]"=None):
     '''decorator to set all the settings for how to use function in callbacks. Records settings as attributes on function.
     Has to be first in decorator list on a function. if can't, use builtin setattr or provided set_callback_settings
     
@@ -24,12 +33,32 @@ def callback_settings(schema:typing.Union[dict, str]=None, allowed_purposes:'lis
     allowed_events - list[str]
         WIP yet to implement, events that this function can handle
     allowed_nodes - list[str]
-        WIP yet to implement, node types that can use this function'''
+        WIP yet to implement, node types that can use this function
+    `executor` - str or None
+        where handler runs the function, one of CALLBACK_EXECUTORS. "thread" is meant for blocking synchronous functions so they
+        don't hold up event loop, handler waits for result before moving on so order of callbacks is the same. "process" is for CPU heavy
+        functions, function has to be defined at module level and it gets a picklable CallbackDataView instead of the datapack
+    `timeout` - float or None
+        seconds handler waits for function before cancelling it and handling it as an error, None for no limit. only functions that
+        give back an awaitable or run in an executor can be stopped. a thread or process already running the function isn't interrupted,
+        handler just stops waiting on it
+    `pure` - bool
+        if function's result only depends on event and base_parameter. filters marked pure are run once per event dispatch for each
+        parameter, other nodes reached by same event reuse result. still run every time if runtime input was given in section data
+    `cache_ttl` - float or None
+        seconds a filter's result is kept by handler and reused for later events with same cache key, None to not keep results. for
+        filters that look up slow or outside data. results can be dropped early with handler's `invalidate_cached_results`
+    `cache_key` - callable or None
+        only used with cache_ttl. takes the datapack and gives back hashable inputs result depends on, ie user id and base parameter.
+        None uses just base parameter'''
     return lambda func: set_callback_settings(func=func, schema=schema, allowed_purposes=allowed_purposes, 
-                                              runtime_input_key=runtime_input_key, cb_key=cb_key, description_blurb=description_blurb, allowed_events=allowed_events, allowed_nodes=allowed_nodes)
+                                              runtime_input_key=runtime_input_key, cb_key=cb_key, description_blurb=description_blurb, allowed_events=allowed_events, allowed_nodes=allowed_nodes, executor=executor, timeout=timeout, pure=pure,
+                                              cache_ttl=cache_ttl, cache_key=cache_key)
 
-def set_callback_settings(func, schema:typing.Union[dict, str]=None, allowed_purposes:'list[POSSIBLE_PURPOSES]'=None, runtime_input_key:typing.Optional[str]=None, 
-                          cb_key:str=None, description_blurb="", allowed_events:"list[str]"=None, allowed_nodes:"list[str]"=None):
+def set_callback_settings(func, schema:typing.Union[dict, str]=None, allowed_purposes:'list[POSSIBLE_PURPOSES]'=None, runtime_input_key:typing.Optional[str]=None,
+                          cb_key:str=None, description_blurb="", allowed_events:"list[str]"=None, allowed_nodes:"list[str]"=None,
+                          executor:typing.Optional[str]=None, timeout:typing.Optional[float]=None, pure:bool=False,
+                      cache_ttl:typing.Optional[float]=None, cache_key:"typing.Optional[typing.Callable[[CallbackDatapack], typing.Hashable]]"=None):
     '''function that sets all the settings for how to use function in callbacks. Records settings as attributes on function.
     
     Parameters
@@ -45,7 +74,26 @@ def set_callback_settings(func, schema:typing.Union[dict, str]=None, allowed_pur
     allowed_events - list[str]
         WIP yet to implement, events that this function can handle
     allowed_nodes - list[str]
-        WIP yet to implement, node types that can use this function'''
+        WIP yet to implement, node types that can use this function
+    `executor` - str or None
+        where handler runs the function, one of CALLBACK_EXECUTORS. "thread" is meant for blocking synchronous functions so they
+        don't hold up event loop, handler waits for result before moving on so order of callbacks is the same. "process" is for CPU heavy
+        functions, function has to be defined at module level and it gets a picklable CallbackDataView instead of the datapack
+    `timeout` - float or None
+        seconds handler waits for function before cancelling it and handling it as an error, None for no limit. only functions that
+        give back an awaitable or run in an executor can be stopped. a thread or process already running the function isn't interrupted,
+        handler just stops waiting on it
+    `pure` - bool
+        if function's result only depends on event and base_parameter. filters marked pure are run once per event dispatch for each
+        parameter, other nodes reached by same event reuse result. still run every time if runtime input was given in section data
+    `cache_ttl` - float or None
+        seconds a filter's result is kept by handler and reused for later events with same cache key, None to not keep results. for
+        filters that look up slow or outside data. results can be dropped early with handler's `invalidate_cached_results`
+    `cache_key` - callable or None
+        only used with cache_ttl. takes the datapack and gives back hashable inputs result depends on, ie user id and base parameter.
+        None uses just base parameter'''
+    if executor not in CALLBACK_EXECUTORS:
+        raise ValueError(f"function <{func.__name__}> executor <{executor}> not one of <{CALLBACK_EXECUTORS}>")
     filtered_allowed_sections = set()
     if allowed_purposes is not None:
         for purpose in allowed_purposes:
@@ -67,15 +115,56 @@ def set_callback_settings(func, schema:typing.Union[dict, str]=None, allowed_pur
     func.allowed_events = allowed_events if allowed_events else []
     func.alowed_nodes = allowed_nodes if allowed_nodes else []
     func.description_blurb= description_blurb
+    func.executor = executor
+    func.timeout = timeout
+    func.pure = pure
+    func.cache_ttl = cache_ttl
+    func.cache_key = cache_key
     return func
 
+def classify_call_style(func):
+    '''find how function gives back its result from how it is defined. coroutine functions, including callable objects with an async
+    __call__ and partials of them, are COROUTINE. plain functions annotated to return an awaitable are SYNC_AWAITABLE, everything else is SYNC
+
+    Returns
+    ---
+    `CALL_STYLE` for function'''
+    if inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, "__call__", None)):
+        return CALL_STYLE.COROUTINE
+    try:
+        return_annotation = inspect.signature(func).return_annotation
+    except (TypeError, ValueError):
+        return CALL_STYLE.SYNC
+    return_type = typing.get_origin(return_annotation) or return_annotation
+    if inspect.isclass(return_type) and issubclass(return_type, collections.abc.Awaitable):
+        return CALL_STYLE.SYNC_AWAITABLE
+    return CALL_STYLE.SYNC
+
+def freeze_parameter(value):
+    '''hashable version of a yaml parameter to use as a key. dicts and lists are tagged with their type so they don't match each other
+
+    Raises
+    ---
+    TypeError if something in value can't be made hashable'''
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((key, freeze_parameter(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(freeze_parameter(item) for item in value))
+    hash(value)
+    return value
+
 def is_callback_setup(func):
     return hasattr(func, "schema") and hasattr(func, "allowed_purposes") and hasattr(func, "runtime_input_key") and hasattr(func, "cb_key")  and \
             hasattr(func, "allowed_events") and hasattr(func, "allowed_nodes")
 
 class CallbackDatapack():
-    '''class that will hold all data that is being passed to each callback'''
-    def __init__(self, active_node, event, base_parameter, goal_node_name=None, goal_node=None, section_data=None, section_name="", control_data=None, section_progress=None, **kwargs):
+    '''class that will hold all data that is being passed to each callback. Handler makes one per section and reuses it for each callback
+    in that section, only changing `base_parameter` and `control_data` between them, so callbacks should not hold on to it after returning.
+    Extra data handler passes to all callbacks is kept as one shared dict in `extras` and can be read as attributes, ie `datapack.bot`'''
+    __slots__ = ("active_node", "event", "goal_node_name", "goal_node", "base_parameter", "section_name", "section_data", "control_data",
+                 "section_progress", "extras")
+    def __init__(self, active_node, event, base_parameter, goal_node_name=None, goal_node=None, section_data=None, section_name="", control_data=None, section_progress=None,
+                 extras:"typing.Optional[dict[str, typing.Any]]"=None, **kwargs):
         self.active_node = active_node
         self.event = event
         self.goal_node_name = goal_node_name
@@ -85,6 +174,127 @@ class CallbackDatapack():
         self.section_data = section_data if section_data is not None else {}
         self.control_data = control_data if control_data is not None else {}
         self.section_progress = section_progress if section_progress is not None else {}
+        self.extras = extras if extras is not None else {}
+        '''not copied, so it is the same dict for every datapack made with it'''
+        if len(kwargs) > 0:
+            self.extras = {**self.extras, **kwargs}
+
+    def __getattr__(self, name):
+        # only called when name isn't a slot that has been set
+        if name == "extras":
+            raise AttributeError(name)
+        try:
+            return self.extras[name]
+        except KeyError:
+            raise AttributeError(f"callback datapack has no attribute <{name}>") from None
+
+class CallbackEventView(types.SimpleNamespace):
+    '''picklable stand-in for an event object sent to a callback running in a process. only holds plain data copied off the event'''
+
+CALLBACK_VIEW_FIELDS = ("id", "type", "name", "value", "content", "custom_id", "values", "data", "channel_id", "guild_id", "message_id",
+                        "user_id", "author_id")
+'''fields copied into a default event view if the object has them, on top of its own public attributes. covers ones libraries tend to
+keep as properties'''
+PLAIN_VIEW_TYPES = (type(None), bool, int, float, complex, str, bytes)
+'''values copied into views as is'''
+
+_callback_view_builders:"dict[type, typing.Callable[[typing.Any], typing.Any]]" = {}
+
+def register_callback_view(event_class:type, builder:"typing.Callable[[typing.Any], typing.Any]"):
+    '''set function that makes the picklable view of events of event_class, and its subclasses, for callbacks running in a process. for
+    event classes that can't define `get_callback_view()` themselves, ie ones from other libraries'''
+    _callback_view_builders[event_class] = builder
+
+def _view_field_names(value) -> "list[str]":
+    names = dict.fromkeys(CALLBACK_VIEW_FIELDS)
+    names.update(dict.fromkeys(getattr(value, "__dict__", {}).keys()))
+    for cls in type(value).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        names.update(dict.fromkeys([slots] if isinstance(slots, str) else slots))
+    return [name for name in names if not name.startswith("_")]
+
+def make_callback_view(value, depth:int=2):
+    '''picklable version of value for sending to a callback process. uses value's own `get_callback_view()` first, then a builder
+    registered for its class with `register_callback_view`. Plain data is kept as is and containers are copied with their contents
+    reduced. Any other object becomes a `CallbackEventView` of its public non callable fields, reduced the same way
+
+    Parameters
+    ---
+    value - `Any`
+        event or value on one to reduce
+    depth - `int`
+        how many levels of objects inside objects to follow. objects past that are left out
+
+    Returns
+    ---
+    picklable version of value, or None if value is an object past depth limit'''
+    if isinstance(value, PLAIN_VIEW_TYPES):
+        return value
+    if hasattr(value, "get_callback_view"):
+        return value.get_callback_view()
+    for cls in type(value).__mro__:
+        if cls in _callback_view_builders:
+            return _callback_view_builders[cls](value)
+    if isinstance(value, enum.Enum):
+        return value
+    if isinstance(value, dict):
+        return {key: make_callback_view(item, depth) for key, item in value.items() if isinstance(key, PLAIN_VIEW_TYPES)}
+    if isinstance(value, tuple):
+        return tuple(make_callback_view(item, depth) for item in value)
+    if isinstance(value, (list, set, frozenset)):
+        return [make_callback_view(item, depth) for item in value]
+    if depth <= 0:
+        return None
+    view = CallbackEventView()
+    for name in _view_field_names(value):
+        try:
+            field = getattr(value, name)
+        except Exception:
+            continue
+        if callable(field):
+            continue
+        reduced = make_callback_view(field, depth - 1)
+        if reduced is None and field is not None:
+            continue
+        setattr(view, name, reduced)
+    return view
+
+class CallbackDataView():
+    '''picklable copy of the parts of a CallbackDatapack that a callback registered with executor "process" gets instead of the datapack.
+    Event is reduced with `make_callback_view`, so events can pick what goes in by defining `get_callback_view()` or having a builder
+    registered, otherwise plain data is copied and objects become a `CallbackEventView` of their plain fields. Nodes can define
+    `get_callback_view()` too, otherwise node is only its graph node id. After callback finishes, changes to section_data and
+    control_data are copied back to the real section, anything else changed on the view is thrown away'''
+    def __init__(self, datapack:CallbackDatapack):
+        self.event = make_callback_view(datapack.event)
+        self.node_id = datapack.active_node.graph_node.id
+        self.node_data = datapack.active_node.get_callback_view() if hasattr(datapack.active_node, "get_callback_view") else None
+        self.session_data = copy.deepcopy(datapack.active_node.session.data) if datapack.active_node.session is not None else None
+        self.goal_node_name = datapack.goal_node_name
+        self.goal_node = None
+        '''transition counts when goal is a count of nodes, goal node itself isn't sent'''
+        if isinstance(datapack.goal_node, dict):
+            self.goal_node = datapack.goal_node
+        elif datapack.goal_node is not None:
+            self.goal_node_name = datapack.goal_node.graph_node.id
+        self.base_parameter = datapack.base_parameter
+        self.section_name = datapack.section_name
+        self.section_data = datapack.section_data
+        self.control_data = datapack.control_data
+
+def run_callback_view(func, view:CallbackDataView):
+    '''runs callback on a data view in a worker process. module level so process pool can pickle it
+
+    Returns
+    ---
+    tuple of callback's result and the view's section_data and control_data after callback ran'''
+    result = func(view)
+    return result, view.section_data, view.control_data
 
-        for option, data in kwargs.items():
-            setattr(self, option, data)
\ No newline at end of file
+def merge_view_results(datapack:CallbackDatapack, section_data:dict, control_data:dict):
+    '''copy section and control data changed in a worker process back into the datapack's dicts, keeping the same objects since
+    rest of section holds references to them'''
+    datapack.section_data.clear()
+    datapack.section_data.update(section_data)
+    datapack.control_data.clear()
+    datapack.control_data.update(control_data)